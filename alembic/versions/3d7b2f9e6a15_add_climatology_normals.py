@@ -0,0 +1,55 @@
+"""add climatology normals
+
+Revision ID: 3d7b2f9e6a15
+Revises: c4a9e1d73b58
+Create Date: 2026-10-19 16:05:12.402871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d7b2f9e6a15'
+down_revision: Union[str, None] = 'c4a9e1d73b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('climatology_normals',
+    sa.Column('location_id', sa.Integer(), nullable=False),
+    sa.Column('day_of_year', sa.SmallInteger(), nullable=False),
+    sa.Column('hour', sa.SmallInteger(), nullable=False),
+    sa.Column('samples', sa.Integer(), nullable=False),
+    sa.Column('mean', sa.Float(), nullable=False),
+    sa.Column('stddev', sa.Float(), nullable=True),
+    sa.Column('p01', sa.Float(), nullable=False),
+    sa.Column('p05', sa.Float(), nullable=False),
+    sa.Column('p10', sa.Float(), nullable=False),
+    sa.Column('p25', sa.Float(), nullable=False),
+    sa.Column('p50', sa.Float(), nullable=False),
+    sa.Column('p75', sa.Float(), nullable=False),
+    sa.Column('p90', sa.Float(), nullable=False),
+    sa.Column('p95', sa.Float(), nullable=False),
+    sa.Column('p99', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['location_id'], ['locations.id'], name=op.f('fk_climatology_normals_location_id_locations'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('location_id', 'day_of_year', 'hour', name=op.f('pk_climatology_normals'))
+    )
+    op.create_table('climatology_builds',
+    sa.Column('location_id', sa.Integer(), nullable=False),
+    sa.Column('built_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('observations', sa.Integer(), nullable=False),
+    sa.Column('first_ts', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_ts', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('window_days', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['location_id'], ['locations.id'], name=op.f('fk_climatology_builds_location_id_locations'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('location_id', name=op.f('pk_climatology_builds'))
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('climatology_builds')
+    op.drop_table('climatology_normals')
@@ -0,0 +1,38 @@
+"""unique observation per location and timestamp
+
+Revision ID: 5b7d0c2e9a41
+Revises: eea2630c3da4
+Create Date: 2026-10-19 09:12:44.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7d0c2e9a41'
+down_revision: Union[str, None] = 'eea2630c3da4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # merge() based upserts could store the same (location_id, ts) twice; keep the newest row
+    op.execute("""
+        DELETE FROM weather_observations a
+        USING weather_observations b
+        WHERE a.location_id = b.location_id
+          AND a.ts = b.ts
+          AND a.id < b.id;
+    """)
+    op.create_unique_constraint(
+        'uq_weather_observations_location_id_ts',
+        'weather_observations',
+        ['location_id', 'ts'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_weather_observations_location_id_ts', 'weather_observations', type_='unique')
@@ -0,0 +1,112 @@
+"""add observation change feed
+
+Revision ID: 7c2e5a9d1f38
+Revises: 3d7b2f9e6a15
+Create Date: 2026-10-19 17:48:31.205614
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e5a9d1f38'
+down_revision: Union[str, None] = '3d7b2f9e6a15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Nullable, default set separately: existing rows stay null instead of rewriting the table
+    op.add_column('weather_observations', sa.Column('change_xid', sa.BigInteger(), nullable=True))
+    op.alter_column('weather_observations', 'change_xid', server_default=sa.text('pg_current_xact_id()::text::bigint'))
+    op.create_index(
+        'ix_weather_observations_change_xid', 'weather_observations', ['change_xid', 'id'],
+        postgresql_where=sa.text('change_xid IS NOT NULL'),
+    )
+
+    op.create_table('observation_tombstones',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('location_id', sa.Integer(), nullable=False),
+    sa.Column('ts', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('change_xid', sa.BigInteger(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['location_id'], ['locations.id'], name=op.f('fk_observation_tombstones_location_id_locations'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_observation_tombstones')),
+    sa.UniqueConstraint('location_id', 'ts', name='uq_observation_tombstones_location_id_ts')
+    )
+    op.create_index('ix_observation_tombstones_change_xid', 'observation_tombstones', ['change_xid', 'id'])
+
+    # Changes are captured unless a transaction sets weather.capture_changes = 'off'
+    # (the cold tier moving rows in and out of archives)
+    op.execute("""
+        CREATE FUNCTION observation_capture_changes() RETURNS boolean
+        LANGUAGE sql STABLE AS $$
+            SELECT coalesce(current_setting('weather.capture_changes', true), '') <> 'off'
+        $$;
+
+        CREATE FUNCTION observation_touch_change_xid() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF observation_capture_changes() THEN
+                NEW.change_xid := pg_current_xact_id()::text::bigint;
+            END IF;
+            RETURN NEW;
+        END $$;
+
+        CREATE FUNCTION observation_record_tombstones() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF observation_capture_changes() THEN
+                INSERT INTO observation_tombstones (location_id, ts, change_xid)
+                SELECT location_id, ts, pg_current_xact_id()::text::bigint FROM deleted_rows
+                ON CONFLICT ON CONSTRAINT uq_observation_tombstones_location_id_ts
+                DO UPDATE SET change_xid = EXCLUDED.change_xid, deleted_at = now();
+            END IF;
+            RETURN NULL;
+        END $$;
+
+        -- A key has either a row or a tombstone, never both
+        CREATE FUNCTION observation_clear_tombstones() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM observation_tombstones) THEN
+                DELETE FROM observation_tombstones t
+                USING inserted_rows n
+                WHERE t.location_id = n.location_id AND t.ts = n.ts;
+            END IF;
+            RETURN NULL;
+        END $$;
+
+        CREATE TRIGGER weather_observations_touch_change_xid
+            BEFORE UPDATE ON weather_observations
+            FOR EACH ROW EXECUTE FUNCTION observation_touch_change_xid();
+
+        CREATE TRIGGER weather_observations_record_tombstones
+            AFTER DELETE ON weather_observations
+            REFERENCING OLD TABLE AS deleted_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION observation_record_tombstones();
+
+        CREATE TRIGGER weather_observations_clear_tombstones
+            AFTER INSERT ON weather_observations
+            REFERENCING NEW TABLE AS inserted_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION observation_clear_tombstones();
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        DROP TRIGGER weather_observations_clear_tombstones ON weather_observations;
+        DROP TRIGGER weather_observations_record_tombstones ON weather_observations;
+        DROP TRIGGER weather_observations_touch_change_xid ON weather_observations;
+        DROP FUNCTION observation_clear_tombstones();
+        DROP FUNCTION observation_record_tombstones();
+        DROP FUNCTION observation_touch_change_xid();
+        DROP FUNCTION observation_capture_changes();
+    """)
+    op.drop_index('ix_observation_tombstones_change_xid', table_name='observation_tombstones')
+    op.drop_table('observation_tombstones')
+    op.drop_index('ix_weather_observations_change_xid', table_name='weather_observations')
+    op.drop_column('weather_observations', 'change_xid')
@@ -0,0 +1,42 @@
+"""add observation archives (cold tier)
+
+Revision ID: 8e1f4a6b2c73
+Revises: 5b7d0c2e9a41
+Create Date: 2026-10-19 10:02:17.904412
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e1f4a6b2c73'
+down_revision: Union[str, None] = '5b7d0c2e9a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('observation_archives',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('location_id', sa.Integer(), nullable=False),
+    sa.Column('period_start', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('period_end', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('point_count', sa.Integer(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('sources', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['location_id'], ['locations.id'], name=op.f('fk_observation_archives_location_id_locations')),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_observation_archives')),
+    sa.UniqueConstraint('location_id', 'period_start', name='uq_observation_archives_location_id_period_start')
+    )
+    op.create_index(op.f('ix_observation_archives_id'), 'observation_archives', ['id'], unique=False)
+    # The blobs are already compressed; skip TOAST's pglz pass
+    op.execute("ALTER TABLE observation_archives ALTER COLUMN data SET STORAGE EXTERNAL")
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_observation_archives_id'), table_name='observation_archives')
+    op.drop_table('observation_archives')
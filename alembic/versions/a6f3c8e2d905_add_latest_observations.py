@@ -0,0 +1,115 @@
+"""add latest observations
+
+Revision ID: a6f3c8e2d905
+Revises: 7c2e5a9d1f38
+Create Date: 2026-10-19 18:34:07.911482
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6f3c8e2d905'
+down_revision: Union[str, None] = '7c2e5a9d1f38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('latest_observations',
+    sa.Column('location_id', sa.Integer(), nullable=False),
+    sa.Column('ts', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('temp_c', sa.Float(), nullable=False),
+    sa.Column('source', sa.String(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['location_id'], ['locations.id'], name=op.f('fk_latest_observations_location_id_locations'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('location_id', name=op.f('pk_latest_observations'))
+    )
+
+    # Only a newer (or the same) ts replaces a location's latest reading. Deleting
+    # the latest reading falls back to the newest remaining row, through the
+    # (location_id, ts) index. Moves into the cold tier (capture off) leave it alone.
+    op.execute("""
+        CREATE FUNCTION latest_observations_from_new_rows() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO latest_observations AS l (location_id, ts, temp_c, source)
+            SELECT DISTINCT ON (location_id) location_id, ts, temp_c, source
+            FROM new_rows
+            ORDER BY location_id, ts DESC
+            ON CONFLICT (location_id) DO UPDATE
+            SET ts = EXCLUDED.ts, temp_c = EXCLUDED.temp_c, source = EXCLUDED.source, updated_at = now()
+            WHERE l.ts <= EXCLUDED.ts;
+            RETURN NULL;
+        END $$;
+
+        CREATE FUNCTION latest_observations_after_delete() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF observation_capture_changes() THEN
+                WITH gone AS (
+                    SELECT DISTINCT l.location_id
+                    FROM latest_observations l
+                    JOIN deleted_rows d ON d.location_id = l.location_id AND d.ts = l.ts
+                ), fresh AS (
+                    SELECT g.location_id, o.ts, o.temp_c, o.source
+                    FROM gone g
+                    LEFT JOIN LATERAL (
+                        SELECT w.ts, w.temp_c, w.source FROM weather_observations w
+                        WHERE w.location_id = g.location_id
+                        ORDER BY w.ts DESC LIMIT 1
+                    ) o ON true
+                ), emptied AS (
+                    DELETE FROM latest_observations l
+                    USING fresh f
+                    WHERE l.location_id = f.location_id AND f.ts IS NULL
+                )
+                UPDATE latest_observations l
+                SET ts = f.ts, temp_c = f.temp_c, source = f.source, updated_at = now()
+                FROM fresh f
+                WHERE l.location_id = f.location_id AND f.ts IS NOT NULL;
+            END IF;
+            RETURN NULL;
+        END $$;
+
+        CREATE TRIGGER weather_observations_latest_on_insert
+            AFTER INSERT ON weather_observations
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION latest_observations_from_new_rows();
+
+        CREATE TRIGGER weather_observations_latest_on_update
+            AFTER UPDATE ON weather_observations
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION latest_observations_from_new_rows();
+
+        CREATE TRIGGER weather_observations_latest_on_delete
+            AFTER DELETE ON weather_observations
+            REFERENCING OLD TABLE AS deleted_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION latest_observations_after_delete();
+    """)
+
+    # One backward index probe per location
+    op.execute("""
+        INSERT INTO latest_observations (location_id, ts, temp_c, source)
+        SELECT l.id, o.ts, o.temp_c, o.source
+        FROM locations l
+        JOIN LATERAL (
+            SELECT w.ts, w.temp_c, w.source FROM weather_observations w
+            WHERE w.location_id = l.id
+            ORDER BY w.ts DESC LIMIT 1
+        ) o ON true
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        DROP TRIGGER weather_observations_latest_on_delete ON weather_observations;
+        DROP TRIGGER weather_observations_latest_on_update ON weather_observations;
+        DROP TRIGGER weather_observations_latest_on_insert ON weather_observations;
+        DROP FUNCTION latest_observations_after_delete();
+        DROP FUNCTION latest_observations_from_new_rows();
+    """)
+    op.drop_table('latest_observations')
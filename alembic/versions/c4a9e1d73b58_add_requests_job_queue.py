@@ -0,0 +1,53 @@
+"""add requests table (background job queue)
+
+Revision ID: c4a9e1d73b58
+Revises: 8e1f4a6b2c73
+Create Date: 2026-10-19 14:21:40.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a9e1d73b58'
+down_revision: Union[str, None] = '8e1f4a6b2c73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('requests',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('location', sa.String(), nullable=True),
+    sa.Column('request_type', sa.String(), nullable=False),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('status', sa.String(), server_default='queued', nullable=False),
+    sa.Column('params', sa.JSON(), nullable=False),
+    sa.Column('progress', sa.JSON(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error_message', sa.Text(), nullable=True),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('max_attempts', sa.Integer(), server_default='3', nullable=False),
+    sa.Column('run_after', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('cancel_requested', sa.Boolean(), server_default='false', nullable=False),
+    sa.Column('locked_by', sa.String(), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_requests'))
+    )
+    op.create_index(op.f('ix_requests_id'), 'requests', ['id'], unique=False)
+    op.create_index('ix_requests_queued_run_after', 'requests', ['run_after'], unique=False,
+                    postgresql_where=sa.text("status = 'queued'"))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_requests_queued_run_after', table_name='requests', postgresql_where=sa.text("status = 'queued'"))
+    op.drop_index(op.f('ix_requests_id'), table_name='requests')
+    op.drop_table('requests')
@@ -0,0 +1,114 @@
+"""add observation coverage
+
+Revision ID: d81b4f6c2a07
+Revises: a6f3c8e2d905
+Create Date: 2026-10-19 19:21:46.530918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81b4f6c2a07'
+down_revision: Union[str, None] = 'a6f3c8e2d905'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('observation_coverage',
+    sa.Column('location_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('hours', postgresql.BIT(length=744), nullable=False),
+    sa.ForeignKeyConstraint(['location_id'], ['locations.id'], name=op.f('fk_observation_coverage_location_id_locations'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('location_id', 'month', name=op.f('pk_observation_coverage'))
+    )
+
+    # Inserts OR their hours into the month's bitmap. Deletes recompute the
+    # touched months from the remaining rows (an index range scan per month).
+    # Moves into the cold tier (capture off) leave it alone.
+    op.execute("""
+        CREATE FUNCTION coverage_month(ts timestamptz) RETURNS date
+        LANGUAGE sql IMMUTABLE AS $$
+            SELECT (date_trunc('month', ts, 'UTC') AT TIME ZONE 'UTC')::date
+        $$;
+
+        CREATE FUNCTION coverage_bit(ts timestamptz) RETURNS bit(744)
+        LANGUAGE sql IMMUTABLE AS $$
+            SELECT B'1'::bit(744) >> floor(
+                (extract(epoch FROM ts) - extract(epoch FROM date_trunc('month', ts, 'UTC'))) / 3600
+            )::int
+        $$;
+
+        CREATE FUNCTION coverage_from_new_rows() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO observation_coverage AS c (location_id, month, hours)
+            SELECT location_id, coverage_month(hour), bit_or(coverage_bit(hour))
+            FROM (SELECT DISTINCT location_id, date_trunc('hour', ts) AS hour FROM new_rows) h
+            GROUP BY location_id, coverage_month(hour)
+            ON CONFLICT (location_id, month) DO UPDATE SET hours = c.hours | EXCLUDED.hours;
+            RETURN NULL;
+        END $$;
+
+        CREATE FUNCTION coverage_after_delete() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF observation_capture_changes() THEN
+                WITH touched AS (
+                    SELECT DISTINCT location_id, coverage_month(ts) AS month FROM deleted_rows
+                ), fresh AS (
+                    SELECT t.location_id, t.month, (
+                        SELECT bit_or(coverage_bit(w.ts)) FROM weather_observations w
+                        WHERE w.location_id = t.location_id
+                          AND w.ts >= t.month::timestamp AT TIME ZONE 'UTC'
+                          AND w.ts < (t.month + interval '1 month')::timestamp AT TIME ZONE 'UTC'
+                    ) AS hours
+                    FROM touched t
+                ), emptied AS (
+                    DELETE FROM observation_coverage c
+                    USING fresh f
+                    WHERE c.location_id = f.location_id AND c.month = f.month AND f.hours IS NULL
+                )
+                UPDATE observation_coverage c
+                SET hours = f.hours
+                FROM fresh f
+                WHERE c.location_id = f.location_id AND c.month = f.month AND f.hours IS NOT NULL;
+            END IF;
+            RETURN NULL;
+        END $$;
+
+        CREATE TRIGGER weather_observations_coverage_on_insert
+            AFTER INSERT ON weather_observations
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION coverage_from_new_rows();
+
+        CREATE TRIGGER weather_observations_coverage_on_delete
+            AFTER DELETE ON weather_observations
+            REFERENCING OLD TABLE AS deleted_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION coverage_after_delete();
+    """)
+
+    # Hot rows only; archived months are added by python -m app.cli.build_coverage
+    op.execute("""
+        INSERT INTO observation_coverage (location_id, month, hours)
+        SELECT location_id, coverage_month(hour), bit_or(coverage_bit(hour))
+        FROM (SELECT DISTINCT location_id, date_trunc('hour', ts) AS hour FROM weather_observations) h
+        GROUP BY location_id, coverage_month(hour)
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        DROP TRIGGER weather_observations_coverage_on_delete ON weather_observations;
+        DROP TRIGGER weather_observations_coverage_on_insert ON weather_observations;
+        DROP FUNCTION coverage_after_delete();
+        DROP FUNCTION coverage_from_new_rows();
+        DROP FUNCTION coverage_bit(timestamptz);
+        DROP FUNCTION coverage_month(timestamptz);
+    """)
+    op.drop_table('observation_coverage')
@@ -0,0 +1,104 @@
+"""unique location per name, admin1 and country
+
+Revision ID: e3c7a1f9b460
+Revises: d81b4f6c2a07
+Create Date: 2026-10-19 20:05:12.684207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3c7a1f9b460'
+down_revision: Union[str, None] = 'd81b4f6c2a07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Same normalization as app.services.location_resolver.normalize_query; null is ''
+    op.execute("""
+        CREATE FUNCTION location_key(value text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+            SELECT lower(regexp_replace(btrim(coalesce(value, '')), '\\s+', ' ', 'g'))
+        $$;
+    """)
+    _merge_duplicate_locations()
+    op.create_index(
+        'ux_locations_name_admin1_country', 'locations',
+        [sa.text('location_key(name)'), sa.text('location_key(admin1)'), sa.text('location_key(country)')],
+        unique=True,
+    )
+
+
+def _merge_duplicate_locations() -> None:
+    # /locations/create refused case-insensitive duplicate names, so existing rows
+    # only collide if they differ in whitespace (or null vs ''). Each group is merged
+    # into its lowest id: observations move there through the triggers (coverage,
+    # latest reading, change feed), the lowest id's reading wins a shared ts, and
+    # dependent rows of the duplicates go with them (ON DELETE CASCADE).
+    op.execute("""
+        CREATE TEMP TABLE location_merges AS
+        SELECT id AS location_id, keeper_id FROM (
+            SELECT id, min(id) OVER (
+                PARTITION BY location_key(name), location_key(admin1), location_key(country)
+            ) AS keeper_id
+            FROM locations
+        ) l
+        WHERE id <> keeper_id;
+    """)
+
+    # Cold tier blobs can't be merged here; two for the same month must be restored first
+    conflicts = op.get_bind().execute(sa.text("""
+        SELECT coalesce(m.keeper_id, a.location_id), a.period_start, array_agg(a.location_id ORDER BY a.location_id)
+        FROM observation_archives a
+        LEFT JOIN location_merges m ON m.location_id = a.location_id
+        WHERE a.location_id IN (SELECT location_id FROM location_merges UNION SELECT keeper_id FROM location_merges)
+        GROUP BY 1, 2
+        HAVING count(*) > 1
+    """)).all()
+    if conflicts:
+        raise RuntimeError(
+            "Duplicate locations have archived observations for the same month; restore them "
+            "(python -m app.cli.cold_tier restore) and upgrade again: "
+            + "; ".join(f"locations {ids} at {period_start:%Y-%m}" for _, period_start, ids in conflicts)
+        )
+
+    op.execute("""
+        INSERT INTO weather_observations (location_id, ts, temp_c, source, created_at, updated_at)
+        SELECT DISTINCT ON (m.keeper_id, o.ts) m.keeper_id, o.ts, o.temp_c, o.source, o.created_at, o.updated_at
+        FROM weather_observations o
+        JOIN location_merges m ON m.location_id = o.location_id
+        ORDER BY m.keeper_id, o.ts, o.location_id
+        ON CONFLICT ON CONSTRAINT uq_weather_observations_location_id_ts DO NOTHING;
+
+        DELETE FROM weather_observations o USING location_merges m WHERE o.location_id = m.location_id;
+
+        UPDATE observation_archives a SET location_id = m.keeper_id
+        FROM location_merges m WHERE a.location_id = m.location_id;
+
+        -- What is left of the duplicates' coverage is their archived months
+        INSERT INTO observation_coverage AS c (location_id, month, hours)
+        SELECT m.keeper_id, d.month, bit_or(d.hours)
+        FROM observation_coverage d
+        JOIN location_merges m ON m.location_id = d.location_id
+        GROUP BY m.keeper_id, d.month
+        ON CONFLICT (location_id, month) DO UPDATE SET hours = c.hours | EXCLUDED.hours;
+
+        -- Normals of a location that gained observations are rebuilt by the next refresh
+        DELETE FROM climatology_builds b
+        USING (SELECT DISTINCT keeper_id FROM location_merges) m
+        WHERE b.location_id = m.keeper_id;
+
+        DELETE FROM locations l USING location_merges m WHERE l.id = m.location_id;
+
+        DROP TABLE location_merges;
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ux_locations_name_admin1_country', table_name='locations')
+    op.execute("DROP FUNCTION location_key(text)")
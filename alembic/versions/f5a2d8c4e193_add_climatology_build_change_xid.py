@@ -0,0 +1,27 @@
+"""add climatology build change xid
+
+Revision ID: f5a2d8c4e193
+Revises: e3c7a1f9b460
+Create Date: 2026-10-19 20:41:37.159826
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5a2d8c4e193'
+down_revision: Union[str, None] = 'e3c7a1f9b460'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Null for existing builds: they are rebuilt once by the next refresh
+    op.add_column('climatology_builds', sa.Column('change_xid', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('climatology_builds', 'change_xid')
@@ -0,0 +1,48 @@
+"""Response envelopes serialized with orjson.
+
+``ok()`` and ``fail()`` return ready-made responses, so FastAPI skips its
+``jsonable_encoder`` pass over the payload; orjson encodes datetimes, floats
+and nested dicts/lists natively in C. Non-finite floats become ``null``.
+"""
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    """App-wide default response class"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def ok(data: Any = None, meta: Optional[Dict[str, Any]] = None, status_code: int = 200) -> ORJSONResponse:
+    """Standard success envelope"""
+    return ORJSONResponse(status_code=status_code, content={"success": True, "data": data, "meta": meta})
+
+
+def fail(status_code: int, code: str, message: str, meta: Optional[Dict[str, Any]] = None) -> ORJSONResponse:
+    """Standard error envelope"""
+    return ORJSONResponse(
+        status_code=status_code,
+        content={"success": False, "error": {"code": code, "message": message}, "meta": meta},
+    )
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from app.api.responses import fail, ok
+from app.core.config import settings
+from app.db.session import get_db
+from app.services.changes import ChangeCursor, CursorExpired, InvalidCursor, current_cursor, read_changes
+
+router = APIRouter(tags=["changes"])
+
+@router.get("/weather/changes")
+async def get_observation_changes(
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page; omit to start following from now"),
+    limit: int = Query(settings.CHANGES_PAGE_SIZE, ge=1, le=settings.CHANGES_MAX_PAGE_SIZE),
+    location_ids: Optional[List[int]] = Query(None, description="Only changes to these locations"),
+    db: Session = Depends(get_db)
+):
+    """Observations inserted, updated or deleted since `cursor`, oldest first.
+
+    Without a cursor, returns no changes and the cursor of the present: take
+    it, copy the full history, then follow the feed from it. Keep calling
+    with the returned cursor while has_more is true."""
+    if cursor is None:
+        return ok({"changes": [], "cursor": current_cursor(db).encode(), "has_more": False})
+    try:
+        position = ChangeCursor.decode(cursor)
+    except InvalidCursor as e:
+        return fail(400, "INVALID_CURSOR", str(e))
+    try:
+        changes, next_cursor, has_more = read_changes(db, position, limit, location_ids)
+    except CursorExpired:
+        return fail(410, "CURSOR_EXPIRED",
+                    f"Cursor is older than {settings.CHANGES_RETENTION_DAYS} days; resync in full and start from a new cursor")
+    return ok({"changes": changes, "cursor": next_cursor.encode(), "has_more": has_more})
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends
+from typing import List
+from datetime import datetime
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from app.api.responses import ok, fail
+from app.core.config import settings
+from app.db.session import get_db
+from app.services.jobs import enqueue, get_job, job_to_dict
+
+router = APIRouter(tags=["exports"])
+
+class ExportCreateRequest(BaseModel):
+    location_ids: List[int]
+    start_ts: datetime
+    end_ts: datetime
+    compression: str = "zstd"
+    workers: int = 1
+
+@router.post("/weather/exports", status_code=202)
+async def create_export(request: ExportCreateRequest, db: Session = Depends(get_db)):
+    """Queue a Parquet export of observations and return its job id.
+    Files are written under EXPORT_DIR/<job_id>/location_id=<id>/year=<yyyy>/."""
+    if request.start_ts >= request.end_ts:
+        return fail(400, "INVALID_RANGE", "start_ts must be before end_ts")
+    if not request.location_ids:
+        return fail(400, "MISSING_LOCATION_SELECTOR", "location_ids must not be empty")
+    if request.compression not in ("zstd", "snappy", "gzip", "none"):
+        return fail(400, "INVALID_COMPRESSION", "compression must be one of zstd, snappy, gzip, none")
+
+    job = enqueue(db, "export", {
+        "location_ids": request.location_ids,
+        "start_ts": request.start_ts,
+        "end_ts": request.end_ts,
+        "compression": request.compression,
+        "workers": max(1, min(request.workers, settings.EXPORT_MAX_WORKERS)),
+    }, location=f"{len(request.location_ids)} location(s)")
+    return ok({"job_id": job.id, "status_url": f"/jobs/{job.id}"}, status_code=202)
+
+@router.get("/weather/exports/{job_id}")
+async def get_export(job_id: int, db: Session = Depends(get_db)):
+    """Status, progress and output location of an export job"""
+    job = get_job(db, job_id)
+    if not job or job.request_type != "export":
+        return fail(404, "JOB_NOT_FOUND", "Export job not found")
+    return ok(job_to_dict(job))
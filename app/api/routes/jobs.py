@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, Query
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.api.responses import ok, fail
+from app.db.session import get_db
+from app.services.jobs import FINISHED, cancel_job, get_job, job_to_dict, list_jobs
+
+router = APIRouter(tags=["jobs"])
+
+@router.get("/jobs")
+async def get_jobs(
+    status: Optional[str] = Query(None, description="queued, running, completed, failed or cancelled"),
+    request_type: Optional[str] = Query(None, description="backfill, import, delete, export or climatology"),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """Most recent background jobs, newest first"""
+    return ok([job_to_dict(job) for job in list_jobs(db, status, request_type, limit)])
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(job_id: int, db: Session = Depends(get_db)):
+    """Status, progress and result of a background job"""
+    job = get_job(db, job_id)
+    if not job:
+        return fail(404, "JOB_NOT_FOUND", "Job not found")
+    return ok(job_to_dict(job))
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job_request(job_id: int, db: Session = Depends(get_db)):
+    """Cancel a queued job, or ask a running one to stop at its next progress update"""
+    job = get_job(db, job_id)
+    if not job:
+        return fail(404, "JOB_NOT_FOUND", "Job not found")
+    if job.status in FINISHED:
+        return fail(409, "JOB_FINISHED", f"Job already {job.status}")
+    return ok(job_to_dict(cancel_job(db, job_id)))
@@ -0,0 +1,104 @@
+from fastapi import APIRouter, Depends, Query, Request, WebSocket
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import List, Optional
+import asyncio
+from app.api.responses import dumps, fail
+from app.core.config import settings
+from app.db.session import SessionLocal, get_db
+from app.models.weather import Location
+from app.services.live import CLOSED, OVERFLOW, broker
+
+router = APIRouter(tags=["live"])
+
+def _check_locations(db: Session, location_ids: List[int]) -> Optional[str]:
+    """Error message for an invalid subscription, or None"""
+    if not settings.LIVE_ENABLED:
+        return "Live push is disabled"
+    if len(set(location_ids)) > settings.LIVE_MAX_LOCATIONS:
+        return f"At most {settings.LIVE_MAX_LOCATIONS} locations per subscription"
+    found = {row[0] for row in db.query(Location.id).filter(Location.id.in_(location_ids))}
+    missing = sorted(set(location_ids) - found)
+    if missing:
+        return f"Unknown locations: {missing}"
+    return None
+
+def _check_locations_new_session(location_ids: List[int]) -> Optional[str]:
+    with SessionLocal() as db:
+        return _check_locations(db, location_ids)
+
+@router.get("/weather/observations/stream")
+async def stream_observations(
+    request: Request,
+    location_ids: List[int] = Query(..., description="Locations to follow (repeat the parameter for several)"),
+    db: Session = Depends(get_db)
+):
+    """Server-Sent Events stream of observations as they are written.
+    Sends `observations` events, a comment heartbeat every LIVE_HEARTBEAT_S
+    and a final `overflow` event if the client falls too far behind."""
+    error = _check_locations(db, location_ids)
+    db.close()  # don't hold a pooled connection for the life of the stream
+    if error:
+        return fail(400, "INVALID_SUBSCRIPTION", error)
+
+    sub = broker.subscribe(location_ids)
+
+    async def events():
+        try:
+            yield b"retry: 5000\n\n"
+            while True:
+                event = await sub.get(settings.LIVE_HEARTBEAT_S)
+                if event is None:
+                    yield b": keepalive\n\n"
+                elif event is OVERFLOW:
+                    yield b"event: overflow\ndata: {}\n\n"
+                    return
+                elif event is CLOSED:
+                    return
+                else:
+                    yield b"event: observations\ndata: " + dumps(event) + b"\n\n"
+        finally:
+            broker.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.websocket("/weather/observations/ws")
+async def observation_socket(
+    websocket: WebSocket,
+    location_ids: List[int] = Query(...),
+):
+    """WebSocket stream of observations as they are written: JSON messages
+    {"type": "observations", "location_id", "observations"} and a final
+    {"type": "overflow"} if the client falls too far behind."""
+    error = await run_in_threadpool(_check_locations_new_session, location_ids)
+    if error:
+        await websocket.close(code=1008, reason=error)
+        return
+    await websocket.accept()
+    sub = broker.subscribe(location_ids)
+
+    async def pump():
+        while True:
+            event = await sub.get()
+            if event is OVERFLOW:
+                await websocket.send_text('{"type":"overflow"}')
+                await websocket.close(code=1013)
+                return
+            if event is CLOSED:
+                await websocket.close(code=1001)
+                return
+            await websocket.send_text(dumps({"type": "observations", **event}).decode())
+
+    sender = asyncio.create_task(pump())
+    try:
+        # Client messages are ignored; reading surfaces the disconnect
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        sender.cancel()
+        broker.unsubscribe(sub)
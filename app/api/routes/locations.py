@@ -2,7 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from app.db.session import get_db
+from app.core.config import settings
 from app.models.weather import Location
+from app.services.location_import import insert_locations
+from app.services.location_resolver import location_resolver
+from app.services.spatial import station_index
 from typing import List, Optional
 from pydantic import BaseModel
 
@@ -23,6 +27,9 @@ class LocationCreateRequest(BaseModel):
     latitude: Optional[float] = None
     longitude: Optional[float] = None
 
+class LocationBatchRequest(BaseModel):
+    locations: List[LocationCreateRequest]
+
 @router.get("/locations/search", response_model=List[LocationSearchResponse])
 async def search_locations(
     q: str = Query(..., description="Search query for location name"),
@@ -67,32 +74,32 @@ async def create_location(
     data: LocationCreateRequest,
     db: Session = Depends(get_db)
 ):
-    """Create a new location"""
-    # Check if location already exists
-    existing = db.query(Location).filter(
-        func.lower(Location.name) == func.lower(data.name)
-    ).first()
-    
-    if existing:
+    """Create a new location, unless one with the same name, admin1 and country
+    (ignoring case and extra whitespace) exists"""
+    (location_id,), created = insert_locations(db, [data.model_dump()])
+    if not created:
+        db.rollback()
         raise HTTPException(status_code=400, detail="Location already exists")
-    
-    location = Location(
-        name=data.name,
-        country=data.country,
-        admin1=data.admin1,
-        latitude=data.latitude,
-        longitude=data.longitude
-    )
-    
-    db.add(location)
     db.commit()
-    db.refresh(location)
-    
-    return {
-        "id": location.id,
-        "name": location.name,
-        "country": location.country,
-        "admin1": location.admin1,
-        "latitude": location.latitude,
-        "longitude": location.longitude
-    } 
\ No newline at end of file
+    # The new location may outrank cached fuzzy matches, and may be a new station
+    location_resolver.invalidate()
+    station_index.invalidate()
+
+    return {"id": location_id, **data.model_dump()}
+
+@router.post("/locations/batch")
+async def create_locations(
+    data: LocationBatchRequest,
+    db: Session = Depends(get_db)
+):
+    """Create many locations at once; existing ones (same name, admin1 and country) are left
+    as they are. Returns the id of every requested location, in request order."""
+    if len(data.locations) > settings.LOCATION_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {settings.LOCATION_BATCH_MAX} locations per request")
+    ids, created = insert_locations(db, [loc.model_dump() for loc in data.locations])
+    db.commit()
+    if created:
+        location_resolver.invalidate()
+        station_index.invalidate()
+
+    return {"ids": ids, "created": created, "existing": len(ids) - created}
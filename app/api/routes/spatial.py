@@ -0,0 +1,88 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple
+from datetime import datetime
+from pydantic import BaseModel, Field
+import numpy as np
+from app.api.responses import fail, ok
+from app.core.config import settings
+from app.db.session import get_db
+from app.services.spatial import estimate, grid_points
+
+router = APIRouter(tags=["spatial"])
+
+class GridSpec(BaseModel):
+    lat_min: float = Field(..., ge=-90, le=90)
+    lat_max: float = Field(..., ge=-90, le=90)
+    lon_min: float = Field(..., ge=-180, le=180)
+    lon_max: float = Field(..., ge=-180, le=180)
+    step_deg: float = Field(..., gt=0)
+
+
+class InterpolateRequest(BaseModel):
+    ts: datetime
+    points: Optional[List[Tuple[float, float]]] = None  # [[lat, lon], ...]
+    grid: Optional[GridSpec] = None
+    k: int = Field(8, ge=1, le=32)
+    power: float = Field(2.0, ge=0.5, le=5.0)
+    max_distance_km: Optional[float] = Field(None, gt=0)
+
+def _round(values: np.ndarray, digits: int) -> List[Optional[float]]:
+    return [None if v != v else v for v in np.round(values, digits).tolist()]
+
+def _points_payload(lat: np.ndarray, lon: np.ndarray, result) -> List[dict]:
+    return [
+        {"latitude": la, "longitude": lo, "temp_c": t, "stations_used": n, "nearest_km": d}
+        for la, lo, t, n, d in zip(
+            lat.tolist(), lon.tolist(), _round(result["temp_c"], 2),
+            result["stations_used"].tolist(), _round(result["nearest_km"], 1)
+        )
+    ]
+
+@router.get("/weather/interpolate")
+async def interpolate_point(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    ts: datetime = Query(..., description="Time of the estimate (ISO 8601)"),
+    k: int = Query(8, ge=1, le=32, description="Stations to weight"),
+    power: float = Query(2.0, ge=0.5, le=5.0, description="Inverse-distance weighting power"),
+    db: Session = Depends(get_db)
+):
+    """Estimated temperature at a coordinate from the k nearest stations with data"""
+    result = estimate(db, np.array([lat]), np.array([lon]), ts, k, power)
+    point = _points_payload(np.array([lat]), np.array([lon]), result)[0]
+    if point["temp_c"] is None:
+        return fail(404, "NO_NEARBY_STATIONS", f"No station within {settings.SPATIAL_MAX_DISTANCE_KM} km has data near {ts}")
+    return ok({"ts": ts, **point, "stations": result["stations"]})
+
+@router.post("/weather/interpolate")
+async def interpolate_points(
+    request: InterpolateRequest,
+    db: Session = Depends(get_db)
+):
+    """Estimated temperatures for a list of points or a regular lat/lon grid
+    (row-major, latitude outer), computed in one pass"""
+    if (request.points is None) == (request.grid is None):
+        return fail(400, "INVALID_POINTS", "Provide exactly one of points or grid")
+    if request.grid is not None:
+        g = request.grid
+        if g.lat_min > g.lat_max or g.lon_min > g.lon_max:
+            return fail(400, "INVALID_GRID", "Grid minimums must not exceed maximums")
+        rows = int((g.lat_max - g.lat_min) / g.step_deg) + 1
+        cols = int((g.lon_max - g.lon_min) / g.step_deg) + 1
+        if rows * cols > settings.SPATIAL_MAX_POINTS:
+            return fail(400, "TOO_MANY_POINTS", f"At most {settings.SPATIAL_MAX_POINTS} points per request")
+        lat, lon = grid_points(g.lat_min, g.lat_max, g.lon_min, g.lon_max, g.step_deg)
+    else:
+        if len(request.points) > settings.SPATIAL_MAX_POINTS:
+            return fail(400, "TOO_MANY_POINTS", f"At most {settings.SPATIAL_MAX_POINTS} points per request")
+        coords = np.array(request.points, dtype=np.float64).reshape(-1, 2)
+        lat, lon = coords[:, 0], coords[:, 1]
+        if np.any(np.abs(lat) > 90) or np.any(np.abs(lon) > 180):
+            return fail(400, "INVALID_POINTS", "Latitudes must be within ±90 and longitudes within ±180")
+
+    result = estimate(db, lat, lon, request.ts, request.k, request.power, request.max_distance_km)
+    data = {"ts": request.ts, "points": _points_payload(lat, lon, result), "stations": result["stations"]}
+    if request.grid is not None:
+        data["shape"] = [len(np.unique(lat)), len(np.unique(lon))]
+    return ok(data)
@@ -1,12 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
-from app.db.session import get_db
+from sqlalchemy import and_
+from app.api.responses import dumps, fail, ok
+from app.core.coalesce import read_flights
+from app.db.session import SessionLocal, get_db
 from app.models.weather import Location, WeatherObservation
-from typing import List, Optional, Any, Dict
-from datetime import datetime, timezone
+from app.services.backfill import backfill_observations
+from app.services.climatology import anomalies
+from app.services.coverage import missing_ranges
+from app.services.ingest import IngestClosed, ingest_buffer
+from app.services.latest import latest_cache, note_write
+from app.core.config import settings
+from app.services.jobs import enqueue
+from app.services.live import publish
+from app.services.location_resolver import location_resolver, location_to_dict, normalize_query
+from app.services.observations import read_observations, upsert_observations
+from app.services.range_delete import delete_range
+from app.services.resample import ResampleSpec, iter_resampled, parse_duration, read_resampled, to_points
+from typing import List, Optional, Any, Dict, Tuple, Union
+from datetime import datetime, timedelta, timezone
+import math
+from functools import partial
+from pathlib import Path
 from pydantic import BaseModel
-from fastapi.responses import JSONResponse
 
 router = APIRouter(tags=["weather"])
 
@@ -15,22 +32,14 @@ class APIResponse(BaseModel):
     data: Optional[Any] = None
     meta: Optional[Dict[str, Any]] = None
 
-def ok(data: Any = None, meta: Optional[Dict[str, Any]] = None):
-    """Standard success envelope"""
-    return {"success": True, "data": data, "meta": meta}
-
-def fail(status_code: int, code: str, message: str, meta: Optional[Dict[str, Any]] = None):
-    """Standard error envelope (returns a JSONResponse)"""
-    return JSONResponse(
-        status_code=status_code,
-        content={"success": False, "error": {"code": code, "message": message}, "meta": meta},
-    )
-
 # Pydantic models for request/response
 class WeatherCreateRequest(BaseModel):
     q: str
     start_ts: datetime
     end_ts: datetime
+    step: Optional[str] = None  # resample to this step, e.g. "15m" or "1h"
+    method: str = "linear"  # linear or nearest
+    max_gap: Optional[str] = None  # widest gap to fill; defaults to RESAMPLE_MAX_GAP_S
 
 class ObservationUpsertRequest(BaseModel):
     location_id: int
@@ -42,6 +51,20 @@ class ObservationUpdateRequest(BaseModel):
     temp_c: float
     source: Optional[str] = None
 
+class BackfillRequest(BaseModel):
+    location_id: int
+    start_ts: datetime
+    end_ts: datetime
+    force: bool = False  # re-fetch hours that already have data
+
+class ImportRequest(BaseModel):
+    paths: List[str]  # relative to IMPORT_DIR on the server
+    workers: int = 1
+
+class ClimatologyRefreshRequest(BaseModel):
+    location_ids: Optional[List[int]] = None  # default: every location with new observations
+    full: bool = False  # rebuild every location with observations
+
 class LocationSearchResponse(BaseModel):
     id: int
     name: str
@@ -53,49 +76,94 @@ class LocationSearchResponse(BaseModel):
 #User search the db, if db doesn't have the data, send API
 #to fill the data and return the data from db. not supported right now because OpenWeather Free Tier no usable.
 
+def _resample_spec(step: Optional[str], method: str, max_gap: Optional[str]) -> Optional[ResampleSpec]:
+    """ResampleSpec for the request, None without a step; ValueError if invalid"""
+    if step is None:
+        return None
+    return ResampleSpec(parse_duration(step), method, parse_duration(max_gap) if max_gap else 0)
+
+def _grid_too_large(start_ts: datetime, end_ts: datetime, spec: Optional[ResampleSpec]) -> bool:
+    """Whether a JSON response would hold more than RESAMPLE_MAX_POINTS grid points"""
+    if spec is None:
+        return False
+    return (end_ts.timestamp() - start_ts.timestamp()) // spec.step_s + 1 > settings.RESAMPLE_MAX_POINTS
+
+def _observations_payload(db: Session, location: Dict[str, Any], start_ts: datetime, end_ts: datetime,
+                          spec: Optional[ResampleSpec]) -> Dict[str, Any]:
+    payload = {"location": location, "range": {"start_ts": start_ts, "end_ts": end_ts}}
+    if spec is None:
+        # Hot rows merged with the cold tier
+        payload["observations"] = read_observations(db, location["id"], start_ts, end_ts)
+    else:
+        points, counts = read_resampled(db, location["id"], start_ts, end_ts, spec)
+        payload["resample"] = {**spec.describe(), "quality_counts": counts}
+        payload["observations"] = points
+    return payload
+
+def _find_location(db: Session, location_id: Optional[int], q: Optional[str]) -> Optional[Dict[str, Any]]:
+    if location_id:
+        location = db.query(Location).filter(Location.id == location_id).first()
+        return location_to_dict(location) if location else None
+    return location_resolver.resolve(db, q)
+
+def _observations_response(location_id: Optional[int], q: Optional[str], start_ts: datetime, end_ts: datetime,
+                           spec: Optional[ResampleSpec]) -> Tuple[int, bytes]:
+    """(status, serialized envelope) of a JSON observations read; runs in the thread pool"""
+    with SessionLocal() as db:
+        location = _find_location(db, location_id, q)
+        if not location:
+            response = fail(404, "LOCATION_NOT_FOUND", "Location not found")
+        else:
+            response = ok(_observations_payload(db, location, start_ts, end_ts, spec))
+    return response.status_code, response.body
+
+async def _coalesced_observations(route: str, location_id: Optional[int], q: Optional[str],
+                                  start_ts: datetime, end_ts: datetime, spec: Optional[ResampleSpec]) -> Response:
+    """Observations read shared with identical reads already in flight (see app/core/coalesce.py)"""
+    selector = location_id if location_id else ("q", normalize_query(q))
+    # isoformat keeps the offset: the payload echoes the range as given
+    key = (selector, start_ts.isoformat(), end_ts.isoformat(), tuple(spec.describe().values()) if spec else None)
+    status, body = await read_flights.run(
+        route, key, partial(_observations_response, location_id, q, start_ts, end_ts, spec)
+    )
+    return Response(body, status_code=status, media_type="application/json")
+
+def _ndjson_observations(location_id: int, start_ts: datetime, end_ts: datetime,
+                         spec: Optional[ResampleSpec]):
+    """NDJSON lines, one observation or grid point each, read a chunk at a time"""
+    # Own session: this runs while the response streams, after the route returned
+    with SessionLocal() as db:
+        if spec is not None:
+            for grid, values, quality in iter_resampled(db, location_id, start_ts, end_ts, spec):
+                yield b"".join(dumps(p) + b"\n" for p in to_points(grid, values, quality))
+            return
+        span = timedelta(days=settings.STREAM_WINDOW_DAYS)
+        ws = start_ts
+        while ws <= end_ts:
+            we = min(ws + span - timedelta(microseconds=1), end_ts)
+            yield b"".join(dumps(o) + b"\n" for o in read_observations(db, location_id, ws, we))
+            ws += span
+
 @router.post("/weather/query")
-async def create_weather_query(
-    request: WeatherCreateRequest,
-    db: Session = Depends(get_db)
-):
+async def create_weather_query(request: WeatherCreateRequest):
     """Create a weather query and return stored hourly temperatures in range.
     start_ts and end_ts must be ISO 8601 datetime strings (e.g., YYYY-MM-DDTHH:MM:SSZ)."""
     
     if request.start_ts >= request.end_ts:
         return fail(400, "INVALID_RANGE", "start_ts must be before end_ts")
     
-    # Fuzzy search for location
-    location = db.query(Location).filter(
-        func.lower(Location.name).contains(func.lower(request.q))
-    ).first()
+    try:
+        spec = _resample_spec(request.step, request.method, request.max_gap)
+    except ValueError as e:
+        return fail(400, "INVALID_RESAMPLE", str(e))
+    if _grid_too_large(request.start_ts, request.end_ts, spec):
+        return fail(400, "TOO_MANY_POINTS", f"At most {settings.RESAMPLE_MAX_POINTS} points per request; "
+                                            "use a larger step or GET /weather/observations with format=ndjson")
     
-    if not location:
-        return fail(404, "LOCATION_NOT_FOUND", "Location not found")
-    
-    # Get observations in range
-    observations = db.query(WeatherObservation).filter(
-        and_(
-            WeatherObservation.location_id == location.id,
-            WeatherObservation.ts >= request.start_ts,
-            WeatherObservation.ts <= request.end_ts
-        )
-    ).all()
-    
-    return ok({
-        "location": {
-            "id": location.id,
-            "name": location.name,
-            "country": location.country,
-            "admin1": location.admin1,
-            "latitude": location.latitude,
-            "longitude": location.longitude
-        },
-        "range": {"start_ts": request.start_ts, "end_ts": request.end_ts},
-        "observations": [
-            {"ts": obs.ts, "temp_c": obs.temp_c, "source": obs.source}
-            for obs in observations
-        ]
-    })
+    # Fuzzy search for location (cached); identical concurrent queries share one read
+    return await _coalesced_observations(
+        "/weather/query", None, request.q, request.start_ts, request.end_ts, spec
+    )
 
 @router.get("/weather/observations")
 async def get_weather_observations(
@@ -115,46 +183,37 @@ async def get_weather_observations(
         ...,
         description="End of date/time range in strict ISO 8601 format (YYYY-MM-DDTHH:MM:SSZ)"
     ),
+    step: Optional[str] = Query(None, description="Resample to a regular grid with this step, e.g. 15m or 1h"),
+    method: str = Query("linear", description="Resampling interpolation: linear or nearest"),
+    max_gap: Optional[str] = Query(None, description="Widest gap between observations to fill, e.g. 3h"),
+    format: str = Query("json", description="json (envelope) or ndjson (streamed, one point per line)"),
     db: Session = Depends(get_db)
 ):
-    """Read observations in the specified range.
+    """Read observations in the specified range, optionally resampled.
     start_ts and end_ts must be ISO 8601 datetime strings (e.g., YYYY-MM-DDTHH:MM:SSZ)."""
     if not location_id and not q_fuzzy_location:
         return fail(400, "MISSING_LOCATION_SELECTOR", "Either location_id or q_fuzzy_location must be provided")
+    if format not in ("json", "ndjson"):
+        return fail(400, "INVALID_FORMAT", "format must be json or ndjson")
+    try:
+        spec = _resample_spec(step, method, max_gap)
+    except ValueError as e:
+        return fail(400, "INVALID_RESAMPLE", str(e))
     
-    if location_id:
-        location = db.query(Location).filter(Location.id == location_id).first()
-    else:
-        location = db.query(Location).filter(
-            func.lower(Location.name).contains(func.lower(q_fuzzy_location))
-        ).first()
+    if format == "json":
+        if _grid_too_large(start_ts, end_ts, spec):
+            return fail(400, "TOO_MANY_POINTS", f"At most {settings.RESAMPLE_MAX_POINTS} points per request; "
+                                                "use a larger step or format=ndjson")
+        return await _coalesced_observations("/weather/observations", location_id, q_fuzzy_location,
+                                             start_ts, end_ts, spec)
     
+    location = _find_location(db, location_id, q_fuzzy_location)
     if not location:
         return fail(404, "LOCATION_NOT_FOUND", "Location not found")
     
-    observations = db.query(WeatherObservation).filter(
-        and_(
-            WeatherObservation.location_id == location.id,
-            WeatherObservation.ts >= start_ts,
-            WeatherObservation.ts <= end_ts
-        )
-    ).all()
-    
-    return ok({
-        "location": {
-            "id": location.id,
-            "name": location.name,
-            "country": location.country,
-            "admin1": location.admin1,
-            "latitude": location.latitude,
-            "longitude": location.longitude
-        },
-        "range": {"start_ts": start_ts, "end_ts": end_ts},
-        "observations": [
-            {"ts": obs.ts, "temp_c": obs.temp_c, "source": obs.source}
-            for obs in observations
-        ]
-    })
+    return StreamingResponse(
+        _ndjson_observations(location["id"], start_ts, end_ts, spec), media_type="application/x-ndjson"
+    )
 
 """
 Batch Upsert Weather Observations Endpoint
@@ -200,18 +259,9 @@ async def upsert_weather_observations(
     if not location:
         return fail(404, "LOCATION_NOT_FOUND", "Location not found")
     
-    # Prepare observations for upsert
-    for obs_data in request.observations:
-        observation = WeatherObservation(
-            location_id=request.location_id,
-            ts=obs_data["ts"],
-            temp_c=obs_data["temp_c"],
-            source=obs_data.get("source")
-        )
-        
-        # Use merge for upsert behavior
-        db.merge(observation)
-    
+    # Rows that already exist for (location_id, ts) are updated in place
+    upsert_observations(db, request.location_id, request.observations)
+    publish(db, [{"location_id": request.location_id, **obs} for obs in request.observations])
     db.commit()
     
     return ok({
@@ -252,6 +302,8 @@ async def update_single_observation(
         )
         db.add(observation)
     
+    publish(db, [{"location_id": request.location_id, "ts": request.ts, "temp_c": request.temp_c, "source": request.source}])
+    note_write(db, [request.location_id])
     db.commit()
     db.refresh(observation)
     
@@ -263,32 +315,183 @@ async def update_single_observation(
         "source": observation.source
     })
 
+@router.post("/weather/observations/ingest", status_code=202)
+async def ingest_observations(
+    request: Union[ObservationUpdateRequest, List[ObservationUpdateRequest]],
+):
+    """Accept one reading (or a list) into the write-behind buffer and return 202.
+    Readings are upserted within INGEST_FLUSH_INTERVAL_S; use CreateOne when the
+    caller needs the stored row back."""
+    if not settings.INGEST_BUFFER_ENABLED:
+        return fail(404, "INGEST_DISABLED", "Buffered ingest is disabled; use CreateOne")
+    readings = request if isinstance(request, list) else [request]
+    if len(readings) > settings.INGEST_BATCH_ROWS:
+        return fail(413, "TOO_MANY_READINGS", f"At most {settings.INGEST_BATCH_ROWS} readings per push")
+
+    rows = []
+    for r in readings:
+        if not math.isfinite(r.temp_c):
+            return fail(422, "INVALID_READING", "temp_c must be a finite number")
+        if not await ingest_buffer.location_exists(r.location_id):
+            return fail(404, "LOCATION_NOT_FOUND", f"Location {r.location_id} not found")
+        ts = r.ts if r.ts.tzinfo else r.ts.replace(tzinfo=timezone.utc)
+        rows.append({"location_id": r.location_id, "ts": ts, "temp_c": r.temp_c, "source": r.source})
+
+    try:
+        accepted = await ingest_buffer.put(rows)
+    except IngestClosed:
+        accepted = False
+    if not accepted:
+        response = fail(503, "INGEST_BUFFER_FULL", "Ingest buffer is full, retry later")
+        response.headers["Retry-After"] = str(max(1, math.ceil(settings.INGEST_FLUSH_INTERVAL_S)))
+        return response
+    return ok({"accepted": len(rows)}, status_code=202)
+
 @router.delete("/weather/observations")
 async def delete_weather_observations(
-    location_id: int,
+    location_id: Optional[int] = Query(None, description="Location to delete from"),
+    all_locations: bool = Query(False, description="Delete the range for every location instead"),
     start_ts: datetime = Query(...),
     end_ts: datetime = Query(...),
     db: Session = Depends(get_db)
 ):
-    """Delete observations in the specified range"""
-    # Verify location exists
+    """Delete observations in the specified range, in bounded batches.
+    All-location deletes and ranges longer than JOB_INLINE_MAX_HOURS are
+    queued as a background job (202 with its job id)."""
+    if start_ts > end_ts:
+        return fail(400, "INVALID_RANGE", "start_ts must not be after end_ts")
+    if (location_id is None) == (not all_locations):
+        return fail(400, "MISSING_LOCATION_SELECTOR", "Provide exactly one of location_id or all_locations=true")
+
+    if location_id is not None:
+        # Verify location exists
+        location = db.query(Location).filter(Location.id == location_id).first()
+        if not location:
+            return fail(404, "LOCATION_NOT_FOUND", "Location not found")
+
+    if all_locations or end_ts - start_ts > timedelta(hours=settings.JOB_INLINE_MAX_HOURS):
+        job = enqueue(db, "delete", {"location_id": location_id, "start_ts": start_ts, "end_ts": end_ts},
+                      location=f"location {location_id}" if location_id is not None else "all locations")
+        return ok({"job_id": job.id, "status_url": f"/jobs/{job.id}"}, status_code=202)
+
+    stats = delete_range(db, location_id, start_ts, end_ts)
+
+    return ok({
+        "location_id": location_id,
+        "range": {"start_ts": start_ts, "end_ts": end_ts},
+        **stats
+    })
+
+@router.post("/weather/observations/backfill")
+async def backfill_weather_observations(
+    request: BackfillRequest,
+    db: Session = Depends(get_db)
+):
+    """Fetch hourly history for a location from OpenWeather and store it.
+    Ranges longer than JOB_INLINE_MAX_HOURS are queued as a background job (202 with its job id)."""
+    if request.start_ts >= request.end_ts:
+        return fail(400, "INVALID_RANGE", "start_ts must be before end_ts")
+
+    location = db.query(Location).filter(Location.id == request.location_id).first()
+    if not location:
+        return fail(404, "LOCATION_NOT_FOUND", "Location not found")
+
+    if request.end_ts - request.start_ts > timedelta(hours=settings.JOB_INLINE_MAX_HOURS):
+        job = enqueue(db, "backfill", request.model_dump(), location=f"location {location.id}")
+        return ok({"job_id": job.id, "status_url": f"/jobs/{job.id}"}, status_code=202)
+
+    stored = await backfill_observations(db, location, request.start_ts, request.end_ts, request.force)
+    if stored is None:
+        return fail(502, "UPSTREAM_UNAVAILABLE", "Could not fetch history from OpenWeather")
+
+    return ok({
+        "location_id": location.id,
+        "range": {"start_ts": request.start_ts, "end_ts": request.end_ts},
+        "stored": stored
+    })
+
+@router.post("/weather/observations/import", status_code=202)
+async def import_weather_observations(
+    request: ImportRequest,
+    db: Session = Depends(get_db)
+):
+    """Queue a bulk import of CSV/NDJSON/Parquet files that are already under IMPORT_DIR"""
+    root = Path(settings.IMPORT_DIR).resolve()
+    for path in request.paths:
+        full = (root / path).resolve()
+        if not full.is_relative_to(root) or not full.is_file():
+            return fail(400, "INVALID_PATH", f"{path} is not a file under the import directory")
+
+    job = enqueue(db, "import", {"paths": request.paths, "workers": max(1, request.workers)},
+                  location=f"{len(request.paths)} file(s)")
+    return ok({"job_id": job.id, "status_url": f"/jobs/{job.id}"}, status_code=202)
+
+@router.get("/weather/latest")
+async def get_latest_observations(
+    location_ids: List[int] = Query(..., description="Locations to read, e.g. ?location_ids=1&location_ids=2"),
+    db: Session = Depends(get_db)
+):
+    """Latest reading of each location, from one primary-key lookup (cached per worker)"""
+    if len(location_ids) > settings.LATEST_MAX_LOCATIONS:
+        return fail(400, "TOO_MANY_LOCATIONS", f"At most {settings.LATEST_MAX_LOCATIONS} locations per request")
+    readings = latest_cache.get_many(db, location_ids)
+    return ok({
+        "observations": [r for r in readings.values() if r is not None],
+        "missing": [lid for lid, r in readings.items() if r is None],
+    })
+
+@router.get("/weather/coverage")
+async def get_weather_coverage(
+    location_id: int = Query(..., description="Numeric ID of the location"),
+    start_ts: datetime = Query(..., description="Start of range (ISO 8601)"),
+    end_ts: datetime = Query(..., description="End of range (ISO 8601)"),
+    db: Session = Depends(get_db)
+):
+    """UTC hours of the range with and without observations (hot or archived), from the coverage bitmaps"""
+    if start_ts >= end_ts:
+        return fail(400, "INVALID_RANGE", "start_ts must be before end_ts")
     location = db.query(Location).filter(Location.id == location_id).first()
     if not location:
         return fail(404, "LOCATION_NOT_FOUND", "Location not found")
-    
-    # Delete observations in range
-    deleted_count = db.query(WeatherObservation).filter(
-        and_(
-            WeatherObservation.location_id == location_id,
-            WeatherObservation.ts >= start_ts,
-            WeatherObservation.ts <= end_ts
-        )
-    ).delete()
-    
-    db.commit()
-    
+
+    coverage = missing_ranges(db, location_id, start_ts, end_ts)
+    missing = coverage["missing"]
     return ok({
         "location_id": location_id,
         "range": {"start_ts": start_ts, "end_ts": end_ts},
-        "deleted": deleted_count
-    })
\ No newline at end of file
+        "hours": coverage["hours"],
+        "covered_hours": coverage["covered_hours"],
+        "ratio": round(coverage["covered_hours"] / coverage["hours"], 4),
+        "missing": [{"start_ts": s, "end_ts": e} for s, e in missing[:settings.COVERAGE_MAX_GAPS]],
+        "truncated": len(missing) > settings.COVERAGE_MAX_GAPS,
+    })
+
+@router.get("/weather/anomalies")
+async def get_weather_anomalies(
+    location_id: int = Query(..., description="Numeric ID of the location"),
+    start_ts: datetime = Query(..., description="Start of range (ISO 8601)"),
+    end_ts: datetime = Query(..., description="End of range (ISO 8601)"),
+    db: Session = Depends(get_db)
+):
+    """Observations in range with their climatological normal, z-score and
+    percentile rank for the same calendar day and UTC hour"""
+    if start_ts >= end_ts:
+        return fail(400, "INVALID_RANGE", "start_ts must be before end_ts")
+    location = db.query(Location).filter(Location.id == location_id).first()
+    if not location:
+        return fail(404, "LOCATION_NOT_FOUND", "Location not found")
+
+    result = anomalies(db, location_id, start_ts, end_ts)
+    if result is None:
+        return fail(404, "CLIMATOLOGY_NOT_FOUND", "No climatology for this location yet; POST /weather/climatology/refresh")
+    return ok({"location": location_to_dict(location), "range": {"start_ts": start_ts, "end_ts": end_ts}, **result})
+
+@router.post("/weather/climatology/refresh", status_code=202)
+async def refresh_climatology(
+    request: ClimatologyRefreshRequest,
+    db: Session = Depends(get_db)
+):
+    """Queue a rebuild of climatology normals (only locations with new data unless `full` or `location_ids`)"""
+    job = enqueue(db, "climatology", request.model_dump(),
+                  location=f"{len(request.location_ids)} location(s)" if request.location_ids else None)
+    return ok({"job_id": job.id, "status_url": f"/jobs/{job.id}"}, status_code=202)
@@ -0,0 +1,42 @@
+"""
+Build climatology normals (per location, calendar day and UTC hour).
+
+Usage:
+    # Locations with observations written since their last build
+    python -m app.cli.build_climatology
+    # Specific locations, or everything
+    python -m app.cli.build_climatology --location-ids 1,2,3
+    python -m app.cli.build_climatology --full --window-days 7
+"""
+import argparse
+import logging
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.climatology import refresh
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build climatology normals")
+    parser.add_argument("--location-ids", help="Comma-separated location ids (default: stale locations)")
+    parser.add_argument("--full", action="store_true", help="Rebuild every location with observations")
+    parser.add_argument("--window-days", type=int, default=settings.CLIMATOLOGY_WINDOW_DAYS,
+                        help="Pool samples from this many days either side of each calendar day")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    settings.CLIMATOLOGY_WINDOW_DAYS = args.window_days
+    location_ids = [int(x) for x in args.location_ids.split(",")] if args.location_ids else None
+
+    def progress(stats):
+        if stats["locations_done"] % 100 == 0:
+            logger.info("%d/%d locations", stats["locations_done"], stats["locations_total"])
+
+    with SessionLocal() as db:
+        refresh(db, location_ids, full=args.full, on_progress=progress)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Recompute hourly coverage bitmaps from hot and archived observations.
+
+The triggers keep coverage current for hot rows; run this once for months
+archived before coverage existed, or to repair a range.
+
+Usage:
+    # Every location-month that has an archive
+    python -m app.cli.build_coverage
+    # A range, for some locations (default: all with coverage or archives there)
+    python -m app.cli.build_coverage --start 2019-01-01T00:00:00Z --end 2019-12-31T23:00:00Z --location-ids 1,2
+"""
+import argparse
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app.db.session import SessionLocal
+from app.models.weather import ObservationArchive
+from app.services.coverage import rebuild
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_ts(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild observation coverage bitmaps")
+    parser.add_argument("--start", type=_parse_ts, default=None, help="Start of range (requires --end)")
+    parser.add_argument("--end", type=_parse_ts, default=None)
+    parser.add_argument("--location-ids", default=None, help="Comma separated location ids (default: all)")
+    args = parser.parse_args()
+    if (args.start is None) != (args.end is None):
+        parser.error("--start and --end go together")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    location_ids = [int(x) for x in args.location_ids.split(",")] if args.location_ids else None
+
+    with SessionLocal() as db:
+        if args.start is not None:
+            targets = [(lid, args.start, args.end) for lid in location_ids or [None]]
+        else:
+            query = (
+                select(ObservationArchive.location_id, func.min(ObservationArchive.period_start),
+                       func.max(ObservationArchive.period_end))
+                .group_by(ObservationArchive.location_id)
+                .order_by(ObservationArchive.location_id)
+            )
+            if location_ids:
+                query = query.where(ObservationArchive.location_id.in_(location_ids))
+            targets = [(lid, lo, hi - timedelta(microseconds=1)) for lid, lo, hi in db.execute(query)]
+
+        total = 0
+        for location_id, start, end in targets:
+            total += rebuild(db, location_id, start, end)
+            db.commit()  # one transaction per location
+        logger.info("Done: %d location-month(s) written", total)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Move observations between the hot table and the compressed cold tier.
+
+Usage:
+    # Archive every full month older than 3 years
+    python -m app.cli.cold_tier archive --older-than-years 3
+    # Bring a range back into hot rows
+    python -m app.cli.cold_tier restore --location-id 42 --start 2019-01-01T00:00:00Z --end 2019-12-31T23:00:00Z
+    # Storage summary
+    python -m app.cli.cold_tier stats
+"""
+import argparse
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import func
+
+from app.db.session import SessionLocal
+from app.models.weather import ObservationArchive
+from app.services.cold_storage import archivable_months, archive_month, archived_months, restore_month
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_ts(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def archive(args) -> None:
+    now = datetime.now(timezone.utc)
+    cutoff = now.replace(year=now.year - args.older_than_years)
+    location_ids = [int(x) for x in args.location_ids.split(",")] if args.location_ids else None
+
+    with SessionLocal() as db:
+        months = archivable_months(db, cutoff, location_ids)
+        logger.info("Archiving %d location-month(s) older than %s", len(months), cutoff.date())
+        total = 0
+        for i, (location_id, period_start) in enumerate(months, 1):
+            total += archive_month(db, location_id, period_start)
+            db.commit()  # one transaction per location-month keeps locks short
+            if i % 100 == 0:
+                logger.info("%d/%d location-months, %d points archived", i, len(months), total)
+        logger.info("Done: %d points archived", total)
+
+
+def restore(args) -> None:
+    with SessionLocal() as db:
+        total = 0
+        for period_start in archived_months(db, args.location_id, args.start, args.end):
+            total += restore_month(db, args.location_id, period_start)
+            db.commit()
+        logger.info("Done: %d points restored", total)
+
+
+def stats(args) -> None:
+    with SessionLocal() as db:
+        blobs, points, size = db.query(
+            func.count(ObservationArchive.id),
+            func.coalesce(func.sum(ObservationArchive.point_count), 0),
+            func.coalesce(func.sum(func.length(ObservationArchive.data)), 0),
+        ).one()
+    print({
+        "archives": blobs,
+        "points": points,
+        "data_bytes": size,
+        "bytes_per_point": round(size / points, 2) if points else None,
+    })
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the observation cold tier")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("archive", help="Pack old hot rows into monthly archive blobs")
+    p.add_argument("--older-than-years", type=int, default=3)
+    p.add_argument("--location-ids", default=None, help="Comma separated location ids (default: all)")
+    p.set_defaults(func=archive)
+
+    p = sub.add_parser("restore", help="Unpack archived months overlapping a range back into hot rows")
+    p.add_argument("--location-id", type=int, required=True)
+    p.add_argument("--start", type=_parse_ts, required=True)
+    p.add_argument("--end", type=_parse_ts, required=True)
+    p.set_defaults(func=restore)
+
+    p = sub.add_parser("stats", help="Show cold tier size")
+    p.set_defaults(func=stats)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Export observations to partitioned Parquet files.
+
+Usage:
+    python -m app.cli.export_observations --location-ids 1,2,3 \
+        --start 2015-01-01T00:00:00Z --end 2025-01-01T00:00:00Z --out exports/training --workers 4
+
+Output is one file per location and year:
+    <out>/location_id=<id>/year=<yyyy>/part-0.parquet
+"""
+import argparse
+import logging
+from datetime import datetime
+
+from app.services.bulk_export import ExportSpec, export_observations
+
+
+def _parse_ts(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export weather observations to Parquet")
+    parser.add_argument("--location-ids", required=True, help="Comma separated location ids")
+    parser.add_argument("--start", required=True, type=_parse_ts, help="ISO 8601 start timestamp")
+    parser.add_argument("--end", required=True, type=_parse_ts, help="ISO 8601 end timestamp (inclusive)")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--compression", default="zstd", choices=["zstd", "snappy", "gzip", "none"])
+    parser.add_argument("--batch-rows", type=int, default=100_000, help="Rows fetched and written per row group")
+    parser.add_argument("--workers", type=int, default=1, help="Partitions exported in parallel")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    spec = ExportSpec(
+        location_ids=[int(x) for x in args.location_ids.split(",") if x.strip()],
+        start_ts=args.start,
+        end_ts=args.end,
+        out_dir=args.out,
+        compression=args.compression,
+        batch_rows=args.batch_rows,
+        workers=args.workers,
+    )
+    print(export_observations(spec))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Bulk import locations from a GeoNames dump (https://download.geonames.org/export/dump/).
+
+Usage:
+    # Populated places with at least 1000 inhabitants, admin1 codes resolved to names
+    python -m app.cli.import_locations allCountries.txt --admin1-codes admin1CodesASCII.txt --min-population 1000
+
+Locations that already exist (same name, admin1 and country, ignoring case and
+extra whitespace) are kept as they are, so re-running an import is harmless.
+Without --admin1-codes, admin1 holds the GeoNames code (e.g. "CA").
+"""
+import argparse
+import logging
+
+from app.services.location_import import GeoNamesOptions, import_geonames, read_admin1_codes
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk import locations from a GeoNames dump")
+    parser.add_argument("path", help="allCountries.txt, citiesN.txt or a country file (tab separated)")
+    parser.add_argument("--admin1-codes", default=None, help="admin1CodesASCII.txt, to store admin1 names")
+    parser.add_argument("--feature-classes", default="P",
+                        help="Comma separated GeoNames feature classes, or 'all' (default: P, populated places)")
+    parser.add_argument("--min-population", type=int, default=0)
+    parser.add_argument("--batch-rows", type=int, default=100_000, help="Rows per COPY batch")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    opts = GeoNamesOptions(
+        feature_classes=None if args.feature_classes == "all" else args.feature_classes.split(","),
+        min_population=args.min_population,
+        admin1_names=read_admin1_codes(args.admin1_codes) if args.admin1_codes else None,
+        batch_rows=args.batch_rows,
+    )
+    print(import_geonames(args.path, opts))
+
+
+if __name__ == "__main__":
+    main()
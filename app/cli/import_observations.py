@@ -0,0 +1,42 @@
+"""
+Bulk import historical observations.
+
+Usage:
+    python -m app.cli.import_observations archive/*.csv --workers 8 --checkpoint-dir .import-state
+
+Files may be CSV (with a header row), NDJSON or Parquet, with columns
+location_id, ts, temp_c and optionally source. Re-running the same command
+with the same --checkpoint-dir resumes an interrupted import.
+"""
+import argparse
+import logging
+import os
+
+from app.services.bulk_import import ImportOptions, import_files
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk import weather observations")
+    parser.add_argument("paths", nargs="+", help="CSV, NDJSON or Parquet files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Parallel worker processes")
+    parser.add_argument("--checkpoint-dir", default=None, help="Directory for resumable checkpoints")
+    parser.add_argument("--batch-mb", type=int, default=16, help="Approximate CSV/NDJSON bytes per COPY batch")
+    parser.add_argument("--batch-rows", type=int, default=200_000, help="Parquet rows per COPY batch")
+    parser.add_argument("--unit-mb", type=int, default=256, help="Bytes of a text file handled by one work unit")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="Seconds between progress lines")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    opts = ImportOptions(
+        checkpoint_dir=args.checkpoint_dir,
+        batch_bytes=args.batch_mb * 1024 * 1024,
+        batch_rows=args.batch_rows,
+        unit_bytes=args.unit_mb * 1024 * 1024,
+    )
+    result = import_files(args.paths, workers=args.workers, opts=opts, progress_interval=args.progress_interval)
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
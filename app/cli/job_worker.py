@@ -0,0 +1,41 @@
+"""
+Run background jobs from the requests table outside the API processes.
+
+Usage:
+    python -m app.cli.job_worker --workers 4
+
+Set JOB_WORKERS=0 on the API to leave all jobs to dedicated workers.
+SIGINT/SIGTERM stops claiming jobs; running jobs are requeued at their next
+progress update.
+"""
+import argparse
+import logging
+import signal
+import threading
+
+from app.core.config import settings
+from app.services.jobs import JobWorkerPool
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run background jobs")
+    parser.add_argument("--workers", type=int, default=max(1, settings.JOB_WORKERS), help="Worker threads")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+
+    pool = JobWorkerPool(args.workers)
+    pool.start()
+    stop.wait()
+    logger.info("Stopping job workers")
+    pool.stop(settings.GRACEFUL_SHUTDOWN_TIMEOUT)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+Delete change-feed tombstones older than CHANGES_RETENTION_DAYS (plus a day).
+
+Usage:
+    # Run daily, e.g. from cron
+    python -m app.cli.purge_tombstones
+"""
+import argparse
+import logging
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.changes import purge_tombstones
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Delete expired change-feed tombstones")
+    parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    with SessionLocal() as db:
+        removed = purge_tombstones(db)
+    logger.info("Removed %d tombstone(s) older than %d days", removed, settings.CHANGES_RETENTION_DAYS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Admission control: adaptive per-class concurrency limits with load shedding.
+
+Every HTTP request falls in one route class, each with its own limit on
+requests in flight in this worker:
+
+- ``heavy``: observation reads, queries, interpolation, anomalies and the change feed
+- ``write``: every other non-GET route
+- ``cheap``: every other GET (location search, job status, ...)
+
+Health checks, /metrics and the SSE stream are never limited. A request
+over its class's limit waits in a bounded FIFO queue (up to
+ADMISSION_QUEUE_FACTOR x the limit) for at most the class's queue timeout,
+then gets a 503 with Retry-After instead of piling up on the database pool.
+
+Limits adapt to latency. Each ADMISSION_WINDOW_S the class compares the
+window's mean latency with its long-run average: while it stays within
+ADMISSION_LATENCY_TOLERANCE times the average the limit grows by its
+square root, up to the class maximum; beyond that it shrinks in proportion,
+down to ADMISSION_MIN_LIMIT. So when Postgres slows down, fewer requests
+are let through and the rest are turned away early and cheaply.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from app.api.responses import fail
+from app.core.config import settings
+from app.core.metrics import (
+    ADMISSION_LIMIT,
+    ADMISSION_QUEUE_WAIT,
+    ADMISSION_SHED,
+    UNMATCHED_ROUTE,
+    route_template,
+)
+
+logger = logging.getLogger(__name__)
+
+EXEMPT_ROUTES = {"/", "/health", "/metrics", "/weather/observations/stream", UNMATCHED_ROUTE}
+HEAVY_ROUTES = {
+    ("GET", "/weather/observations"),
+    ("POST", "/weather/query"),
+    ("GET", "/weather/interpolate"),
+    ("POST", "/weather/interpolate"),
+    ("GET", "/weather/anomalies"),
+    ("GET", "/weather/changes"),
+}
+LONG_RUN_ALPHA = 0.05  # weight of each window in the long-run latency average
+SMOOTHING = 0.2  # fraction of the way the limit moves towards its new value per window
+MIN_WINDOW_SAMPLES = 10
+
+
+def route_class(method: str, route: str) -> Optional[str]:
+    """Class of a request, or None when it is never limited"""
+    if route in EXEMPT_ROUTES:
+        return None
+    if (method, route) in HEAVY_ROUTES:
+        return "heavy"
+    return "cheap" if method in ("GET", "HEAD") else "write"
+
+
+class AdaptiveLimiter:
+    """Concurrency limit of one route class, with a deadline-bounded wait queue"""
+
+    def __init__(self, name: str, max_limit: int, queue_timeout_s: float):
+        self.name = name
+        self.max_limit = max_limit
+        self.min_limit = min(settings.ADMISSION_MIN_LIMIT, max_limit)
+        self.queue_timeout_s = queue_timeout_s
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+        self._window: List[float] = []
+        self._window_started = time.monotonic()
+        self._long_latency: Optional[float] = None
+        ADMISSION_LIMIT.labels(name).set(max_limit)
+
+    @property
+    def queue_size(self) -> int:
+        return max(1, int(self.limit * settings.ADMISSION_QUEUE_FACTOR))
+
+    async def acquire(self) -> Optional[str]:
+        """None once admitted, otherwise why the request is shed: queue_full or timeout"""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return None
+        if len(self._waiters) >= self.queue_size:
+            return "queue_full"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout_s)
+        except asyncio.TimeoutError:
+            if not waiter.done() or waiter.cancelled():
+                return "timeout"
+            # handed a slot just as the deadline passed: take it
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # handed a slot, but the client went away
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            ADMISSION_QUEUE_WAIT.labels(self.name).observe(time.perf_counter() - started)
+        return None
+
+    def release(self, latency_s: Optional[float] = None) -> None:
+        self.in_flight -= 1
+        if latency_s is not None:
+            self._record(latency_s)
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _record(self, latency_s: float) -> None:
+        self._window.append(latency_s)
+        now = time.monotonic()
+        if now - self._window_started < settings.ADMISSION_WINDOW_S or len(self._window) < MIN_WINDOW_SAMPLES:
+            return
+        short = sum(self._window) / len(self._window)
+        self._window = []
+        self._window_started = now
+
+        long = short if self._long_latency is None else self._long_latency
+        gradient = max(0.5, min(1.0, settings.ADMISSION_LATENCY_TOLERANCE * long / short))
+        target = self.limit * gradient + (math.sqrt(self.limit) if gradient >= 1.0 else 0.0)
+        old = self.limit
+        self.limit = min(self.max_limit, max(self.min_limit, self.limit + SMOOTHING * (target - self.limit)))
+        self._long_latency = long + LONG_RUN_ALPHA * (short - long)
+
+        ADMISSION_LIMIT.labels(self.name).set(self.limit)
+        if int(self.limit) < int(old) and gradient < 1.0:
+            logger.info("Admission limit for %s requests lowered to %d (latency %.0f ms vs %.0f ms usual)",
+                        self.name, self.limit, short * 1000, long * 1000)
+
+
+def default_limiters() -> Dict[str, AdaptiveLimiter]:
+    return {
+        "cheap": AdaptiveLimiter("cheap", settings.ADMISSION_CHEAP_LIMIT, settings.ADMISSION_CHEAP_QUEUE_TIMEOUT_S),
+        "heavy": AdaptiveLimiter("heavy", settings.ADMISSION_HEAVY_LIMIT, settings.ADMISSION_HEAVY_QUEUE_TIMEOUT_S),
+        "write": AdaptiveLimiter("write", settings.ADMISSION_WRITE_LIMIT, settings.ADMISSION_WRITE_QUEUE_TIMEOUT_S),
+    }
+
+
+class AdmissionMiddleware:
+    """Admits, queues or sheds each HTTP request by its route class"""
+
+    def __init__(self, app, limiters: Optional[Dict[str, AdaptiveLimiter]] = None):
+        self.app = app
+        self.limiters = limiters if limiters is not None else default_limiters()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        cls = route_class(scope["method"], route_template(scope["app"], scope))
+        if cls is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiters[cls]
+        reason = await limiter.acquire()
+        if reason is not None:
+            ADMISSION_SHED.labels(cls, reason).inc()
+            response = fail(503, "OVERLOADED", "Server is busy, retry shortly", meta={"route_class": cls})
+            response.headers["Retry-After"] = str(settings.ADMISSION_RETRY_AFTER_S)
+            await response(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        latency = None
+        try:
+            await self.app(scope, receive, send)
+            latency = time.perf_counter() - started
+        finally:
+            limiter.release(latency)  # failed requests don't count towards latency
@@ -0,0 +1,61 @@
+"""Single-flight coalescing of identical concurrent reads.
+
+When many clients ask for the same thing at once (a popular location during
+a news story), only the first request (the leader) runs the read; requests
+with the same key that arrive while it is in flight wait for it and get the
+same result, typically the serialized response body. Nothing is cached: the
+key is forgotten as soon as the read finishes, so a request that arrives
+afterwards runs a fresh read.
+
+A follower can therefore get data read a few milliseconds before it
+arrived, never data older than the oldest in-flight read. The work runs in
+the thread pool, off the event loop, so concurrent requests actually
+overlap. If a client disconnects, its read still finishes for the others
+waiting on it.
+
+COALESCED_READS{route, role} counts leaders and followers; the coalescing
+ratio is followers / (leaders + followers).
+"""
+import asyncio
+from typing import Any, Callable, Dict, Hashable, TypeVar
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.metrics import COALESCED_READS
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Shares one in-flight call per key between concurrent callers (one event loop)"""
+
+    def __init__(self):
+        self._flights: Dict[Hashable, "asyncio.Future[Any]"] = {}
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def run(self, route: str, key: Hashable, fn: Callable[[], T]) -> T:
+        """Result of the sync `fn()`, run in the thread pool unless a call with
+        the same key is already in flight"""
+        if not settings.COALESCE_READS_ENABLED:
+            return await run_in_threadpool(fn)
+        flight = self._flights.get(key)
+        if flight is None:
+            COALESCED_READS.labels(route, "leader").inc()
+            flight = asyncio.ensure_future(run_in_threadpool(fn))
+            self._flights[key] = flight
+            flight.add_done_callback(lambda f: self._land(key, f))
+        else:
+            COALESCED_READS.labels(route, "follower").inc()
+        # shield: one caller being cancelled must not cancel the read for the rest
+        return await asyncio.shield(flight)
+
+    def _land(self, key: Hashable, flight: "asyncio.Future[Any]") -> None:
+        self._flights.pop(key, None)
+        if not flight.cancelled():
+            flight.exception()  # retrieved, even if every caller went away
+
+
+read_flights = SingleFlight()
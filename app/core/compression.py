@@ -0,0 +1,195 @@
+"""Response compression negotiated from Accept-Encoding.
+
+Supports zstd and brotli when the optional ``zstandard`` / ``brotli``
+packages are installed, and gzip always. Among the encodings the client
+accepts with the highest q-value, the server prefers zstd, then br, then
+gzip.
+
+Only compressible media types are encoded, and only once the body reaches
+COMPRESSION_MIN_BYTES. Streaming responses are buffered up to that size and
+then compressed chunk by chunk, flushing after each chunk so a consumer
+never waits on the compressor. Chunks of COMPRESSION_OFFLOAD_BYTES or more
+are compressed in a worker thread so large bodies don't block the event loop.
+"""
+import zlib
+from typing import Dict, List, Optional
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/xml",
+    "application/javascript",
+    "text/",
+)
+# Event streams are left alone: intermediaries and EventSource clients cope poorly
+EXCLUDED_TYPES = ("text/event-stream",)
+
+
+def available_encodings() -> List[str]:
+    """Supported encodings in server preference order"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    prefs = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        prefs[name.strip().lower()] = q
+    return prefs
+
+
+def negotiate(header: str) -> Optional[str]:
+    """Encoding to use for an Accept-Encoding header, or None for identity"""
+    prefs = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for encoding in available_encodings():
+        q = prefs.get(encoding, prefs.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    if content_type.startswith(EXCLUDED_TYPES):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES) or "+json" in content_type or "+xml" in content_type
+
+
+class _Encoder:
+    """Incremental compressor; flush() output is decodable up to that point"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compressobj()
+        elif encoding == "br":
+            self._obj = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            self._obj = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, more: bool) -> bytes:
+        if self.encoding == "zstd":
+            out = self._obj.compress(data)
+            tail = self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK) if more else self._obj.flush()
+        elif self.encoding == "br":
+            out = self._obj.process(data)
+            tail = self._obj.flush() if more else self._obj.finish()
+        else:
+            out = self._obj.compress(data)
+            tail = self._obj.flush(zlib.Z_SYNC_FLUSH if more else zlib.Z_FINISH)
+        return out + tail
+
+
+class CompressionMiddleware:
+    """Compresses eligible responses with the negotiated encoding"""
+
+    def __init__(self, app, min_size: Optional[int] = None, offload_size: Optional[int] = None):
+        self.app = app
+        self.min_size = settings.COMPRESSION_MIN_BYTES if min_size is None else min_size
+        self.offload_size = settings.COMPRESSION_OFFLOAD_BYTES if offload_size is None else offload_size
+
+    async def _compress(self, encoder: _Encoder, data: bytes, more: bool) -> bytes:
+        if len(data) >= self.offload_size:
+            return await anyio.to_thread.run_sync(encoder.compress, data, more)
+        return encoder.compress(data, more)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+        encoder: Optional[_Encoder] = None
+        pending: List[bytes] = []
+        pending_size = 0
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough, encoder, pending_size
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if (
+                    "content-encoding" in headers
+                    or message["status"] < 200
+                    or message["status"] in (204, 304)
+                    or not is_compressible(headers.get("content-type", ""))
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message  # held until we know the body size
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+
+            if encoder is not None:
+                await send({"type": "http.response.body", "body": await self._compress(encoder, body, more), "more_body": more})
+                return
+
+            pending.append(body)
+            pending_size += len(body)
+            headers = MutableHeaders(raw=list(start_message["headers"]))
+            headers.add_vary_header("Accept-Encoding")
+
+            if pending_size < self.min_size:
+                if more:
+                    return
+                await send({**start_message, "headers": headers.raw})
+                await send({"type": "http.response.body", "body": b"".join(pending), "more_body": False})
+                return
+
+            encoder = _Encoder(encoding)
+            data = await self._compress(encoder, b"".join(pending), more)
+            pending.clear()
+            headers["content-encoding"] = encoding
+            if more:
+                del headers["content-length"]
+            else:
+                headers["content-length"] = str(len(data))
+            await send({**start_message, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": data, "more_body": more})
+
+        await self.app(scope, receive, send_wrapper)
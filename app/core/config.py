@@ -11,10 +11,119 @@ class Settings(BaseSettings):
 
     @property
     def sqlalchemy_url(self) -> str:
-        return f"postgresql+psycopg2://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+        return f"postgresql+psycopg://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+
+    # Connection pool, per worker process
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+
+    # Query instrumentation (opt-in)
+    DB_INSTRUMENTATION: bool = False
+    SLOW_QUERY_MS: float = 200.0
+    SLOW_QUERY_EXPLAIN: bool = True
+    QUERY_BUDGET_PER_REQUEST: int = 20
 
      # OpenWeather API
     OPENWEATHER_API_KEY:  Optional[str] = None
+    GEOCODING_API_KEY: Optional[str] = None
+
+    # Background jobs (app/services/jobs.py)
+    JOB_WORKERS: int = 2  # job threads per API process; 0 leaves jobs to app.cli.job_worker
+    JOB_POLL_INTERVAL_S: float = 1.0
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_S: float = 30.0  # doubled after every failed attempt
+    JOB_STALE_AFTER_S: int = 300
+    JOB_INLINE_MAX_HOURS: int = 168  # longer backfills and deletes become jobs
+
+    # Write-behind ingest buffer (app/services/ingest.py), per worker process
+    INGEST_BUFFER_ENABLED: bool = True
+    INGEST_BUFFER_MAX_ROWS: int = 50_000
+    INGEST_BATCH_ROWS: int = 2_000
+    INGEST_FLUSH_INTERVAL_S: float = 0.5
+    INGEST_ENQUEUE_TIMEOUT_S: float = 1.0  # wait this long for room before answering 503
+    INGEST_MAX_FLUSH_ATTEMPTS: int = 5  # readings are dropped after this many failed flushes (database down doesn't count)
+    INGEST_KNOWN_LOCATIONS: int = 100_000  # location ids remembered as existing
+
+    # Fuzzy location resolution cache (app/services/location_resolver.py), per worker process
+    LOCATION_CACHE_SIZE: int = 10_000
+    LOCATION_CACHE_TTL_S: float = 300.0  # bounds how long other workers miss a newly created location
+    LOCATION_BATCH_MAX: int = 10_000  # per /locations/batch request
+    LOCATION_INSERT_CHUNK: int = 1000  # rows per INSERT ... ON CONFLICT DO NOTHING
+
+    # Live observation push (app/services/live.py)
+    LIVE_ENABLED: bool = True
+    LIVE_NOTIFY: bool = False  # fan out through Postgres LISTEN/NOTIFY so every worker sees every write
+    LIVE_QUEUE_SIZE: int = 256  # events a subscriber may fall behind before it is dropped
+    LIVE_HEARTBEAT_S: float = 15.0
+    LIVE_MAX_LOCATIONS: int = 100  # per subscription
+
+    # Observation reads
+    RESAMPLE_MAX_GAP_S: int = 10800  # default widest gap between observations that resampling fills
+    RESAMPLE_CHUNK_POINTS: int = 50_000  # grid points resampled (and streamed) per chunk
+    RESAMPLE_MAX_POINTS: int = 100_000  # grid points per JSON response; format=ndjson has no limit
+    STREAM_WINDOW_DAYS: int = 30  # days of raw observations read per chunk for format=ndjson
+    LATEST_CACHE_SIZE: int = 50_000  # locations whose latest reading is cached per worker
+    LATEST_CACHE_TTL_S: float = 5.0  # how stale another worker's writes may look
+    LATEST_MAX_LOCATIONS: int = 1000  # per /weather/latest request
+    COVERAGE_MAX_GAPS: int = 1000  # missing ranges listed per /weather/coverage response
+    COALESCE_READS_ENABLED: bool = True  # identical concurrent reads share one query and response body
+
+    # Change feed (app/services/changes.py)
+    CHANGES_PAGE_SIZE: int = 1000
+    CHANGES_MAX_PAGE_SIZE: int = 10_000
+    CHANGES_RETENTION_DAYS: int = 30  # tombstones are kept, and cursors stay valid, this long
+
+    # Spatial interpolation (app/services/spatial.py)
+    SPATIAL_CELL_DEG: float = 1.0  # station index cell size
+    SPATIAL_MAX_DISTANCE_KM: float = 250.0  # stations further away are never used
+    SPATIAL_CANDIDATE_FACTOR: int = 3  # candidates per point = factor * k, for stations without data
+    SPATIAL_INDEX_TTL_S: float = 300.0
+    SPATIAL_MAX_POINTS: int = 10_000  # per request
+
+    # Climatology normals (app/services/climatology.py)
+    CLIMATOLOGY_WINDOW_DAYS: int = 7  # pool samples from this many days either side of each calendar day
+    CLIMATOLOGY_MIN_SAMPLES: int = 30  # cells with fewer samples get no z-score / percentile
+
+    # Range deletes
+    DELETE_BATCH_ROWS: int = 10000
+
+    # Bulk import / export
+    IMPORT_DIR: str = "imports"
+    EXPORT_DIR: str = "exports"
+    EXPORT_MAX_WORKERS: int = 4
+
+    # Server (python run.py --prod)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    WEB_CONCURRENCY: Optional[int] = None  # worker processes; defaults to the CPU count
+    KEEPALIVE_TIMEOUT: int = 75  # above common load balancer idle timeouts (60s)
+    BACKLOG: int = 2048
+    GRACEFUL_SHUTDOWN_TIMEOUT: int = 30
+    FORWARDED_ALLOW_IPS: str = "127.0.0.1"  # proxies trusted for X-Forwarded-For/Proto; comma separated, "*" trusts anyone
+    ACCESS_LOG: bool = True
+    HTTP_WARMUP: bool = True
+
+    # Admission control (app/core/admission.py); limits are per worker and adapt downwards from these
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_CHEAP_LIMIT: int = 64
+    ADMISSION_HEAVY_LIMIT: int = 16
+    ADMISSION_WRITE_LIMIT: int = 32
+    ADMISSION_MIN_LIMIT: int = 2
+    ADMISSION_CHEAP_QUEUE_TIMEOUT_S: float = 0.5
+    ADMISSION_HEAVY_QUEUE_TIMEOUT_S: float = 2.0
+    ADMISSION_WRITE_QUEUE_TIMEOUT_S: float = 1.0
+    ADMISSION_QUEUE_FACTOR: float = 1.0  # waiters allowed per unit of limit
+    ADMISSION_LATENCY_TOLERANCE: float = 2.0  # shrink limits once latency exceeds this x the usual
+    ADMISSION_WINDOW_S: float = 1.0
+    ADMISSION_RETRY_AFTER_S: int = 1
+
+    # Response compression
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_BYTES: int = 1024
+    COMPRESSION_OFFLOAD_BYTES: int = 1_048_576  # compress chunks this large in a worker thread
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
 
     # API
     API_V1_STR: str = "/api/v1"
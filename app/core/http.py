@@ -0,0 +1,46 @@
+"""Process-wide httpx clients shared by the upstream API services.
+
+One pooled AsyncClient per event loop keeps connections to upstream APIs
+alive between requests instead of opening a new client for every call. The
+server loop's client is created by the app lifespan before the worker accepts
+traffic and closed on shutdown; other loops (background job threads, CLIs,
+benchmarks) get one lazily and close it with close_http_client().
+"""
+import asyncio
+import logging
+import weakref
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Client bound to the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=5.0,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def start_http_client(warmup_urls=()) -> None:
+    """Create the client and open pooled connections to `warmup_urls` (best effort)"""
+    client = get_http_client()
+    for url in warmup_urls:
+        try:
+            await client.head(url, timeout=2.0)
+        except httpx.HTTPError as e:
+            logger.warning("HTTP warmup of %s failed: %s", url, e)
+
+
+async def close_http_client() -> None:
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
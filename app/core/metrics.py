@@ -0,0 +1,170 @@
+"""Prometheus metrics for HTTP traffic, SQL queries, upstream API calls, live
+subscriptions, the ingest buffer, read coalescing and admission control.
+
+Route labels use the route template (``/weather/exports/{job_id}``), never the
+raw path, so label cardinality stays bounded. SQL metrics are attributed to
+the route whose request issued the query through a context variable; queries
+outside a request are labelled ``<background>``.
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+UNMATCHED_ROUTE = "<unmatched>"
+BACKGROUND_ROUTE = "<background>"
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests being served", ["method", "route"], multiprocess_mode="livesum"
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "HTTP response body size", ["method", "route"], buckets=SIZE_BUCKETS
+)
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed", ["route"])
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "SQL statement latency", ["route"], buckets=LATENCY_BUCKETS
+)
+UPSTREAM_DURATION = Histogram(
+    "upstream_request_duration_seconds", "Upstream API call latency", ["service", "operation"], buckets=LATENCY_BUCKETS
+)
+UPSTREAM_ERRORS = Counter("upstream_errors_total", "Failed upstream API calls", ["service", "operation", "error"])
+INGEST_BUFFERED = Gauge("ingest_buffered_readings", "Readings waiting in the ingest buffer", multiprocess_mode="livesum")
+INGEST_FLUSHED = Counter("ingest_flushed_readings_total", "Buffered readings written to the database")
+INGEST_REJECTED = Counter("ingest_rejected_readings_total", "Readings refused because the ingest buffer was full")
+INGEST_DROPPED = Counter("ingest_dropped_readings_total", "Accepted readings that could not be written")
+LOCATION_CACHE_LOOKUPS = Counter("location_cache_lookups_total", "Fuzzy location resolutions", ["result"])
+LATEST_CACHE_LOOKUPS = Counter("latest_cache_lookups_total", "Latest-reading lookups per location", ["result"])
+COALESCED_READS = Counter(
+    "coalesced_reads_total", "Reads that ran a query (leader) or shared one in flight (follower)", ["route", "role"]
+)
+ADMISSION_LIMIT = Gauge(
+    "admission_limit", "Current concurrency limit per route class", ["route_class"], multiprocess_mode="livesum"
+)
+ADMISSION_SHED = Counter("admission_shed_total", "Requests refused with 503 by admission control", ["route_class", "reason"])
+ADMISSION_QUEUE_WAIT = Histogram(
+    "admission_queue_wait_seconds", "Time requests waited for an admission slot", ["route_class"], buckets=LATENCY_BUCKETS
+)
+LIVE_SUBSCRIBERS = Gauge("live_subscribers", "Open SSE / WebSocket observation subscriptions", multiprocess_mode="livesum")
+INGEST_FLUSH_DURATION = Histogram(
+    "ingest_flush_duration_seconds", "Ingest buffer flush latency", buckets=LATENCY_BUCKETS
+)
+
+_current_route: ContextVar[str] = ContextVar("metrics_route", default=BACKGROUND_ROUTE)
+
+
+def route_template(app, scope) -> str:
+    """Template of the route that will serve `scope`, or UNMATCHED_ROUTE"""
+    partial: Optional[str] = None
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or UNMATCHED_ROUTE
+
+
+class PrometheusMiddleware:
+    """Records latency, in-flight count and response size per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope["app"], scope)
+        token = _current_route.set(route)
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_DURATION.labels(method, route, str(status)).observe(time.perf_counter() - started)
+            HTTP_RESPONSE_SIZE.labels(method, route).observe(size)
+            in_flight.dec()
+            _current_route.reset(token)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Count and time every statement executed on `engine`"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_query_start"].pop()
+        route = _current_route.get()
+        DB_QUERIES.labels(route).inc()
+        DB_QUERY_DURATION.labels(route).observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("metrics_query_start") if context.connection else None
+        if starts:
+            starts.pop()
+
+
+@contextmanager
+def track_upstream(service: str, operation: str):
+    """Time an upstream call and count it as an error if it raises"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        UPSTREAM_ERRORS.labels(service, operation, type(e).__name__).inc()
+        raise
+    finally:
+        UPSTREAM_DURATION.labels(service, operation).observe(time.perf_counter() - started)
+
+
+def mark_worker_dead() -> None:
+    """On worker exit in multiprocess mode: drop this process's livesum gauges from /metrics"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def render_latest():
+    """(body, content type) for the /metrics endpoint, aggregating workers in multiprocess mode"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -1,4 +1,5 @@
 # Import all models here for Alembic to detect them
 
 from app.db.base_class import Base  # noqa
-from app.models.weather import Location, WeatherObservation  # noqa
\ No newline at end of file
+from app.models.weather import Location, WeatherObservation, LatestObservation, ObservationCoverage, ObservationTombstone, ObservationArchive, ClimatologyNormal, ClimatologyBuild  # noqa
+from app.models.request import Request  # noqa
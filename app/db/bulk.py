@@ -0,0 +1,39 @@
+# app/db/bulk.py
+"""COPY helpers for loading large row sets through the shared engine.
+
+These drop down to the psycopg connection behind a SQLAlchemy ``Connection``
+so they run inside the caller's transaction.
+"""
+from typing import Iterable, Optional, Sequence
+
+from sqlalchemy.engine import Connection
+
+
+def _driver_cursor(conn: Connection):
+    return conn.connection.driver_connection.cursor()
+
+
+def copy_in(
+    conn: Connection,
+    table: str,
+    columns: Sequence[str],
+    data: Optional[Iterable[bytes]] = None,
+    rows: Optional[Iterable[Sequence]] = None,
+    fmt: str = "csv",
+) -> None:
+    """COPY into `table`, either from raw `data` chunks in `fmt` or from Python `rows`"""
+    cols = ", ".join(columns)
+    if rows is not None:
+        sql = f"COPY {table} ({cols}) FROM STDIN"
+    else:
+        sql = f"COPY {table} ({cols}) FROM STDIN WITH (FORMAT {fmt})"
+
+    with _driver_cursor(conn) as cur:
+        with cur.copy(sql) as copy:
+            if rows is not None:
+                for row in rows:
+                    copy.write_row(row)
+            else:
+                for chunk in data or ():
+                    copy.write(chunk)
+
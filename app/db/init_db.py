@@ -1,34 +1,21 @@
+from datetime import datetime, timedelta, timezone
+
 from sqlalchemy.orm import Session
-from app.db.base_class import Base
-from app.models.user import User
-from app.models.request import Request
-from app.models.weather import Weather
-from app.core.security import get_password_hash
-# app/models/__init__.py
-from .location import Location
-from .weather_observation import WeatherObservation
-from .weather_request import WeatherRequest
 
-def init_db(db: Session) -> None:
-    """Initialize database with seed data"""
-    
+from app.models.weather import Location
+from app.services.synthetic import create_locations, load_observations
+
+
+def init_db(db: Session, locations: int = 10, days: int = 30, seed: int = 0) -> None:
+    """Seed an empty database with a small synthetic dataset for local development"""
+
     # Check if we already have data
-    user = db.query(User).first()
-    if user:
+    if db.query(Location).first():
         return
-    
-    # Create initial user
-    user = User(
-        email="admin@example.com",
-        hashed_password=get_password_hash("admin123"),
-        is_active=True,
-        is_superuser=True
-    )
-    db.add(user)
-    
-    # Commit the changes
-    db.commit()
-    print("Database initialized with seed data")
+
+    end = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    load_observations(create_locations(locations, seed), end - timedelta(days=days), end, seed=seed)
+    print(f"Database initialized with {locations} synthetic locations and {days} days of hourly data")
 
 if __name__ == "__main__":
     from app.db.session import SessionLocal
@@ -0,0 +1,150 @@
+# app/db/instrumentation.py
+"""Opt-in query instrumentation: slow-query log and per-request query budget.
+
+Enabled with DB_INSTRUMENTATION=true. Every statement is reduced to a
+fingerprint (literals and bind parameters replaced by ``?``, IN lists
+collapsed) so repeated executions of the same query can be grouped.
+
+- Statements slower than SLOW_QUERY_MS are logged with their duration, row
+  count and, for SELECTs when SLOW_QUERY_EXPLAIN is on, the EXPLAIN plan.
+- QueryBudgetMiddleware counts statements per request and logs a warning
+  naming the most repeated fingerprints when a request runs more than
+  QUERY_BUDGET_PER_REQUEST of them, which is how N+1 patterns show up.
+"""
+import hashlib
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PARAMS = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    sql = _COMMENTS.sub(" ", statement)
+    sql = _STRINGS.sub("?", sql)
+    sql = _PARAMS.sub("?", sql)
+    sql = _NUMBERS.sub("?", sql)
+    sql = _IN_LISTS.sub("(?...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def fingerprint(statement: str) -> str:
+    return hashlib.sha1(normalize_statement(statement).encode()).hexdigest()[:12]
+
+
+@dataclass
+class RequestQueryStats:
+    count: int = 0
+    total_ms: float = 0.0
+    fingerprints: Counter = field(default_factory=Counter)
+    samples: dict = field(default_factory=dict)
+
+
+_request_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+def _explain(cursor, statement: str, parameters) -> Optional[str]:
+    # Runs on the caller's connection: inside a savepoint (psycopg's transaction()
+    # nests as one), so a failed EXPLAIN doesn't abort the caller's transaction
+    try:
+        with cursor.connection.transaction(), cursor.connection.cursor() as explain_cursor:
+            explain_cursor.execute("EXPLAIN " + statement, parameters)
+            return "\n".join(row[0] for row in explain_cursor.fetchall())
+    except Exception as e:
+        return f"<EXPLAIN failed: {e}>"
+
+
+def instrument_queries(engine: Engine) -> None:
+    """Attach the slow-query log and per-request accounting to `engine`"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("instrumentation_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["instrumentation_query_start"].pop()) * 1000
+        fp = fingerprint(statement)
+
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.count += 1
+            stats.total_ms += elapsed_ms
+            stats.fingerprints[fp] += 1
+            stats.samples.setdefault(fp, normalize_statement(statement))
+
+        if elapsed_ms >= settings.SLOW_QUERY_MS:
+            plan = None
+            if settings.SLOW_QUERY_EXPLAIN and not executemany and statement.lstrip().upper().startswith("SELECT"):
+                plan = _explain(cursor, statement, parameters)
+            logger.warning(
+                "Slow query %s: %.1f ms, %s rows\n%s%s",
+                fp,
+                elapsed_ms,
+                cursor.rowcount,
+                normalize_statement(statement),
+                f"\n{plan}" if plan else "",
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("instrumentation_query_start") if context.connection else None
+        if starts:
+            starts.pop()
+
+
+class QueryBudgetMiddleware:
+    """Counts statements per request; reports the count in X-DB-Query-Count and
+    warns when a request goes over QUERY_BUDGET_PER_REQUEST"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = _request_stats.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(stats.count).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            if stats.count > settings.QUERY_BUDGET_PER_REQUEST:
+                repeated = ", ".join(
+                    f"{n}x {stats.samples[fp]!r}" for fp, n in stats.fingerprints.most_common(3)
+                )
+                logger.warning(
+                    "Query budget exceeded: %s %s ran %d queries (%.1f ms, budget %d); most repeated: %s",
+                    scope["method"],
+                    scope["path"],
+                    stats.count,
+                    stats.total_ms,
+                    settings.QUERY_BUDGET_PER_REQUEST,
+                    repeated,
+                )
@@ -6,11 +6,29 @@ from app.core.config import settings
 engine = create_engine(
     settings.sqlalchemy_url,
     pool_pre_ping=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
 )
 
+if settings.DB_INSTRUMENTATION:
+    from app.db.instrumentation import instrument_queries
+    instrument_queries(engine)
+
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 Base = declarative_base()
 
+def warm_pool(n: int = settings.DB_POOL_SIZE) -> None:
+    """Open `n` pooled connections up front so the first requests don't pay for connecting"""
+    conns = []
+    try:
+        for _ in range(n):
+            conn = engine.connect()
+            conns.append(conn)
+            conn.exec_driver_sql("SELECT 1")
+    finally:
+        for conn in conns:
+            conn.close()
+
 def get_db():
     from sqlalchemy.orm import Session
     db: Session = SessionLocal()
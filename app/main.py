@@ -1,11 +1,54 @@
-from fastapi import FastAPI, Depends
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Depends, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import text
 from sqlalchemy.orm import Session
-from app.api.routes import weather, locations
-from app.db.session import get_db
+from app.api.responses import ORJSONResponse
+from app.api.routes import weather, locations, exports, jobs, live, spatial, changes
+from app.core.admission import AdmissionMiddleware
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings
+from app.core.http import close_http_client, start_http_client
+from app.core.metrics import PrometheusMiddleware, instrument_engine, mark_worker_dead, render_latest
+from app.db.session import engine, get_db, warm_pool
+from app.services.ingest import ingest_buffer
+from app.services.jobs import JobWorkerPool
+from app.services.live import broker
+from app.services.weather import weather_service
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs in every worker before it accepts traffic
+    try:
+        await run_in_threadpool(warm_pool)
+    except Exception as e:
+        logger.warning("Database pool warmup failed: %s", e)
+    await start_http_client([weather_service.base_url] if settings.HTTP_WARMUP and weather_service.api_key else [])
+    await broker.start()
+    if settings.INGEST_BUFFER_ENABLED:
+        await ingest_buffer.start()
+    job_pool = JobWorkerPool(settings.JOB_WORKERS)
+    if settings.JOB_WORKERS > 0:
+        job_pool.start()
+    yield
+    # In-flight requests have drained by the time the server runs shutdown, so
+    # the ingest buffer is complete; running jobs are requeued at their next
+    # progress update
+    await ingest_buffer.stop(settings.GRACEFUL_SHUTDOWN_TIMEOUT)
+    await run_in_threadpool(job_pool.stop, settings.GRACEFUL_SHUTDOWN_TIMEOUT)
+    await broker.stop()
+    await close_http_client()
+    engine.dispose()
+    mark_worker_dead()
 
-app = FastAPI(title="Weather API", version="1.0.0")
+
+app = FastAPI(title="Weather API", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -16,9 +59,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request query budget (opt-in, see app/db/instrumentation.py)
+if settings.DB_INSTRUMENTATION:
+    from app.db.instrumentation import QueryBudgetMiddleware
+    app.add_middleware(QueryBudgetMiddleware)
+
+# Response compression (inside metrics, so response sizes are wire sizes)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# Admission control: sheds load with fast 503s before it reaches the database
+# (inside metrics, so shed requests are counted)
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+
+# Prometheus metrics (outermost, so it times everything below it)
+app.add_middleware(PrometheusMiddleware)
+instrument_engine(engine)
+
 # Include routers
 app.include_router(weather.router)
 app.include_router(locations.router)
+app.include_router(exports.router)
+app.include_router(jobs.router)
+app.include_router(live.router)
+app.include_router(spatial.router)
+app.include_router(changes.router)
 
 @app.get("/")
 async def root():
@@ -34,4 +100,9 @@ async def db_health(db: Session = Depends(get_db)):
         result = db.execute(text("SELECT 1")).scalar()
         return {"database": "connected", "result": result}
     except Exception as e:
-        return {"database": "error", "details": str(e)}
\ No newline at end of file
+        return {"database": "error", "details": str(e)}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, Text, JSON, Boolean, Index, text
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+class Request(Base):
+    """A background job (backfill, import, delete, export) run by app.services.jobs"""
+    __tablename__ = "requests"
+    __table_args__ = (
+        # The claim query only ever looks at queued rows
+        Index("ix_requests_queued_run_after", "run_after", postgresql_where=text("status = 'queued'")),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=True)
+    location = Column(String, nullable=True)  # human readable target, e.g. "location 42"
+    request_type = Column(String, nullable=False)  # job type: backfill, import, delete, export
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    status = Column(String, nullable=False, server_default="queued")  # queued, running, completed, failed, cancelled
+    params = Column(JSON, nullable=False)
+    progress = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    error_message = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, server_default="0")
+    max_attempts = Column(Integer, nullable=False, server_default="3")
+    run_after = Column(DateTime(timezone=True), nullable=False, server_default=func.now())  # retry backoff
+    cancel_requested = Column(Boolean, nullable=False, server_default="false")
+    locked_by = Column(String, nullable=True)  # worker id while running
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
@@ -1,10 +1,16 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, Text, JSON, ForeignKey
-from sqlalchemy.sql import func
+from sqlalchemy import BigInteger, Column, Date, Index, Integer, SmallInteger, String, DateTime, Float, Text, JSON, ForeignKey, UniqueConstraint, LargeBinary
+from sqlalchemy.dialects.postgresql import BIT
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 
 class Location(Base):
     __tablename__ = "locations"
+    __table_args__ = (
+        # location_key(): lowercased, whitespace-collapsed, null as '' (defined in the migration)
+        Index("ux_locations_name_admin1_country", func.location_key(text("name")), func.location_key(text("admin1")),
+              func.location_key(text("country")), unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False, index=True)
@@ -16,6 +22,10 @@ class Location(Base):
 
 class WeatherObservation(Base):
     __tablename__ = "weather_observations"
+    __table_args__ = (
+        UniqueConstraint("location_id", "ts", name="uq_weather_observations_location_id_ts"),
+        Index("ix_weather_observations_change_xid", "change_xid", "id", postgresql_where=text("change_xid IS NOT NULL")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     location_id = Column(Integer, ForeignKey("locations.id"), nullable=False)
@@ -24,9 +34,94 @@ class WeatherObservation(Base):
     source = Column(String, nullable=True)  # data source
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Id of the transaction that last wrote the row (change feed position, app.services.changes);
+    # set by a column default on insert and a trigger on update. Null for rows older than the feed.
+    change_xid = Column(BigInteger, nullable=True, server_default=text("pg_current_xact_id()::text::bigint"))
 
     # Relationships
     location = relationship("Location", back_populates="observations")
 
 # Add relationship to Location
-Location.observations = relationship("WeatherObservation", back_populates="location")
\ No newline at end of file
+Location.observations = relationship("WeatherObservation", back_populates="location")
+
+class LatestObservation(Base):
+    """Newest observation per location, kept current by triggers on weather_observations"""
+    __tablename__ = "latest_observations"
+
+    location_id = Column(Integer, ForeignKey("locations.id", ondelete="CASCADE"), primary_key=True)
+    ts = Column(DateTime(timezone=True), nullable=False)
+    temp_c = Column(Float, nullable=False)
+    source = Column(String, nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+class ObservationCoverage(Base):
+    """Which UTC hours of a location-month have observations (app.services.coverage)"""
+    __tablename__ = "observation_coverage"
+
+    location_id = Column(Integer, ForeignKey("locations.id", ondelete="CASCADE"), primary_key=True)
+    month = Column(Date, primary_key=True)  # first day of the UTC month
+    hours = Column(BIT(744), nullable=False)  # bit i: hour i of the month has data; bits past the month's end are 0
+
+class ObservationTombstone(Base):
+    """A deleted observation, kept for the change feed until CHANGES_RETENTION_DAYS pass"""
+    __tablename__ = "observation_tombstones"
+    __table_args__ = (
+        UniqueConstraint("location_id", "ts", name="uq_observation_tombstones_location_id_ts"),
+        Index("ix_observation_tombstones_change_xid", "change_xid", "id"),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    location_id = Column(Integer, ForeignKey("locations.id", ondelete="CASCADE"), nullable=False)
+    ts = Column(DateTime(timezone=True), nullable=False)
+    change_xid = Column(BigInteger, nullable=False)  # id of the deleting transaction
+    deleted_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+class ObservationArchive(Base):
+    """Cold tier: one Gorilla-encoded blob per location and UTC month"""
+    __tablename__ = "observation_archives"
+    __table_args__ = (
+        UniqueConstraint("location_id", "period_start", name="uq_observation_archives_location_id_period_start"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    location_id = Column(Integer, ForeignKey("locations.id"), nullable=False)
+    period_start = Column(DateTime(timezone=True), nullable=False)  # first instant of the month
+    period_end = Column(DateTime(timezone=True), nullable=False)  # first instant of the next month
+    point_count = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)  # app.services.gorilla encoded (ts, temp_c) pairs
+    sources = Column(JSON, nullable=False)  # run-length encoded [[source, count], ...]
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ClimatologyNormal(Base):
+    """Temperature normals per location, calendar day and UTC hour (app.services.climatology)"""
+    __tablename__ = "climatology_normals"
+
+    location_id = Column(Integer, ForeignKey("locations.id", ondelete="CASCADE"), primary_key=True)
+    day_of_year = Column(SmallInteger, primary_key=True)  # 1-366 on a leap-year calendar (Mar 1 is always 61)
+    hour = Column(SmallInteger, primary_key=True)  # UTC
+    samples = Column(Integer, nullable=False)
+    mean = Column(Float, nullable=False)
+    stddev = Column(Float, nullable=True)  # null with fewer than 2 samples
+    p01 = Column(Float, nullable=False)
+    p05 = Column(Float, nullable=False)
+    p10 = Column(Float, nullable=False)
+    p25 = Column(Float, nullable=False)
+    p50 = Column(Float, nullable=False)
+    p75 = Column(Float, nullable=False)
+    p90 = Column(Float, nullable=False)
+    p95 = Column(Float, nullable=False)
+    p99 = Column(Float, nullable=False)
+
+class ClimatologyBuild(Base):
+    """When a location's normals were last built, and from what"""
+    __tablename__ = "climatology_builds"
+
+    location_id = Column(Integer, ForeignKey("locations.id", ondelete="CASCADE"), primary_key=True)
+    built_at = Column(DateTime(timezone=True), nullable=False)
+    # Change-feed watermark when built (app.services.changes): writes and tombstones at or above it
+    # make the normals stale. Null: unknown, rebuild.
+    change_xid = Column(BigInteger, nullable=True)
+    observations = Column(Integer, nullable=False)
+    first_ts = Column(DateTime(timezone=True), nullable=True)
+    last_ts = Column(DateTime(timezone=True), nullable=True)
+    window_days = Column(Integer, nullable=False)
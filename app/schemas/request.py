@@ -1,17 +1,18 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Dict, Optional
 from datetime import datetime
 
 
 class RequestBase(BaseModel):
-    location: str
-    request_type: str  # "current", "forecast", "historical"
+    location: Optional[str] = None  # human readable target, e.g. "location 42"
+    request_type: str  # job type: "backfill", "import", "delete", "export"
     latitude: Optional[float] = None
     longitude: Optional[float] = None
 
 
 class RequestCreate(RequestBase):
-    pass
+    params: Dict[str, Any] = {}
+    max_attempts: Optional[int] = None
 
 
 class RequestUpdate(BaseModel):
@@ -23,9 +24,16 @@ class RequestUpdate(BaseModel):
 class RequestInDBBase(RequestBase):
     id: int
     user_id: Optional[int] = None
-    status: str
+    status: str  # "queued", "running", "completed", "failed", "cancelled"
+    params: Dict[str, Any] = {}
+    progress: Optional[Dict[str, Any]] = None
+    result: Optional[Dict[str, Any]] = None
     error_message: Optional[str] = None
+    attempts: int = 0
+    max_attempts: int = 3
+    cancel_requested: bool = False
     created_at: datetime
+    started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
 
     class Config:
@@ -37,4 +45,6 @@ class Request(RequestInDBBase):
 
 
 class RequestInDB(RequestInDBBase):
-    pass 
\ No newline at end of file
+    run_after: datetime
+    locked_by: Optional[str] = None
+    heartbeat_at: Optional[datetime] = None
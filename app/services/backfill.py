@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.models.weather import Location
+from app.services.cold_storage import as_utc
+from app.services.coverage import missing_ranges
+from app.services.observations import upsert_observations
+from app.services.weather import weather_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill_observations(db: Session, location: Location, start_ts: datetime, end_ts: datetime,
+                                force: bool = False) -> Optional[int]:
+    """Fetch hourly history for a location from OpenWeather and upsert it.
+    Only the span from the first to the last hour without data is fetched, unless
+    `force` re-fetches the whole range (e.g. to replace corrected readings).
+    Returns the number of observations stored, or None if the upstream call failed."""
+    if location.latitude is None or location.longitude is None:
+        logger.warning(f"Location {location.id} has no coordinates, cannot backfill")
+        return None
+
+    start_ts, end_ts = as_utc(start_ts), as_utc(end_ts)
+    if not force:
+        missing = missing_ranges(db, location.id, start_ts, end_ts)["missing"]
+        if not missing:
+            return 0
+        start_ts, end_ts = max(start_ts, missing[0][0]), min(end_ts, missing[-1][1])
+
+    observations = await weather_service.get_historical_weather(
+        location.latitude, location.longitude, start_ts, end_ts
+    )
+    if observations is None:
+        return None
+
+    upsert_observations(db, location.id, observations)
+    db.commit()
+    return len(observations)
@@ -0,0 +1,167 @@
+"""Bulk export of observations to partitioned Parquet files.
+
+Each (location_id, year) pair is one partition, written to
+``<out_dir>/location_id=<id>/year=<yyyy>/part-0.parquet`` (Hive layout, so
+pyarrow/pandas/Spark/DuckDB read the directory as one dataset). Rows are
+streamed from a server-side cursor and written one row group at a time, so
+memory stays constant regardless of the range size. Points from the cold
+tier that no hot row replaces are appended as a final row group. Partitions
+can be exported in parallel, each on its own pooled connection.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, select
+
+from app.db.session import SessionLocal, engine
+from app.models.weather import WeatherObservation
+from app.services.cold_storage import read_archived
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ExportSpec:
+    location_ids: Sequence[int]
+    start_ts: datetime
+    end_ts: datetime
+    out_dir: str = ""
+    compression: str = "zstd"
+    batch_rows: int = 100_000
+    workers: int = 1
+
+
+@dataclass
+class ExportProgress:
+    partitions_total: int = 0
+    partitions_done: int = 0
+    rows: int = 0
+    files: List[str] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, rows: int, path: Optional[str]) -> None:
+        with self._lock:
+            self.partitions_done += 1
+            self.rows += rows
+            if path:
+                self.files.append(path)
+
+
+def _arrow_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("location_id", pa.int32()),
+        ("ts", pa.timestamp("us", tz="UTC")),
+        ("temp_c", pa.float64()),
+        ("source", pa.string()),
+    ])
+
+
+def plan_partitions(spec: ExportSpec) -> List[Tuple[int, datetime, datetime]]:
+    """Split the export into (location_id, start, end) slices on UTC year boundaries"""
+    start = spec.start_ts.astimezone(timezone.utc)
+    end = spec.end_ts.astimezone(timezone.utc)
+    parts = []
+    for location_id in spec.location_ids:
+        for year in range(start.year, end.year + 1):
+            lo = max(start, datetime(year, 1, 1, tzinfo=timezone.utc))
+            hi = min(end, datetime(year + 1, 1, 1, tzinfo=timezone.utc))
+            parts.append((location_id, lo, hi))
+    return parts
+
+
+def export_partition(spec: ExportSpec, location_id: int, lo: datetime, hi: datetime) -> Tuple[int, Optional[str]]:
+    """Stream one partition into its Parquet file. Returns (rows, path or None when empty)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema()
+    # The last slice of the requested range is inclusive of end_ts, like the read routes
+    inclusive = hi == spec.end_ts.astimezone(timezone.utc)
+    upper = WeatherObservation.ts <= hi if inclusive else WeatherObservation.ts < hi
+    stmt = (
+        select(WeatherObservation.location_id, WeatherObservation.ts, WeatherObservation.temp_c, WeatherObservation.source)
+        .where(and_(WeatherObservation.location_id == location_id, WeatherObservation.ts >= lo, upper))
+        .order_by(WeatherObservation.ts)
+    )
+
+    part_dir = Path(spec.out_dir) / f"location_id={location_id}" / f"year={lo.year}"
+    final_path = part_dir / "part-0.parquet"
+    tmp_path = part_dir / "part-0.parquet.tmp"
+    writer = None
+    rows = 0
+
+    # At most one location-year of archived points is held in memory
+    with SessionLocal() as db:
+        cold = {
+            p["ts"]: (location_id, p["ts"], p["temp_c"], p["source"])
+            for p in read_archived(db, location_id, lo, hi)
+            if inclusive or p["ts"] < hi
+        }
+
+    def write(chunk):
+        nonlocal writer, rows
+        columns = list(zip(*chunk))
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(col, type=schema.field(i).type) for i, col in enumerate(columns)],
+            schema=schema,
+        )
+        if writer is None:
+            part_dir.mkdir(parents=True, exist_ok=True)
+            writer = pq.ParquetWriter(tmp_path, schema, compression=spec.compression)
+        writer.write_batch(batch)
+        rows += len(chunk)
+
+    try:
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=spec.batch_rows).execute(stmt)
+            for chunk in result.partitions():
+                for row in chunk:
+                    cold.pop(row[1], None)
+                write(chunk)
+        if cold:
+            write([cold[ts] for ts in sorted(cold)])
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        return 0, None
+    os.replace(tmp_path, final_path)
+    return rows, str(final_path)
+
+
+def export_observations(spec: ExportSpec, progress: Optional[ExportProgress] = None) -> Dict[str, Any]:
+    """Export every partition of `spec`, optionally in parallel"""
+    progress = progress or ExportProgress()
+    parts = plan_partitions(spec)
+    progress.partitions_total = len(parts)
+    started = time.monotonic()
+
+    def run(part):
+        rows, path = export_partition(spec, *part)
+        progress.add(rows, path)
+
+    if spec.workers <= 1:
+        for part in parts:
+            run(part)
+    else:
+        with ThreadPoolExecutor(max_workers=spec.workers) as pool:
+            for future in [pool.submit(run, part) for part in parts]:
+                future.result()
+
+    return {
+        "out_dir": spec.out_dir,
+        "partitions": progress.partitions_total,
+        "files": len(progress.files),
+        "rows": progress.rows,
+        "elapsed_s": round(time.monotonic() - started, 3),
+    }
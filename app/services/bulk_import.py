@@ -0,0 +1,334 @@
+"""Bulk import of historical observations from CSV, NDJSON or Parquet files.
+
+Input files are split into work units: byte ranges of CSV/NDJSON files and row
+groups of Parquet files. Each unit streams batches into a temporary (unlogged)
+staging table with COPY and merges them into ``weather_observations`` with
+``INSERT ... ON CONFLICT``. After every merged batch the unit's checkpoint
+records the next offset, so an interrupted import resumes where it stopped.
+Replaying a batch is harmless because the merge is an upsert.
+
+CSV and NDJSON records must not contain embedded newlines.
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import Manager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+
+from app.db.bulk import copy_in
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("location_id", "ts", "temp_c", "source")
+REQUIRED_COLUMNS = ("location_id", "ts", "temp_c")
+STAGE_TABLE = "weather_observations_stage"
+
+FORMATS = {
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".parquet": "parquet",
+}
+
+STAGE_DDL = text(f"""
+    CREATE TEMP TABLE IF NOT EXISTS {STAGE_TABLE} (
+        seq          BIGSERIAL,
+        location_id  INTEGER,
+        ts           TIMESTAMPTZ,
+        temp_c       DOUBLE PRECISION,
+        source       TEXT
+    ) ON COMMIT DELETE ROWS
+""")
+
+# Later rows in a batch win over earlier rows for the same (location_id, ts);
+# rows for unknown locations are dropped rather than failing the batch.
+MERGE_SQL = text(f"""
+    INSERT INTO weather_observations (location_id, ts, temp_c, source)
+    SELECT DISTINCT ON (s.location_id, s.ts) s.location_id, s.ts, s.temp_c, s.source
+    FROM {STAGE_TABLE} s
+    JOIN locations l ON l.id = s.location_id
+    ORDER BY s.location_id, s.ts, s.seq DESC
+    ON CONFLICT ON CONSTRAINT uq_weather_observations_location_id_ts DO UPDATE
+    SET temp_c = EXCLUDED.temp_c,
+        source = EXCLUDED.source,
+        updated_at = now()
+""")
+
+
+@dataclass
+class ImportUnit:
+    path: str
+    fmt: str
+    start: int  # byte offset for csv/ndjson, row group index for parquet
+    end: int
+
+    @property
+    def first_offset(self) -> int:
+        return 0 if self.fmt == "parquet" else self.start
+
+    @property
+    def key(self) -> str:
+        return f"{os.path.abspath(self.path)}:{os.path.getsize(self.path)}:{self.start}-{self.end}"
+
+
+@dataclass
+class ImportOptions:
+    checkpoint_dir: Optional[str] = None
+    batch_bytes: int = 16 * 1024 * 1024
+    batch_rows: int = 200_000
+    unit_bytes: int = 256 * 1024 * 1024
+
+
+class Checkpoints:
+    """One small JSON file per unit, replaced atomically after each merged batch"""
+
+    def __init__(self, directory: Optional[str]):
+        self.directory = Path(directory) if directory else None
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, unit: ImportUnit) -> Path:
+        return self.directory / (hashlib.sha1(unit.key.encode()).hexdigest() + ".json")
+
+    def load(self, unit: ImportUnit) -> Dict[str, Any]:
+        state = {"key": unit.key, "offset": unit.first_offset, "staged": 0, "merged": 0, "done": False}
+        if self.directory and self._path(unit).exists():
+            state.update(json.loads(self._path(unit).read_text()))
+        return state
+
+    def save(self, unit: ImportUnit, state: Dict[str, Any]) -> None:
+        if not self.directory:
+            return
+        tmp = self._path(unit).with_suffix(".tmp")
+        tmp.write_text(json.dumps(state))
+        os.replace(tmp, self._path(unit))
+
+
+def detect_format(path: str) -> str:
+    fmt = FORMATS.get(Path(path).suffix.lower())
+    if not fmt:
+        raise ValueError(f"Unsupported file type: {path} (expected one of {', '.join(FORMATS)})")
+    return fmt
+
+
+def _csv_header(path: str) -> Tuple[List[str], int]:
+    with open(path, "rb") as f:
+        line = f.readline()
+    columns = [c.strip().strip('"') for c in line.decode("utf-8-sig").strip().split(",")]
+    _check_columns(columns, path)
+    return columns, len(line)
+
+
+def _check_columns(columns: Sequence[str], path: str) -> None:
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    unknown = [c for c in columns if c not in COLUMNS]
+    if missing or unknown:
+        raise ValueError(f"{path}: missing columns {missing}, unknown columns {unknown}")
+
+
+def plan_units(paths: Sequence[str], unit_bytes: int) -> List[ImportUnit]:
+    """Split input files into independently importable units"""
+    units = []
+    for path in paths:
+        fmt = detect_format(path)
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            pf = pq.ParquetFile(path)
+            _check_columns(pf.schema_arrow.names, path)
+            units.extend(ImportUnit(path, fmt, i, i + 1) for i in range(pf.num_row_groups))
+            continue
+
+        start = _csv_header(path)[1] if fmt == "csv" else 0
+        size = os.path.getsize(path)
+        while start < size:
+            end = min(start + unit_bytes, size)
+            units.append(ImportUnit(path, fmt, start, end))
+            start = end
+    return units
+
+
+def _iter_line_chunks(path: str, start: int, end: int, batch_bytes: int) -> Iterator[Tuple[bytes, int]]:
+    """Yield newline-aligned chunks holding every line that starts in [start, end).
+    The second item is the offset of the next unread line."""
+    with open(path, "rb") as f:
+        if start > 0:
+            # Drop the partial line owned by the previous unit (a no-op when start is line aligned)
+            f.seek(start - 1)
+            f.readline()
+        pos = f.tell()
+        while pos < end:
+            chunk = f.read(min(batch_bytes, end - pos))
+            if not chunk:
+                break
+            if not chunk.endswith(b"\n"):
+                chunk += f.readline()
+            pos = f.tell()
+            yield chunk, pos
+
+
+def _ndjson_rows(chunk: bytes) -> List[Tuple]:
+    rows = []
+    for line in chunk.splitlines():
+        if line.strip():
+            obj = json.loads(line)
+            rows.append((obj["location_id"], obj["ts"], obj["temp_c"], obj.get("source")))
+    return rows
+
+
+def _iter_batches(unit: ImportUnit, offset: int, opts: ImportOptions) -> Iterator[Tuple[Dict[str, Any], int]]:
+    """Yield (copy_in kwargs, next offset) for each batch of a unit"""
+    if unit.fmt == "csv":
+        columns = _csv_header(unit.path)[0]
+        for chunk, pos in _iter_line_chunks(unit.path, offset, unit.end, opts.batch_bytes):
+            yield {"columns": columns, "data": [chunk], "fmt": "csv"}, pos
+
+    elif unit.fmt == "ndjson":
+        for chunk, pos in _iter_line_chunks(unit.path, offset, unit.end, opts.batch_bytes):
+            yield {"columns": COLUMNS, "rows": _ndjson_rows(chunk)}, pos
+
+    else:
+        # For parquet the offset counts batches already merged from this row group
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+        import pyarrow.parquet as pq
+
+        pf = pq.ParquetFile(unit.path)
+        columns = [c for c in COLUMNS if c in pf.schema_arrow.names]
+        batches = pf.iter_batches(batch_size=opts.batch_rows, row_groups=[unit.start], columns=columns)
+        for i, batch in enumerate(batches):
+            if i < offset:
+                continue
+            table = pa.Table.from_batches([batch])
+            if pa.types.is_timestamp(table.schema.field("ts").type):
+                tz = table.schema.field("ts").type.tz or "UTC"
+                table = table.set_column(
+                    table.schema.get_field_index("ts"), "ts", table["ts"].cast(pa.timestamp("us", tz=tz))
+                )
+            buf = io.BytesIO()
+            pacsv.write_csv(table, buf, pacsv.WriteOptions(include_header=False))
+            yield {"columns": columns, "data": [buf.getvalue()], "fmt": "csv"}, i + 1
+
+
+def run_unit(unit: ImportUnit, opts: ImportOptions, progress=None) -> Dict[str, Any]:
+    """Import one unit, committing and checkpointing after every batch"""
+    checkpoints = Checkpoints(opts.checkpoint_dir)
+    state = checkpoints.load(unit)
+    if state["done"]:
+        return state
+
+    with engine.connect() as conn:
+        conn.execute(text("SET TIME ZONE 'UTC'"))
+        conn.execute(STAGE_DDL)
+        conn.commit()
+
+        for copy_kwargs, next_offset in _iter_batches(unit, state["offset"], opts):
+            copy_in(conn, STAGE_TABLE, **copy_kwargs)
+            staged = conn.execute(text(f"SELECT count(*) FROM {STAGE_TABLE}")).scalar()
+            merged = conn.execute(MERGE_SQL).rowcount
+            conn.commit()
+
+            state["offset"] = next_offset
+            state["staged"] += staged
+            state["merged"] += merged
+            checkpoints.save(unit, state)
+            if progress is not None:
+                progress.put((staged, merged))
+
+    state["done"] = True
+    checkpoints.save(unit, state)
+    return state
+
+
+def _init_worker() -> None:
+    # Forked workers must not reuse connections pooled by the parent
+    engine.dispose(close=False)
+
+
+def _drain(progress, totals: Dict[str, int]) -> None:
+    while True:
+        try:
+            staged, merged = progress.get_nowait()
+        except queue.Empty:
+            return
+        totals["staged"] += staged
+        totals["merged"] += merged
+
+
+def import_files(
+    paths: Sequence[str],
+    workers: int = 1,
+    opts: Optional[ImportOptions] = None,
+    progress_interval: float = 5.0,
+    on_progress: Optional[Callable[[Dict[str, int]], None]] = None,
+) -> Dict[str, Any]:
+    """Import `paths` with `workers` processes and return row totals.
+    `on_progress`, if given, is called with running totals after every poll;
+    an exception it raises aborts the import once in-flight units finish."""
+    opts = opts or ImportOptions()
+    units = plan_units(paths, opts.unit_bytes)
+    logger.info("Importing %d file(s) as %d unit(s) with %d worker(s)", len(paths), len(units), workers)
+
+    totals = {"staged": 0, "merged": 0}
+    started = last_report = time.monotonic()
+    done = 0
+
+    def report(force: bool = False) -> None:
+        nonlocal last_report
+        now = time.monotonic()
+        if force or now - last_report >= progress_interval:
+            rate = totals["merged"] / max(now - started, 1e-9)
+            logger.info(
+                "units %d/%d, staged %d, merged %d (%.0f rows/s)",
+                done, len(units), totals["staged"], totals["merged"], rate,
+            )
+            last_report = now
+        if on_progress is not None:
+            on_progress({"units_total": len(units), "units_done": done, **totals})
+
+    if workers <= 1:
+        progress = queue.SimpleQueue()
+        for unit in units:
+            run_unit(unit, opts, progress)
+            done += 1
+            _drain(progress, totals)
+            report()
+    else:
+        with Manager() as manager:
+            progress = manager.Queue()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                pending = {pool.submit(run_unit, unit, opts, progress) for unit in units}
+                try:
+                    while pending:
+                        finished = {f for f in pending if f.done()}
+                        for future in finished:
+                            future.result()
+                            done += 1
+                        pending -= finished
+                        _drain(progress, totals)
+                        report()
+                        if pending:
+                            time.sleep(0.2)
+                except BaseException:
+                    for future in pending:
+                        future.cancel()  # units not started yet; running ones finish and checkpoint
+                    raise
+                _drain(progress, totals)
+
+    report(force=True)
+    return {
+        "files": len(paths),
+        "units": len(units),
+        **totals,
+        "elapsed_s": round(time.monotonic() - started, 3),
+    }
@@ -0,0 +1,175 @@
+"""Change feed of observation writes and deletes, for incremental replication.
+
+Every write stamps the row with the id of its transaction (``change_xid``),
+and every delete leaves a tombstone in ``observation_tombstones`` with the
+deleting transaction's id; re-inserting a key removes its tombstone. The
+feed lists rows and tombstones in (change_xid, kind, id) order from an
+opaque cursor, so a sync costs what changed since the last one.
+
+Transaction ids are handed out at the first write but become visible at
+commit, so they don't commit in order. The feed therefore only returns
+changes below the oldest transaction still running (the snapshot xmin):
+everything under it is final, and nothing can later appear behind a cursor.
+The price is that one long-running writer holds the feed back until it
+finishes.
+
+Moving rows to and from the cold tier is not a change and isn't recorded.
+Restoring a month does list its rows again as upserts, which is harmless.
+
+Tombstones are kept CHANGES_RETENTION_DAYS; cursors older than that
+are refused (CursorExpired) and the client has to resync in full.
+"""
+import base64
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, literal_column, select, text, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.weather import ObservationTombstone, WeatherObservation
+
+logger = logging.getLogger(__name__)
+
+UPSERT, DELETE = 0, 1
+AFTER_ALL = 2  # cursor kind meaning "everything at this change_xid has been read"
+CURSOR_VERSION = "1"
+
+_WATERMARK = text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+_CURRENT_XID = literal_column("pg_current_xact_id()::text::bigint")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorExpired(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class ChangeCursor:
+    """Position in the feed: everything up to (xid, kind, id) has been read"""
+    xid: int
+    kind: int
+    id: int
+    issued: int  # epoch seconds, for expiry
+
+    def encode(self) -> str:
+        raw = f"{CURSOR_VERSION}.{self.xid}.{self.kind}.{self.id}.{self.issued}".encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, value: str) -> "ChangeCursor":
+        try:
+            raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)).decode()
+            version, *fields = raw.split(".")
+            if version != CURSOR_VERSION or len(fields) != 4:
+                raise ValueError
+            return cls(*(int(f) for f in fields))
+        except ValueError:
+            raise InvalidCursor("Invalid cursor") from None
+
+
+def watermark(db: Session) -> int:
+    """Every transaction with a lower id has finished"""
+    return db.execute(_WATERMARK).scalar()
+
+
+def current_cursor(db: Session) -> ChangeCursor:
+    """Cursor after every change visible now: where a fresh replica starts following"""
+    return ChangeCursor(watermark(db) - 1, AFTER_ALL, 0, int(time.time()))
+
+
+def _after(xid_col, id_col, kind: int, cursor: ChangeCursor):
+    """Rows of `kind` that come after `cursor` in (xid, kind, id) order"""
+    if cursor.kind < kind:
+        return xid_col >= cursor.xid
+    if cursor.kind == kind:
+        return tuple_(xid_col, id_col) > tuple_(cursor.xid, cursor.id)
+    return xid_col > cursor.xid
+
+
+def read_changes(
+    db: Session, cursor: ChangeCursor, limit: int, location_ids: Optional[Sequence[int]] = None
+) -> Tuple[List[Dict[str, Any]], ChangeCursor, bool]:
+    """(changes, next cursor, has_more) after `cursor`, oldest first"""
+    if cursor.issued < time.time() - settings.CHANGES_RETENTION_DAYS * 86400:
+        raise CursorExpired()
+    upper = watermark(db)
+
+    obs = WeatherObservation
+    rows_q = (
+        select(obs.change_xid, obs.id, obs.location_id, obs.ts, obs.temp_c, obs.source,
+               func.coalesce(obs.updated_at, obs.created_at))
+        .where(obs.change_xid.is_not(None), obs.change_xid < upper, _after(obs.change_xid, obs.id, UPSERT, cursor))
+        .order_by(obs.change_xid, obs.id)
+        .limit(limit + 1)
+    )
+    tomb = ObservationTombstone
+    tombs_q = (
+        select(tomb.change_xid, tomb.id, tomb.location_id, tomb.ts, tomb.deleted_at)
+        .where(tomb.change_xid < upper, _after(tomb.change_xid, tomb.id, DELETE, cursor))
+        .order_by(tomb.change_xid, tomb.id)
+        .limit(limit + 1)
+    )
+    if location_ids:
+        rows_q = rows_q.where(obs.location_id.in_(location_ids))
+        tombs_q = tombs_q.where(tomb.location_id.in_(location_ids))
+
+    merged = sorted(
+        [((xid, UPSERT, rid), {"op": "upsert", "location_id": lid, "ts": ts, "temp_c": temp_c,
+                                "source": source, "changed_at": changed_at})
+         for xid, rid, lid, ts, temp_c, source, changed_at in db.execute(rows_q)]
+        + [((xid, DELETE, rid), {"op": "delete", "location_id": lid, "ts": ts, "changed_at": deleted_at})
+           for xid, rid, lid, ts, deleted_at in db.execute(tombs_q)],
+        key=lambda item: item[0],
+    )
+    has_more = len(merged) > limit
+    page = merged[:limit]
+    now = int(time.time())
+    if has_more:
+        xid, kind, rid = page[-1][0]
+        next_cursor = ChangeCursor(xid, kind, rid, now)
+    else:
+        # Everything below the watermark has been read
+        next_cursor = max(
+            ChangeCursor(upper - 1, AFTER_ALL, 0, now),
+            ChangeCursor(cursor.xid, cursor.kind, cursor.id, now),
+            key=lambda c: (c.xid, c.kind, c.id),
+        )
+    return [change for _, change in page], next_cursor, has_more
+
+
+def record_tombstones(db: Session, location_id: int, timestamps: Iterable[datetime]) -> None:
+    """Tombstones for observations deleted outside the hot table (archived points). Does not commit."""
+    rows = [{"location_id": location_id, "ts": ts, "change_xid": _CURRENT_XID} for ts in timestamps]
+    for i in range(0, len(rows), 10000):
+        stmt = pg_insert(ObservationTombstone).values(rows[i:i + 10000])
+        db.execute(stmt.on_conflict_do_update(
+            constraint="uq_observation_tombstones_location_id_ts",
+            set_={"change_xid": stmt.excluded.change_xid, "deleted_at": func.now()},
+        ))
+
+
+def set_capture(db: Session, enabled: bool) -> None:
+    """Record (or stop recording) changes for the rest of db's transaction"""
+    db.execute(select(func.set_config("weather.capture_changes", "on" if enabled else "off", True)))
+
+
+def purge_tombstones(db: Session) -> int:
+    """Delete tombstones no unexpired cursor can need. Commits; returns the number removed."""
+    # A day of slack for deletes that ran long: deleted_at is their transaction start
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.CHANGES_RETENTION_DAYS + 1)
+    removed = 0
+    while True:
+        batch = select(ObservationTombstone.id).where(ObservationTombstone.deleted_at < cutoff).limit(settings.DELETE_BATCH_ROWS)
+        n = db.execute(delete(ObservationTombstone).where(ObservationTombstone.id.in_(batch))).rowcount
+        db.commit()
+        removed += n
+        if n < settings.DELETE_BATCH_ROWS:
+            return removed
@@ -0,0 +1,252 @@
+"""Climatology normals and anomalies.
+
+Normals are kept per location, calendar day and UTC hour in
+``climatology_normals``: sample count, mean, standard deviation and the
+1st-99th percentiles. Days use a 366-day leap-year calendar, so Mar 1 is
+always day 61 and Feb 29 only has leap-year samples. Each (day, hour) cell
+pools the samples within CLIMATOLOGY_WINDOW_DAYS days either side of the
+day, so thirty years of hourly data give ~450 samples per cell instead of 30.
+
+A build reads all of a location's observations (hot rows and cold tier) as
+NumPy arrays and computes every cell at once. refresh() only rebuilds
+locations whose observations changed since their last build, found through
+the change feed (app.services.changes): rows and tombstones with a
+``change_xid`` at or above the watermark recorded with the build, read
+through their change_xid indexes. Builds older than CHANGES_RETENTION_DAYS
+count as stale, since the tombstones of their deletes may have been purged.
+
+anomalies() scores the observations in a range against their cells: a
+z-score and an approximate percentile rank, interpolated between the stored
+percentiles and clamped to [1, 99].
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.bulk import copy_in
+from app.models.weather import ClimatologyBuild, ClimatologyNormal
+from app.services.changes import watermark
+from app.services.observations import read_observation_arrays
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (1, 5, 10, 25, 50, 75, 90, 95, 99)
+QUANTILE_COLUMNS = tuple(f"p{q:02d}" for q in QUANTILES)
+DAYS = 366
+CELLS = DAYS * 24
+# Bounds wide enough to cover every observation
+ALL_TIME = (datetime(1800, 1, 1, tzinfo=timezone.utc), datetime(2200, 1, 1, tzinfo=timezone.utc))
+
+# Every location with observations: latest_observations has one row per location with
+# hot rows, observation_archives one per archived month. Neither scans the hot table.
+_LOCATIONS_WITH_DATA = """
+    SELECT location_id FROM latest_observations
+    UNION
+    SELECT DISTINCT location_id FROM observation_archives
+"""
+
+_ALL_LOCATIONS = text(f"SELECT location_id FROM ({_LOCATIONS_WITH_DATA}) l ORDER BY location_id")
+
+# Locations with observations but no build, builds of unknown or expired watermark, and
+# locations with writes or deletes at or above their build's watermark. :since is the
+# lowest watermark, so both change scans are index range scans over what changed since
+# the oldest build.
+_STALE_LOCATIONS = text(f"""
+    SELECT l.location_id FROM ({_LOCATIONS_WITH_DATA}) l
+    WHERE NOT EXISTS (SELECT 1 FROM climatology_builds b WHERE b.location_id = l.location_id)
+    UNION
+    SELECT location_id FROM climatology_builds
+    WHERE change_xid IS NULL OR built_at < :expired
+    UNION
+    SELECT o.location_id FROM weather_observations o
+    JOIN climatology_builds b ON b.location_id = o.location_id
+    WHERE o.change_xid >= CAST(:since AS bigint) AND o.change_xid >= b.change_xid
+    UNION
+    SELECT t.location_id FROM observation_tombstones t
+    JOIN climatology_builds b ON b.location_id = t.location_id
+    WHERE t.change_xid >= CAST(:since AS bigint) AND t.change_xid >= b.change_xid
+    ORDER BY 1
+""")
+
+
+def calendar_cells(epoch: np.ndarray) -> np.ndarray:
+    """Cell index (day_of_year - 1) * 24 + UTC hour for epoch seconds"""
+    days = (epoch // 86400).astype("datetime64[D]")
+    years = days.astype("datetime64[Y]")
+    doy = (days - years).astype(np.int64)  # 0-based
+    year = years.astype(np.int64) + 1970
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    doy += (~leap & (doy >= 59)).astype(np.int64)  # skip Feb 29 in common years
+    return doy * 24 + (epoch // 3600) % 24
+
+
+def compute_normals(epoch: np.ndarray, temps: np.ndarray, window_days: int) -> Dict[str, np.ndarray]:
+    """Per-cell statistics as arrays of length CELLS (samples == 0 where a cell has no data)"""
+    base = calendar_cells(epoch)
+    doy, hour = base // 24, base % 24
+    offsets = np.arange(-window_days, window_days + 1)
+    # Every sample counts towards the cells of the 2*window+1 days around it
+    cells = (((doy[None, :] + offsets[:, None]) % DAYS) * 24 + hour[None, :]).ravel()
+    values = np.broadcast_to(temps, (len(offsets), len(temps))).ravel()
+
+    samples = np.bincount(cells, minlength=CELLS)
+    present = samples > 0
+    mean = np.zeros(CELLS)
+    mean[present] = np.bincount(cells, weights=values, minlength=CELLS)[present] / samples[present]
+    sq_dev = np.bincount(cells, weights=(values - mean[cells]) ** 2, minlength=CELLS)
+    stddev = np.full(CELLS, np.nan)
+    multi = samples > 1
+    stddev[multi] = np.sqrt(sq_dev[multi] / (samples[multi] - 1))
+
+    # Percentiles (linear interpolation, as numpy's default) from one sort grouped by cell
+    order = np.lexsort((values, cells))
+    sorted_values = values[order]
+    starts = np.concatenate(([0], np.cumsum(samples)[:-1]))
+    out = {"samples": samples, "mean": mean, "stddev": stddev}
+    for q, column in zip(QUANTILES, QUANTILE_COLUMNS):
+        pos = starts + (q / 100.0) * np.maximum(samples - 1, 0)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, starts + samples - 1)
+        frac = pos - lo
+        p = np.full(CELLS, np.nan)
+        p[present] = sorted_values[lo[present]] + (sorted_values[hi[present]] - sorted_values[lo[present]]) * frac[present]
+        out[column] = p
+    return out
+
+
+def build_location(db: Session, location_id: int, window_days: Optional[int] = None) -> int:
+    """Recompute one location's normals from all its observations. Does not
+    commit; returns the number of observations used."""
+    window_days = settings.CLIMATOLOGY_WINDOW_DAYS if window_days is None else window_days
+    built_at = db.execute(select(func.now())).scalar()
+    # Every transaction below it is visible to the reads that follow; later ones make the build stale
+    change_xid = watermark(db)
+    epoch, temps = read_observation_arrays(db, location_id, *ALL_TIME)
+
+    db.execute(delete(ClimatologyNormal).where(ClimatologyNormal.location_id == location_id))
+    if len(epoch):
+        stats = compute_normals(epoch, temps, window_days)
+        cells = np.flatnonzero(stats["samples"])
+        columns = ["samples", "mean", "stddev", *QUANTILE_COLUMNS]
+        values = [stats[c][cells].tolist() for c in columns]
+        rows = (
+            (location_id, cell // 24 + 1, cell % 24, *(None if v != v else v for v in row))  # NaN -> NULL
+            for cell, *row in zip(cells.tolist(), *values)
+        )
+        # The session's transaction is already open (the now() above), so the COPY joins it
+        copy_in(db.connection(), ClimatologyNormal.__tablename__, ["location_id", "day_of_year", "hour", *columns], rows=rows)
+
+    build = {
+        "built_at": built_at,
+        "change_xid": change_xid,
+        "observations": int(len(epoch)),
+        "first_ts": datetime.fromtimestamp(int(epoch[0]), timezone.utc) if len(epoch) else None,
+        "last_ts": datetime.fromtimestamp(int(epoch[-1]), timezone.utc) if len(epoch) else None,
+        "window_days": window_days,
+    }
+    stmt = pg_insert(ClimatologyBuild).values(location_id=location_id, **build)
+    db.execute(stmt.on_conflict_do_update(index_elements=["location_id"], set_=build))
+    return len(epoch)
+
+
+def stale_locations(db: Session) -> List[int]:
+    since = db.execute(select(func.min(ClimatologyBuild.change_xid))).scalar()
+    expired = datetime.now(timezone.utc) - timedelta(days=settings.CHANGES_RETENTION_DAYS)
+    return list(db.execute(_STALE_LOCATIONS, {"since": since or 0, "expired": expired}).scalars())
+
+
+def refresh(
+    db: Session,
+    location_ids: Optional[Sequence[int]] = None,
+    full: bool = False,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Rebuild normals for `location_ids` (default: every location with new
+    data, or every location with data when `full`). Commits per location."""
+    if location_ids is None:
+        if full:
+            location_ids = list(db.execute(_ALL_LOCATIONS).scalars())
+        else:
+            location_ids = stale_locations(db)
+        db.commit()
+
+    stats = {"locations_total": len(location_ids), "locations_done": 0, "observations": 0}
+    for location_id in location_ids:
+        stats["observations"] += build_location(db, location_id)
+        db.commit()
+        stats["locations_done"] += 1
+        if on_progress is not None:
+            on_progress(dict(stats))
+    logger.info("Climatology built for %d location(s) from %d observations",
+                stats["locations_done"], stats["observations"])
+    return stats
+
+
+def anomalies(db: Session, location_id: int, start_ts: datetime, end_ts: datetime) -> Optional[Dict[str, Any]]:
+    """Observations in range scored against the location's normals, or None
+    when the location has no climatology yet"""
+    build = db.get(ClimatologyBuild, location_id)
+    if build is None:
+        return None
+
+    epoch, temps = read_observation_arrays(db, location_id, start_ts, end_ts)
+    cells = calendar_cells(epoch)
+    mean = np.full(CELLS, np.nan)
+    stddev = np.full(CELLS, np.nan)
+    samples = np.zeros(CELLS, dtype=np.int64)
+    quantiles = np.full((CELLS, len(QUANTILES)), np.nan)
+    if len(cells):
+        q_columns = [getattr(ClimatologyNormal, c) for c in QUANTILE_COLUMNS]
+        rows = db.execute(
+            select(ClimatologyNormal.day_of_year, ClimatologyNormal.hour, ClimatologyNormal.samples,
+                   ClimatologyNormal.mean, ClimatologyNormal.stddev, *q_columns)
+            .where(ClimatologyNormal.location_id == location_id,
+                   ClimatologyNormal.day_of_year.in_(np.unique(cells // 24 + 1).tolist()))
+        ).all()
+        if rows:
+            table = np.array([[np.nan if v is None else v for v in row] for row in rows], dtype=np.float64)
+            idx = ((table[:, 0] - 1) * 24 + table[:, 1]).astype(np.int64)
+            samples[idx] = table[:, 2]
+            mean[idx] = table[:, 3]
+            stddev[idx] = table[:, 4]
+            quantiles[idx] = table[:, 5:]
+
+    m, s, n, qv = mean[cells], stddev[cells], samples[cells], quantiles[cells]
+    usable = n >= settings.CLIMATOLOGY_MIN_SAMPLES
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.where(usable & (s > 0), (temps - m) / s, np.nan)
+
+        # Percentile rank: linear between the two stored percentiles around the value
+        q = np.asarray(QUANTILES, dtype=np.float64)
+        k = np.clip((qv <= temps[:, None]).sum(axis=1), 1, len(q) - 1)
+        rows_idx = np.arange(len(temps))
+        lo, hi = qv[rows_idx, k - 1], qv[rows_idx, k]
+        frac = np.clip(np.where(hi > lo, (temps - lo) / (hi - lo), 0.5), 0.0, 1.0)
+        pct = np.where(usable, q[k - 1] + frac * (q[k] - q[k - 1]), np.nan)
+
+    def clean(values: np.ndarray, digits: int) -> List[Optional[float]]:
+        return [None if v != v else v for v in np.round(values, digits).tolist()]
+
+    points = [
+        {"ts": datetime.fromtimestamp(t, timezone.utc), "temp_c": temp, "normal_c": normal,
+         "stddev_c": sd, "z": zi, "percentile": p}
+        for t, temp, normal, sd, zi, p in zip(
+            epoch.tolist(), temps.tolist(), clean(m, 2), clean(s, 2), clean(z, 3), clean(pct, 1)
+        )
+    ]
+    return {
+        "climatology": {
+            "built_at": build.built_at,
+            "observations": build.observations,
+            "first_ts": build.first_ts,
+            "last_ts": build.last_ts,
+            "window_days": build.window_days,
+        },
+        "anomalies": points,
+    }
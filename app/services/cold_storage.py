@@ -0,0 +1,191 @@
+"""Cold tier for old observations.
+
+Each (location, UTC month) is packed into one ``ObservationArchive`` row
+holding a Gorilla-encoded blob of (ts, temp_c) pairs plus run-length encoded
+sources. Archived timestamps keep whole-second precision.
+
+Hot rows may coexist with an archive for the same month (e.g. a late upsert);
+readers let the hot row win, and re-archiving the month folds it in.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from app.models.weather import ObservationArchive, WeatherObservation
+from app.services.changes import record_tombstones, set_capture
+from app.services.gorilla import decode, encode
+
+logger = logging.getLogger(__name__)
+
+
+def as_utc(ts: datetime) -> datetime:
+    """`ts` in UTC; naive timestamps are taken as UTC, as everywhere else in the API"""
+    return ts.astimezone(timezone.utc) if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def month_start(ts: datetime) -> datetime:
+    ts = ts.astimezone(timezone.utc)
+    return datetime(ts.year, ts.month, 1, tzinfo=timezone.utc)
+
+
+def next_month(ts: datetime) -> datetime:
+    ts = month_start(ts)
+    return datetime(ts.year + ts.month // 12, ts.month % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def pack(points: List[Dict[str, Any]]) -> Tuple[bytes, List[List[Any]]]:
+    """Encode points sorted by ts into (blob, run-length sources)"""
+    blob = encode([int(p["ts"].timestamp()) for p in points], [float(p["temp_c"]) for p in points])
+    sources: List[List[Any]] = []
+    for p in points:
+        if sources and sources[-1][0] == p.get("source"):
+            sources[-1][1] += 1
+        else:
+            sources.append([p.get("source"), 1])
+    return blob, sources
+
+
+def unpack(archive: ObservationArchive) -> List[Dict[str, Any]]:
+    timestamps, values = decode(archive.data)
+    sources = [source for source, count in archive.sources for _ in range(count)]
+    return [
+        {"ts": datetime.fromtimestamp(ts, tz=timezone.utc), "temp_c": value, "source": source}
+        for ts, value, source in zip(timestamps, values, sources)
+    ]
+
+
+def _archives_in_range(db: Session, location_id: int, start_ts: datetime, end_ts: datetime, lock: bool = False):
+    start_ts, end_ts = as_utc(start_ts), as_utc(end_ts)
+    query = db.query(ObservationArchive).filter(
+        and_(
+            ObservationArchive.location_id == location_id,
+            ObservationArchive.period_start <= end_ts,
+            ObservationArchive.period_end > start_ts,
+        )
+    ).order_by(ObservationArchive.period_start)
+    if lock:
+        query = query.with_for_update()
+    return query.all()
+
+
+def read_archived(db: Session, location_id: int, start_ts: datetime, end_ts: datetime) -> List[Dict[str, Any]]:
+    """Archived points with start_ts <= ts <= end_ts, ordered by ts"""
+    start_ts, end_ts = as_utc(start_ts), as_utc(end_ts)
+    points = []
+    for archive in _archives_in_range(db, location_id, start_ts, end_ts):
+        points.extend(p for p in unpack(archive) if start_ts <= p["ts"] <= end_ts)
+    return points
+
+
+def archive_month(db: Session, location_id: int, period_start: datetime) -> int:
+    """Move the hot rows of one location-month into its archive blob.
+    Does not commit; returns the number of points in the archive."""
+    period_start = month_start(period_start)
+    period_end = next_month(period_start)
+    in_month = and_(
+        WeatherObservation.location_id == location_id,
+        WeatherObservation.ts >= period_start,
+        WeatherObservation.ts < period_end,
+    )
+
+    archive = db.query(ObservationArchive).filter(
+        ObservationArchive.location_id == location_id,
+        ObservationArchive.period_start == period_start,
+    ).with_for_update().first()
+
+    points = {p["ts"]: p for p in unpack(archive)} if archive else {}
+    hot = db.execute(
+        select(WeatherObservation.ts, WeatherObservation.temp_c, WeatherObservation.source).where(in_month)
+    ).all()
+    for ts, temp_c, source in hot:
+        ts = ts.replace(microsecond=0)
+        points[ts] = {"ts": ts, "temp_c": temp_c, "source": source}
+    if not points:
+        return 0
+
+    ordered = [points[ts] for ts in sorted(points)]
+    blob, sources = pack(ordered)
+    if archive is None:
+        archive = ObservationArchive(location_id=location_id, period_start=period_start, period_end=period_end)
+        db.add(archive)
+    archive.data = blob
+    archive.sources = sources
+    archive.point_count = len(ordered)
+
+    # Moving rows into the archive is not a delete for the change feed
+    set_capture(db, False)
+    db.query(WeatherObservation).filter(in_month).delete(synchronize_session=False)
+    set_capture(db, True)
+    return len(ordered)
+
+
+def restore_month(db: Session, location_id: int, period_start: datetime) -> int:
+    """Move an archived location-month back into hot rows (hot rows win on conflict).
+    Does not commit; returns the number of points restored."""
+    from app.services.observations import upsert_observations
+
+    archive = db.query(ObservationArchive).filter(
+        ObservationArchive.location_id == location_id,
+        ObservationArchive.period_start == month_start(period_start),
+    ).with_for_update().first()
+    if not archive:
+        return 0
+
+    existing = {
+        ts for (ts,) in db.execute(
+            select(WeatherObservation.ts).where(and_(
+                WeatherObservation.location_id == location_id,
+                WeatherObservation.ts >= archive.period_start,
+                WeatherObservation.ts < archive.period_end,
+            ))
+        )
+    }
+    points = [p for p in unpack(archive) if p["ts"] not in existing]
+    upsert_observations(db, location_id, points)
+    db.delete(archive)
+    return len(points)
+
+
+def delete_archived(db: Session, location_id: int, start_ts: datetime, end_ts: datetime) -> int:
+    """Drop archived points with start_ts <= ts <= end_ts, rewriting partially covered blobs.
+    Does not commit; returns the number of points removed."""
+    start_ts, end_ts = as_utc(start_ts), as_utc(end_ts)
+    removed = 0
+    for archive in _archives_in_range(db, location_id, start_ts, end_ts, lock=True):
+        points = unpack(archive)
+        kept = [p for p in points if not (start_ts <= p["ts"] <= end_ts)]
+        removed += len(points) - len(kept)
+        record_tombstones(db, location_id, (p["ts"] for p in points if start_ts <= p["ts"] <= end_ts))
+        if not kept:
+            db.delete(archive)
+        elif len(kept) != len(points):
+            archive.data, archive.sources = pack(kept)
+            archive.point_count = len(kept)
+    return removed
+
+
+def archivable_months(
+    db: Session, older_than: datetime, location_ids: Optional[Sequence[int]] = None
+) -> List[Tuple[int, datetime]]:
+    """(location_id, month) pairs with hot rows in months that end before `older_than`"""
+    month = func.date_trunc("month", func.timezone("UTC", WeatherObservation.ts))
+    query = db.query(WeatherObservation.location_id, month).filter(
+        WeatherObservation.ts < month_start(older_than)
+    )
+    if location_ids:
+        query = query.filter(WeatherObservation.location_id.in_(location_ids))
+    rows = query.group_by(WeatherObservation.location_id, month).order_by(WeatherObservation.location_id, month).all()
+    return [(location_id, m.replace(tzinfo=timezone.utc)) for location_id, m in rows]
+
+
+def archived_months(db: Session, location_id: int, start_ts: datetime, end_ts: datetime) -> List[datetime]:
+    return list(db.scalars(
+        select(ObservationArchive.period_start).where(and_(
+            ObservationArchive.location_id == location_id,
+            ObservationArchive.period_start <= end_ts,
+            ObservationArchive.period_end > start_ts,
+        )).order_by(ObservationArchive.period_start)
+    ))
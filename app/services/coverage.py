@@ -0,0 +1,146 @@
+"""Hourly data coverage per location, for fast gap detection.
+
+``observation_coverage`` keeps one bit(744) per (location, UTC month): bit i
+is set when hour i of the month has at least one observation. Triggers on
+``weather_observations`` keep it current: inserts set their hours' bits, and
+deletes recompute the months they touched from the rows left. Moves to and
+from the cold tier don't change it, since the data still exists.
+
+Writes that bypass those triggers (deleting archived points) call
+rebuild() for the affected range. Months archived before
+coverage existed are added by ``python -m app.cli.build_coverage``.
+
+A year of one location is 12 rows of 93 bytes, so finding the missing
+hours of a range is a primary-key range scan plus a few numpy operations.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import and_, delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.weather import ObservationArchive, ObservationCoverage
+from app.services.cold_storage import month_start, next_month
+from app.services.observations import read_observation_arrays
+
+logger = logging.getLogger(__name__)
+
+MONTH_BITS = 744  # 31 days * 24 hours
+_ONE = ord("1")
+
+
+def _hour_floor(ts: datetime) -> datetime:
+    return ts.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _months(start_ts: datetime, end_ts: datetime) -> List[datetime]:
+    months, month = [], month_start(start_ts)
+    while month <= end_ts:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+def _month_hours(month: datetime) -> int:
+    return int((next_month(month) - month).total_seconds()) // 3600
+
+
+def hour_mask(db: Session, location_id: int, start_ts: datetime, end_ts: datetime) -> Tuple[datetime, np.ndarray]:
+    """(first hour, bool array) with one entry per UTC hour from start_ts's hour to end_ts's hour"""
+    first, last = _hour_floor(start_ts), _hour_floor(end_ts)
+    months = _months(first, last)
+    stored = dict(db.execute(
+        select(ObservationCoverage.month, ObservationCoverage.hours).where(and_(
+            ObservationCoverage.location_id == location_id,
+            ObservationCoverage.month >= months[0].date(),
+            ObservationCoverage.month <= months[-1].date(),
+        ))
+    ).all())
+
+    parts = []
+    for month in months:
+        bits = stored.get(month.date())
+        n = _month_hours(month)
+        if bits is None:
+            parts.append(np.zeros(n, dtype=bool))
+        else:
+            parts.append(np.frombuffer(bits.encode(), dtype=np.uint8, count=n) == _ONE)
+    mask = np.concatenate(parts)
+    offset = int((first - months[0]).total_seconds()) // 3600
+    span = int((last - first).total_seconds()) // 3600 + 1
+    return first, mask[offset:offset + span]
+
+
+def gaps(first: datetime, mask: np.ndarray) -> List[Tuple[datetime, datetime]]:
+    """[start, end) hour ranges where `mask` is False"""
+    edges = np.diff(np.concatenate(([1], mask.astype(np.int8), [1])))
+    starts = np.flatnonzero(edges == -1)
+    ends = np.flatnonzero(edges == 1)
+    return [(first + timedelta(hours=int(s)), first + timedelta(hours=int(e))) for s, e in zip(starts, ends)]
+
+
+def missing_ranges(db: Session, location_id: int, start_ts: datetime, end_ts: datetime) -> Dict[str, Any]:
+    """Hours of [start_ts, end_ts] without observations, as hour-aligned [start, end) ranges"""
+    first, mask = hour_mask(db, location_id, start_ts, end_ts)
+    covered = int(np.count_nonzero(mask))
+    return {
+        "hours": len(mask),
+        "covered_hours": covered,
+        "missing": gaps(first, mask),
+    }
+
+
+def _bitmaps(epochs: np.ndarray, months: Sequence[datetime]) -> Dict[datetime, Optional[str]]:
+    """bit(744) strings per month (None: no observations) from sorted epoch seconds"""
+    result: Dict[datetime, Optional[str]] = {}
+    for month in months:
+        lo, hi = int(month.timestamp()), int(next_month(month).timestamp())
+        window = epochs[np.searchsorted(epochs, lo):np.searchsorted(epochs, hi)]
+        if not len(window):
+            result[month] = None
+            continue
+        bits = np.full(MONTH_BITS, ord("0"), dtype=np.uint8)
+        bits[(window - lo) // 3600] = _ONE
+        result[month] = bits.tobytes().decode()
+    return result
+
+
+def rebuild(db: Session, location_id: Optional[int], start_ts: datetime, end_ts: datetime) -> int:
+    """Recompute the months overlapping [start_ts, end_ts] from hot and archived rows, for one
+    location or every location with coverage or archives there. Does not commit; returns months written."""
+    months = _months(start_ts, end_ts)
+    lo, hi = months[0], next_month(months[-1])
+    if location_id is not None:
+        location_ids = [location_id]
+    else:
+        location_ids = sorted(set(db.scalars(
+            select(ObservationCoverage.location_id).where(and_(
+                ObservationCoverage.month >= lo.date(), ObservationCoverage.month < hi.date(),
+            )).distinct()
+        )) | set(db.scalars(
+            select(ObservationArchive.location_id).where(and_(
+                ObservationArchive.period_start < hi, ObservationArchive.period_end > lo,
+            )).distinct()
+        )))
+
+    written = 0
+    for lid in location_ids:
+        epochs, _ = read_observation_arrays(db, lid, lo, hi - timedelta(microseconds=1))
+        bitmaps = _bitmaps(epochs, months)
+        empty = [month.date() for month, bits in bitmaps.items() if bits is None]
+        rows = [{"location_id": lid, "month": month.date(), "hours": bits}
+                for month, bits in bitmaps.items() if bits is not None]
+        if empty:
+            db.execute(delete(ObservationCoverage).where(and_(
+                ObservationCoverage.location_id == lid, ObservationCoverage.month.in_(empty),
+            )))
+        if rows:
+            stmt = pg_insert(ObservationCoverage).values(rows)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=["location_id", "month"], set_={"hours": stmt.excluded.hours},
+            ))
+            written += len(rows)
+    return written
@@ -1,6 +1,7 @@
-import httpx
 from typing import Optional, Tuple
 from app.core.config import settings
+from app.core.http import get_http_client
+from app.core.metrics import track_upstream
 
 
 class GeocodingService:
@@ -17,7 +18,8 @@ class GeocodingService:
             return await self._get_coordinates_openweathermap(location)
         
         try:
-            async with httpx.AsyncClient() as client:
+            client = get_http_client()
+            with track_upstream("geocoding", "direct"):
                 response = await client.get(
                     f"{self.base_url}/direct",
                     params={
@@ -28,13 +30,13 @@ class GeocodingService:
                     timeout=10.0
                 )
                 response.raise_for_status()
-                
-                data = response.json()
-                if data and len(data) > 0:
-                    lat = data[0]["lat"]
-                    lon = data[0]["lon"]
-                    return (lat, lon)
-                
+            
+            data = response.json()
+            if data and len(data) > 0:
+                lat = data[0]["lat"]
+                lon = data[0]["lon"]
+                return (lat, lon)
+            
         except Exception as e:
             print(f"Error getting coordinates: {e}")
         
@@ -45,7 +47,8 @@ class GeocodingService:
         Fallback to OpenWeatherMap geocoding API
         """
         try:
-            async with httpx.AsyncClient() as client:
+            client = get_http_client()
+            with track_upstream("geocoding", "direct_fallback"):
                 response = await client.get(
                     f"{self.base_url}/direct",
                     params={
@@ -56,13 +59,13 @@ class GeocodingService:
                     timeout=10.0
                 )
                 response.raise_for_status()
-                
-                data = response.json()
-                if data and len(data) > 0:
-                    lat = data[0]["lat"]
-                    lon = data[0]["lon"]
-                    return (lat, lon)
-                
+            
+            data = response.json()
+            if data and len(data) > 0:
+                lat = data[0]["lat"]
+                lon = data[0]["lon"]
+                return (lat, lon)
+            
         except Exception as e:
             print(f"Error getting coordinates from OpenWeatherMap: {e}")
         
@@ -0,0 +1,166 @@
+"""Gorilla-style encoding of (timestamp, float) series.
+
+Timestamps (whole seconds) are stored as delta-of-deltas and values as the
+XOR of consecutive IEEE 754 doubles, following Pelkonen et al., "Gorilla: A
+Fast, Scalable, In-Memory Time Series Database" (VLDB 2015). A regular hourly
+series costs about one bit per timestamp, and a repeated value one bit.
+
+Blob layout: point count (32 bits), first timestamp (64 bits), first value
+(64 bits), then a timestamp code and a value code for every later point.
+"""
+import struct
+from typing import List, Sequence, Tuple
+
+# (prefix, prefix length, payload bits) for delta-of-delta buckets; the last is the fallback
+_DOD_BUCKETS = (
+    (0b10, 2, 7),
+    (0b110, 3, 9),
+    (0b1110, 4, 12),
+)
+_DOD_FALLBACK = (0b1111, 4, 64)
+
+
+class BitWriter:
+    def __init__(self):
+        self.buf = bytearray()
+        self.acc = 0
+        self.nbits = 0
+
+    def write(self, value: int, nbits: int) -> None:
+        self.acc = (self.acc << nbits) | (value & ((1 << nbits) - 1))
+        self.nbits += nbits
+        while self.nbits >= 8:
+            self.nbits -= 8
+            self.buf.append((self.acc >> self.nbits) & 0xFF)
+        self.acc &= (1 << self.nbits) - 1
+
+    def getvalue(self) -> bytes:
+        if self.nbits:
+            return bytes(self.buf) + bytes([(self.acc << (8 - self.nbits)) & 0xFF])
+        return bytes(self.buf)
+
+
+class BitReader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+        self.acc = 0
+        self.nbits = 0
+
+    def read(self, nbits: int) -> int:
+        while self.nbits < nbits:
+            self.acc = (self.acc << 8) | self.data[self.pos]
+            self.pos += 1
+            self.nbits += 8
+        self.nbits -= nbits
+        value = self.acc >> self.nbits
+        self.acc &= (1 << self.nbits) - 1
+        return value
+
+    def read_bit(self) -> int:
+        return self.read(1)
+
+
+def _float_bits(value: float) -> int:
+    return struct.unpack(">Q", struct.pack(">d", value))[0]
+
+
+def _bits_float(bits: int) -> float:
+    return struct.unpack(">d", struct.pack(">Q", bits))[0]
+
+
+def _to_signed(value: int, nbits: int) -> int:
+    return value - (1 << nbits) if value >= 1 << (nbits - 1) else value
+
+
+def encode(timestamps: Sequence[int], values: Sequence[float]) -> bytes:
+    """Encode ascending epoch-second timestamps and their float values"""
+    if len(timestamps) != len(values):
+        raise ValueError("timestamps and values must have the same length")
+    w = BitWriter()
+    w.write(len(timestamps), 32)
+    if not timestamps:
+        return w.getvalue()
+
+    prev_ts = timestamps[0]
+    prev_delta = 0
+    prev_bits = _float_bits(values[0])
+    prev_lead, prev_trail = 65, 0  # no previous XOR window yet
+    w.write(prev_ts, 64)
+    w.write(prev_bits, 64)
+
+    for ts, value in zip(timestamps[1:], values[1:]):
+        delta = ts - prev_ts
+        dod = delta - prev_delta
+        if dod == 0:
+            w.write(0, 1)
+        else:
+            for prefix, plen, nbits in _DOD_BUCKETS:
+                if -(1 << (nbits - 1)) <= dod < (1 << (nbits - 1)):
+                    w.write(prefix, plen)
+                    w.write(dod, nbits)
+                    break
+            else:
+                prefix, plen, nbits = _DOD_FALLBACK
+                w.write(prefix, plen)
+                w.write(dod, nbits)
+        prev_ts, prev_delta = ts, delta
+
+        bits = _float_bits(value)
+        xor = bits ^ prev_bits
+        if xor == 0:
+            w.write(0, 1)
+        else:
+            lead = min(64 - xor.bit_length(), 31)
+            trail = (xor & -xor).bit_length() - 1
+            w.write(1, 1)
+            if lead >= prev_lead and trail >= prev_trail:
+                # Fits in the previous meaningful-bit window
+                w.write(0, 1)
+                w.write(xor >> prev_trail, 64 - prev_lead - prev_trail)
+            else:
+                sig = 64 - lead - trail
+                w.write(1, 1)
+                w.write(lead, 5)
+                w.write(sig & 0x3F, 6)  # 64 significant bits is stored as 0
+                w.write(xor >> trail, sig)
+                prev_lead, prev_trail = lead, trail
+        prev_bits = bits
+
+    return w.getvalue()
+
+
+def decode(data: bytes) -> Tuple[List[int], List[float]]:
+    """Inverse of `encode`"""
+    r = BitReader(data)
+    count = r.read(32)
+    if count == 0:
+        return [], []
+
+    ts = _to_signed(r.read(64), 64)
+    bits = r.read(64)
+    timestamps = [ts]
+    values = [_bits_float(bits)]
+    delta = 0
+    lead = trail = 0
+
+    for _ in range(count - 1):
+        if r.read_bit():
+            for _prefix, _plen, nbits in _DOD_BUCKETS:
+                if not r.read_bit():
+                    break
+            else:
+                nbits = _DOD_FALLBACK[2]
+            delta += _to_signed(r.read(nbits), nbits)
+        ts += delta
+        timestamps.append(ts)
+
+        if r.read_bit():
+            if r.read_bit():
+                lead = r.read(5)
+                sig = r.read(6) or 64
+                trail = 64 - lead - sig
+            bits ^= r.read(64 - lead - trail) << trail
+        values.append(_bits_float(bits))
+
+    return timestamps, values
@@ -0,0 +1,234 @@
+"""Write-behind buffer for high-frequency single-reading sensor pushes.
+
+``POST /weather/observations/ingest`` validates a reading, puts it in this
+process's bounded in-memory buffer and acknowledges with 202; it does not
+touch the database. A flusher task upserts the buffer in one multi-row
+statement per batch, once INGEST_BATCH_ROWS readings are waiting or the
+oldest has waited INGEST_FLUSH_INTERVAL_S. Repeated readings for the same
+(location_id, ts) coalesce in the buffer, the last one winning.
+
+When the buffer holds INGEST_BUFFER_MAX_ROWS readings (the database is slow
+or down), pushes wait up to INGEST_ENQUEUE_TIMEOUT_S for room and are then
+refused with 503 so senders back off. Failed flushes keep their readings and
+are retried with backoff: indefinitely while the database is unreachable,
+otherwise up to INGEST_MAX_FLUSH_ATTEMPTS times before the readings are
+dropped (and counted in INGEST_DROPPED). On shutdown the buffer stops accepting and is flushed before
+the database pool closes.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.core.config import settings
+from app.core.metrics import INGEST_BUFFERED, INGEST_DROPPED, INGEST_FLUSH_DURATION, INGEST_FLUSHED, INGEST_REJECTED
+from app.db.session import SessionLocal
+from app.models.weather import Location
+from app.services.live import publish
+from app.services.observations import upsert_observation_rows
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[int, datetime]
+
+
+class IngestClosed(Exception):
+    """The buffer is not running (startup not finished or shutting down)"""
+
+
+class IngestBuffer:
+    """Bounded (location_id, ts) -> reading map drained by a background flusher"""
+
+    def __init__(
+        self,
+        max_rows: Optional[int] = None,
+        batch_rows: Optional[int] = None,
+        flush_interval_s: Optional[float] = None,
+        enqueue_timeout_s: Optional[float] = None,
+    ):
+        self.max_rows = settings.INGEST_BUFFER_MAX_ROWS if max_rows is None else max_rows
+        self.batch_rows = settings.INGEST_BATCH_ROWS if batch_rows is None else batch_rows
+        self.flush_interval_s = settings.INGEST_FLUSH_INTERVAL_S if flush_interval_s is None else flush_interval_s
+        self.enqueue_timeout_s = settings.INGEST_ENQUEUE_TIMEOUT_S if enqueue_timeout_s is None else enqueue_timeout_s
+        self._pending: Dict[Key, Dict[str, Any]] = {}
+        self._oldest: Optional[float] = None  # monotonic time the oldest pending reading arrived
+        self._cond: Optional[asyncio.Condition] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closed = True
+        self._attempts: Dict[Key, int] = {}  # failed flushes of pending readings, other than connection errors
+        self._known_locations: "OrderedDict[int, None]" = OrderedDict()  # LRU of INGEST_KNOWN_LOCATIONS ids
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def start(self) -> None:
+        self._cond = asyncio.Condition()
+        self._closed = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: Optional[float] = None) -> None:
+        """Refuse new readings and flush everything still buffered, giving up
+        after `timeout` seconds if the database stays unavailable"""
+        if self._task is None:
+            return
+        async with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            logger.error("Ingest buffer drain timed out, %d readings lost", len(self._pending))
+            INGEST_DROPPED.inc(len(self._pending))
+        self._task = None
+
+    async def location_exists(self, location_id: int) -> bool:
+        """Cached check so a steady stream of pushes doesn't query locations each time"""
+        if location_id in self._known_locations:
+            self._known_locations.move_to_end(location_id)
+            return True
+        exists = await run_in_threadpool(_location_exists, location_id)
+        if exists:
+            self._known_locations[location_id] = None
+            while len(self._known_locations) > settings.INGEST_KNOWN_LOCATIONS:
+                self._known_locations.popitem(last=False)
+        return exists
+
+    async def put(self, readings: List[Dict[str, Any]]) -> bool:
+        """Buffer {location_id, ts, temp_c, source} readings. Returns False when the
+        buffer stayed full for enqueue_timeout_s; raises IngestClosed when not running."""
+        if self._closed:
+            raise IngestClosed()
+        # A batch larger than the whole buffer could never fit
+        needed = min(len(readings), self.max_rows)
+        async with self._cond:
+            try:
+                await asyncio.wait_for(
+                    self._cond.wait_for(lambda: self._closed or len(self._pending) + needed <= self.max_rows),
+                    self.enqueue_timeout_s,
+                )
+            except asyncio.TimeoutError:
+                INGEST_REJECTED.inc(len(readings))
+                return False
+            if self._closed:
+                raise IngestClosed()
+            for r in readings:
+                key = (r["location_id"], r["ts"])
+                self._pending[key] = r
+                self._attempts.pop(key, None)  # a new reading starts over
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            INGEST_BUFFERED.set(len(self._pending))
+            self._cond.notify_all()
+        return True
+
+    async def _next_batch(self) -> Optional[List[Dict[str, Any]]]:
+        """Wait for a full batch or the flush interval; None once closed and empty"""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._pending or self._closed)
+            if not self._pending:
+                return None
+            while len(self._pending) < self.batch_rows and not self._closed:
+                remaining = self._oldest + self.flush_interval_s - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._cond.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            keys = list(islice(self._pending, self.batch_rows))
+            batch = [self._pending.pop(k) for k in keys]
+            self._oldest = time.monotonic() if self._pending else None
+            INGEST_BUFFERED.set(len(self._pending))
+            self._cond.notify_all()  # room for waiting producers
+            return batch
+
+    async def _requeue(self, batch: List[Dict[str, Any]], count_attempt: bool) -> None:
+        dropped = 0
+        async with self._cond:
+            for r in batch:
+                key = (r["location_id"], r["ts"])
+                if key in self._pending:
+                    continue  # a newer reading arrived meanwhile
+                if count_attempt:
+                    self._attempts[key] = self._attempts.get(key, 0) + 1
+                    if self._attempts[key] >= settings.INGEST_MAX_FLUSH_ATTEMPTS:
+                        del self._attempts[key]
+                        dropped += 1
+                        continue
+                self._pending[key] = r
+            if self._oldest is None and self._pending:
+                self._oldest = time.monotonic()
+            INGEST_BUFFERED.set(len(self._pending))
+        if dropped:
+            logger.error("Dropping %d readings after %d failed flushes", dropped, settings.INGEST_MAX_FLUSH_ATTEMPTS)
+            INGEST_DROPPED.inc(dropped)
+
+    def _forget(self, batch: List[Dict[str, Any]]) -> None:
+        if self._attempts:
+            for r in batch:
+                self._attempts.pop((r["location_id"], r["ts"]), None)
+
+    async def _run(self) -> None:
+        backoff = self.flush_interval_s
+        while True:
+            batch = await self._next_batch()
+            if batch is None:
+                return
+            started = time.perf_counter()
+            try:
+                written = await run_in_threadpool(_write_batch, batch)
+            except Exception as e:
+                # Database unavailable (OperationalError): keep the readings for as long as
+                # it takes; the buffer fills up and pushes get 503 until it is back. Anything
+                # else (serialization failures, driver errors, bugs) is retried a few times.
+                unavailable = isinstance(e, OperationalError)
+                if unavailable:
+                    logger.warning("Ingest flush of %d readings failed, retrying in %.1fs: %s", len(batch), backoff, e)
+                else:
+                    logger.exception("Ingest flush of %d readings failed, retrying in %.1fs", len(batch), backoff)
+                await self._requeue(batch, count_attempt=not unavailable)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+            self._forget(batch)
+            backoff = self.flush_interval_s
+            INGEST_FLUSHED.inc(written)
+            INGEST_FLUSH_DURATION.observe(time.perf_counter() - started)
+            if written < len(batch):
+                INGEST_DROPPED.inc(len(batch) - written)
+                self._known_locations.clear()
+
+
+def _location_exists(location_id: int) -> bool:
+    with SessionLocal() as db:
+        return db.query(Location.id).filter(Location.id == location_id).first() is not None
+
+
+def _write_batch(batch: List[Dict[str, Any]]) -> int:
+    with SessionLocal() as db:
+        try:
+            upsert_observation_rows(db, batch)
+            publish(db, batch)
+            db.commit()
+            return len(batch)
+        except IntegrityError:
+            # A location was deleted after its readings were accepted
+            db.rollback()
+        location_ids = {r["location_id"] for r in batch}
+        existing = {row[0] for row in db.query(Location.id).filter(Location.id.in_(location_ids))}
+        rows = [r for r in batch if r["location_id"] in existing]
+        logger.warning("Dropping %d buffered readings for deleted locations", len(batch) - len(rows))
+        if rows:
+            upsert_observation_rows(db, rows)
+            publish(db, rows)
+            db.commit()
+        return len(rows)
+
+
+ingest_buffer = IngestBuffer()
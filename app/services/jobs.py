@@ -0,0 +1,409 @@
+"""Database-backed background jobs on the ``requests`` table.
+
+Long operations (multi-year backfills, file imports, large range deletes,
+Parquet exports) are enqueued as ``Request`` rows and the API returns the
+job id straight away. Worker threads claim queued rows with
+``FOR UPDATE SKIP LOCKED``, so every API process and any number of
+``python -m app.cli.job_worker`` processes can share one queue without
+running a job twice.
+
+- Handlers report progress through JobContext.update(), which also refreshes
+  the heartbeat and picks up cancellation: a cancelled job stops at its next
+  update. Progress is kept across attempts, so handlers can resume.
+- A failed job is retried with exponential backoff up to max_attempts.
+- Running jobs whose heartbeat is older than JOB_STALE_AFTER_S (the worker
+  died) go back to the queue; jobs interrupted by a worker shutdown are
+  requeued immediately without using up an attempt.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, func, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.http import close_http_client
+from app.db.session import SessionLocal
+from app.models.request import Request
+from app.services.cold_storage import as_utc
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (COMPLETED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobInterrupted(Exception):
+    """Raised inside a handler when its worker is shutting down"""
+
+
+Handler = Callable[[Dict[str, Any], "JobContext"], Optional[Dict[str, Any]]]
+_handlers: Dict[str, Handler] = {}
+
+
+def job_handler(request_type: str):
+    def register(fn: Handler) -> Handler:
+        _handlers[request_type] = fn
+        return fn
+    return register
+
+
+def enqueue(
+    db: Session,
+    request_type: str,
+    params: Dict[str, Any],
+    location: Optional[str] = None,
+    max_attempts: Optional[int] = None,
+) -> Request:
+    """Add a job to the queue and commit; datetimes in `params` are stored as ISO strings"""
+    job = Request(
+        request_type=request_type,
+        location=location,
+        params=json.loads(json.dumps(params, default=lambda v: v.isoformat() if isinstance(v, datetime) else str(v))),
+        status=QUEUED,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    logger.info("Queued %s job %d", request_type, job.id)
+    return job
+
+
+def job_to_dict(job: Request) -> Dict[str, Any]:
+    return {
+        "id": job.id,
+        "request_type": job.request_type,
+        "location": job.location,
+        "status": job.status,
+        "params": job.params,
+        "progress": job.progress,
+        "result": job.result,
+        "error_message": job.error_message,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "cancel_requested": job.cancel_requested,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "completed_at": job.completed_at,
+    }
+
+
+def get_job(db: Session, job_id: int) -> Optional[Request]:
+    return db.query(Request).filter(Request.id == job_id).first()
+
+
+def list_jobs(
+    db: Session, status: Optional[str] = None, request_type: Optional[str] = None, limit: int = 50
+) -> List[Request]:
+    query = db.query(Request)
+    if status:
+        query = query.filter(Request.status == status)
+    if request_type:
+        query = query.filter(Request.request_type == request_type)
+    return query.order_by(Request.id.desc()).limit(limit).all()
+
+
+def cancel_job(db: Session, job_id: int) -> Optional[Request]:
+    """Cancel a queued job now, or flag a running one to stop at its next progress update"""
+    job = db.query(Request).filter(Request.id == job_id).with_for_update().first()
+    if job is None:
+        return None
+    if job.status == QUEUED:
+        job.status = CANCELLED
+        job.completed_at = func.now()
+    elif job.status == RUNNING:
+        job.cancel_requested = True
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+class JobContext:
+    """Handed to handlers: progress reporting, cancellation and an event loop for async work"""
+
+    def __init__(self, job_id: int, progress: Optional[Dict[str, Any]], stopping: threading.Event,
+                 loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.job_id = job_id
+        self.progress: Dict[str, Any] = dict(progress or {})
+        self._stopping = stopping
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._last_write = 0.0
+
+    def update(self, force: bool = False, **progress: Any) -> None:
+        """Merge `progress` and, at most once a second (or when forced), persist it.
+        Raises JobCancelled / JobInterrupted when the job should stop."""
+        with self._lock:
+            self.progress.update(progress)
+            if self._stopping.is_set():
+                raise JobInterrupted()
+            now = time.monotonic()
+            if not force and now - self._last_write < 1.0:
+                return
+            self._last_write = now
+            with SessionLocal() as db:
+                cancel = db.execute(
+                    update(Request)
+                    .where(Request.id == self.job_id)
+                    .values(progress=self.progress, heartbeat_at=func.now())
+                    .returning(Request.cancel_requested)
+                ).scalar()
+                db.commit()
+            if cancel:
+                raise JobCancelled()
+
+    def run(self, coro):
+        """Run a coroutine on the worker's event loop"""
+        if self._loop is None:
+            return asyncio.run(coro)
+        return self._loop.run_until_complete(coro)
+
+
+def requeue_stale(db: Session) -> int:
+    """Return running jobs with an expired heartbeat to the queue (or fail them when out of attempts)"""
+    stale_before = func.now() - timedelta(seconds=settings.JOB_STALE_AFTER_S)
+    stale = and_(Request.status == RUNNING, Request.heartbeat_at < stale_before)
+    failed = db.execute(
+        update(Request)
+        .where(stale, Request.attempts >= Request.max_attempts)
+        .values(status=FAILED, error_message="Worker stopped responding", locked_by=None, completed_at=func.now())
+    ).rowcount
+    requeued = db.execute(
+        update(Request).where(stale).values(status=QUEUED, locked_by=None, run_after=func.now())
+    ).rowcount
+    db.commit()
+    if failed or requeued:
+        logger.warning("Stale jobs: %d requeued, %d failed", requeued, failed)
+    return requeued
+
+
+def claim_next(worker_id: str) -> Optional[Tuple[int, str, Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """Lock the oldest runnable job for `worker_id`: (id, request_type, params, progress)"""
+    with SessionLocal() as db:
+        job = (
+            db.query(Request)
+            .filter(Request.status == QUEUED, Request.run_after <= func.now())
+            .order_by(Request.run_after, Request.id)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = RUNNING
+        job.attempts += 1
+        job.locked_by = worker_id
+        job.started_at = func.now()
+        job.heartbeat_at = func.now()
+        claimed = (job.id, job.request_type, job.params, job.progress)
+        db.commit()
+        return claimed
+
+
+def _finish(job_id: int, **values: Any) -> None:
+    with SessionLocal() as db:
+        db.execute(update(Request).where(Request.id == job_id).values(locked_by=None, **values))
+        db.commit()
+
+
+def run_job(job_id: int, request_type: str, params: Dict[str, Any], progress: Optional[Dict[str, Any]],
+            stopping: Optional[threading.Event] = None, loop: Optional[asyncio.AbstractEventLoop] = None) -> str:
+    """Run a claimed job to a final (or requeued) state and return that status"""
+    handler = _handlers.get(request_type)
+    if handler is None:
+        _finish(job_id, status=FAILED, error_message=f"Unknown job type {request_type!r}", completed_at=func.now())
+        return FAILED
+
+    ctx = JobContext(job_id, progress, stopping or threading.Event(), loop)
+    started = time.monotonic()
+    try:
+        result = handler(params, ctx)
+    except JobCancelled:
+        logger.info("Job %d cancelled", job_id)
+        _finish(job_id, status=CANCELLED, progress=ctx.progress, completed_at=func.now())
+        return CANCELLED
+    except JobInterrupted:
+        logger.info("Job %d interrupted by shutdown, requeued", job_id)
+        _finish(job_id, status=QUEUED, progress=ctx.progress, attempts=Request.attempts - 1, run_after=func.now())
+        return QUEUED
+    except Exception as e:
+        logger.exception("Job %d (%s) failed", job_id, request_type)
+        with SessionLocal() as db:
+            job = db.get(Request, job_id)
+            retry = job.attempts < job.max_attempts
+        if retry:
+            delay = settings.JOB_RETRY_BACKOFF_S * 2 ** (job.attempts - 1)
+            _finish(job_id, status=QUEUED, progress=ctx.progress, error_message=str(e),
+                    run_after=func.now() + timedelta(seconds=delay))
+            return QUEUED
+        _finish(job_id, status=FAILED, progress=ctx.progress, error_message=str(e), completed_at=func.now())
+        return FAILED
+
+    logger.info("Job %d (%s) completed in %.1fs", job_id, request_type, time.monotonic() - started)
+    _finish(job_id, status=COMPLETED, progress=ctx.progress, result=result, error_message=None, completed_at=func.now())
+    return COMPLETED
+
+
+class JobWorkerPool:
+    """Threads that claim and run jobs until stop() is called"""
+
+    def __init__(self, workers: int, poll_interval: Optional[float] = None):
+        self.workers = workers
+        self.poll_interval = settings.JOB_POLL_INTERVAL_S if poll_interval is None else poll_interval
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._loop, args=(f"{self._worker_prefix}:{i}",), name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Started %d job worker(s)", self.workers)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop claiming jobs; running jobs are requeued at their next progress update"""
+        self._stopping.set()
+        deadline = time.monotonic() + (timeout or 0)
+        for thread in self._threads:
+            thread.join(None if timeout is None else max(0.0, deadline - time.monotonic()))
+
+    def _loop(self, worker_id: str) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        last_stale_check = 0.0
+        try:
+            while not self._stopping.is_set():
+                try:
+                    if time.monotonic() - last_stale_check > settings.JOB_STALE_AFTER_S / 2:
+                        with SessionLocal() as db:
+                            requeue_stale(db)
+                        last_stale_check = time.monotonic()
+                    claimed = claim_next(worker_id)
+                except Exception:
+                    logger.exception("Job queue poll failed")
+                    claimed = None
+                if claimed is None:
+                    self._stopping.wait(self.poll_interval)
+                    continue
+                try:
+                    run_job(*claimed, stopping=self._stopping, loop=loop)
+                except Exception:
+                    # e.g. recording the outcome failed; the job stays running until requeue_stale()
+                    logger.exception("Job %d could not be finished", claimed[0])
+        finally:
+            loop.run_until_complete(close_http_client())
+            loop.close()
+
+
+# Handlers
+
+def _ts(value: str) -> datetime:
+    return as_utc(datetime.fromisoformat(value.replace("Z", "+00:00")))
+
+
+def _windows(start: datetime, end: datetime, span: timedelta) -> Iterator[Tuple[datetime, datetime]]:
+    """Consecutive inclusive [window_start, window_end] ranges covering [start, end]"""
+    ws = start
+    while ws <= end:
+        yield ws, min(ws + span - timedelta(microseconds=1), end)
+        ws += span
+
+
+@job_handler("backfill")
+def backfill_job(params: Dict[str, Any], ctx: JobContext) -> Dict[str, Any]:
+    """Backfill a range from OpenWeather a week at a time, resuming after the last stored week"""
+    from app.models.weather import Location
+    from app.services.backfill import backfill_observations
+
+    start, end = _ts(params["start_ts"]), _ts(params["end_ts"])
+    if ctx.progress.get("next_ts"):
+        start = max(start, _ts(ctx.progress["next_ts"]))
+    stored = ctx.progress.get("stored", 0)
+
+    with SessionLocal() as db:
+        location = db.get(Location, params["location_id"])
+        if location is None:
+            raise ValueError(f"Location {params['location_id']} not found")
+        for ws, we in _windows(start, end, timedelta(days=7)):
+            count = ctx.run(backfill_observations(db, location, ws, we, params.get("force", False)))
+            if count is None:
+                raise RuntimeError("Could not fetch history from OpenWeather")
+            stored += count
+            ctx.update(stored=stored, next_ts=(we + timedelta(microseconds=1)).isoformat())
+    return {"location_id": params["location_id"], "stored": stored}
+
+
+@job_handler("delete")
+def delete_job(params: Dict[str, Any], ctx: JobContext) -> Dict[str, Any]:
+    """Batched range delete; batches already committed stay deleted on retry"""
+    from app.services.range_delete import delete_range
+
+    with SessionLocal() as db:
+        stats = delete_range(
+            db, params.get("location_id"), _ts(params["start_ts"]), _ts(params["end_ts"]),
+            on_progress=lambda stats: ctx.update(**stats),
+        )
+    return {"location_id": params.get("location_id"), **stats}
+
+
+@job_handler("import")
+def import_job(params: Dict[str, Any], ctx: JobContext) -> Dict[str, Any]:
+    """Bulk import files under IMPORT_DIR; checkpoints make retries resume"""
+    from app.services.bulk_import import ImportOptions, import_files
+
+    root = Path(settings.IMPORT_DIR)
+    opts = ImportOptions(checkpoint_dir=str(root / ".checkpoints" / str(ctx.job_id)))
+    return import_files(
+        [str(root / p) for p in params["paths"]],
+        workers=params.get("workers", 1),
+        opts=opts,
+        on_progress=lambda totals: ctx.update(**totals),
+    )
+
+
+@job_handler("export")
+def export_job(params: Dict[str, Any], ctx: JobContext) -> Dict[str, Any]:
+    """Parquet export to EXPORT_DIR/<job id> unless params name an out_dir"""
+    from app.services.bulk_export import ExportProgress, ExportSpec, export_observations
+
+    class Progress(ExportProgress):
+        def add(self, rows: int, path: Optional[str]) -> None:
+            super().add(rows, path)
+            ctx.update(partitions_total=self.partitions_total, partitions_done=self.partitions_done, rows=self.rows)
+
+    spec = ExportSpec(
+        location_ids=params["location_ids"],
+        start_ts=_ts(params["start_ts"]),
+        end_ts=_ts(params["end_ts"]),
+        out_dir=params.get("out_dir") or str(Path(settings.EXPORT_DIR) / str(ctx.job_id)),
+        compression=params.get("compression", "zstd"),
+        workers=params.get("workers", 1),
+    )
+    return export_observations(spec, Progress())
+
+
+@job_handler("climatology")
+def climatology_job(params: Dict[str, Any], ctx: JobContext) -> Dict[str, Any]:
+    """Rebuild climatology normals; locations already rebuilt are no longer stale on retry"""
+    from app.services.climatology import refresh
+
+    with SessionLocal() as db:
+        return refresh(db, params.get("location_ids"), full=params.get("full", False),
+                       on_progress=lambda stats: ctx.update(**stats))
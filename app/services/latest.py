@@ -0,0 +1,108 @@
+"""Latest reading per location.
+
+``latest_observations`` holds the newest observation of every location. It
+is maintained by statement-level triggers on ``weather_observations``, so
+every write path (upserts, CreateOne, buffered ingest, bulk imports, range
+deletes) keeps it current: a write only replaces a location's reading when
+its ts is at least as new, and deleting the reading falls back to the
+newest remaining row.
+
+LatestCache sits in front: a per-process LRU of LATEST_CACHE_SIZE
+locations, with entries kept LATEST_CACHE_TTL_S. Writes through this
+process's sessions drop the entries of the locations they touched once
+they commit; other workers see new readings within the TTL. Cache misses
+are filled with one primary-key lookup for all of them.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import LATEST_CACHE_LOOKUPS
+from app.db.session import SessionLocal
+from app.models.weather import LatestObservation
+
+_TOUCHED = "latest_touched"
+
+
+class LatestCache:
+    """Bounded LRU of location_id -> latest reading dict (or None: no observations)"""
+
+    def __init__(self, maxsize: Optional[int] = None, ttl_s: Optional[float] = None):
+        self.maxsize = settings.LATEST_CACHE_SIZE if maxsize is None else maxsize
+        self.ttl_s = settings.LATEST_CACHE_TTL_S if ttl_s is None else ttl_s
+        self._cache: "OrderedDict[int, Tuple[float, Optional[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0  # bumped by invalidate()
+
+    def get_many(self, db: Session, location_ids: List[int]) -> Dict[int, Optional[Dict[str, Any]]]:
+        """Latest reading of each location (None without observations), in `location_ids` order"""
+        now = time.monotonic()
+        found: Dict[int, Optional[Dict[str, Any]]] = {}
+        with self._lock:
+            for location_id in location_ids:
+                entry = self._cache.get(location_id)
+                if entry is not None and entry[0] > now:
+                    self._cache.move_to_end(location_id)
+                    found[location_id] = entry[1]
+            generation = self._generation
+        missing = [lid for lid in dict.fromkeys(location_ids) if lid not in found]
+        LATEST_CACHE_LOOKUPS.labels("hit").inc(len(location_ids) - len(missing))
+        if missing:
+            LATEST_CACHE_LOOKUPS.labels("miss").inc(len(missing))
+            fetched: Dict[int, Optional[Dict[str, Any]]] = dict.fromkeys(missing)
+            rows = db.execute(
+                select(LatestObservation.location_id, LatestObservation.ts,
+                       LatestObservation.temp_c, LatestObservation.source)
+                .where(LatestObservation.location_id.in_(missing))
+            )
+            for location_id, ts, temp_c, source in rows:
+                fetched[location_id] = {"location_id": location_id, "ts": ts, "temp_c": temp_c, "source": source}
+            found.update(fetched)
+            with self._lock:
+                if generation == self._generation:  # else invalidated meanwhile; don't cache stale readings
+                    for location_id, reading in fetched.items():
+                        self._cache[location_id] = (now + self.ttl_s, reading)
+                        self._cache.move_to_end(location_id)
+                    while len(self._cache) > self.maxsize:
+                        self._cache.popitem(last=False)
+        return {lid: found[lid] for lid in location_ids}
+
+    def invalidate(self, location_ids: Optional[Iterable[int]] = None) -> None:
+        """Drop `location_ids` (default: everything)"""
+        with self._lock:
+            if location_ids is None:
+                self._cache.clear()
+            else:
+                for location_id in location_ids:
+                    self._cache.pop(location_id, None)
+            self._generation += 1
+
+
+def note_write(db: Session, location_ids: Optional[Iterable[int]]) -> None:
+    """Drop the cached readings of `location_ids` (None: all) when db's transaction commits"""
+    touched = db.info.setdefault(_TOUCHED, set())
+    if location_ids is None or None in touched:
+        touched.clear()
+        touched.add(None)
+    else:
+        touched.update(location_ids)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _after_commit(session: Session) -> None:
+    touched = session.info.pop(_TOUCHED, None)
+    if touched:
+        latest_cache.invalidate(None if None in touched else touched)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_TOUCHED, None)
+
+
+latest_cache = LatestCache()
@@ -0,0 +1,218 @@
+"""Live fan-out of newly written observations to SSE and WebSocket subscribers.
+
+Writers call publish(db, rows) inside their transaction; the rows reach
+subscribers of their locations only once that transaction commits, and are
+discarded if it rolls back. A subscriber costs nothing while its locations
+are idle: there is no polling, only a heartbeat to keep proxies from closing
+the stream.
+
+By default delivery is in-process, so a subscriber only sees writes served
+by its own worker. With LIVE_NOTIFY=true rows are sent through Postgres
+NOTIFY on the ``observations`` channel and every worker LISTENs, so all
+subscribers see every write whichever worker or job thread made it.
+
+Each subscription has a bounded queue. A subscriber that falls
+LIVE_QUEUE_SIZE events behind is sent an overflow event and dropped, and
+should re-read the range it missed and resubscribe.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+import orjson
+import psycopg
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import LIVE_SUBSCRIBERS
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "observations"
+NOTIFY_MAX_BYTES = 7000  # Postgres caps a NOTIFY payload at 8000 bytes
+_PENDING = "live_pending"
+
+OVERFLOW = {"overflow": True}
+CLOSED = {"closed": True}
+
+
+class Subscription:
+    """Bounded queue of events for one client"""
+
+    def __init__(self, location_ids: Iterable[int], maxsize: int):
+        self.location_ids = frozenset(location_ids)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize + 1)  # one slot kept for OVERFLOW / CLOSED
+        self._maxsize = maxsize
+        self.done = False
+
+    def offer(self, item: Dict[str, Any]) -> None:
+        if self.done:
+            return
+        if item is CLOSED or item is OVERFLOW:
+            self.done = True
+        elif self._queue.qsize() >= self._maxsize:
+            self.done = True
+            item = OVERFLOW
+        self._queue.put_nowait(item)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Next event, OVERFLOW or CLOSED; None when `timeout` passes first"""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class ObservationBroker:
+    """Routes committed observation rows to the subscriptions of their locations"""
+
+    def __init__(self):
+        self._subs: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        if settings.LIVE_NOTIFY:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        for subs in list(self._subs.values()):
+            for sub in list(subs):
+                sub.offer(CLOSED)
+        self._loop = None
+
+    def subscribe(self, location_ids: Iterable[int]) -> Subscription:
+        sub = Subscription(location_ids, settings.LIVE_QUEUE_SIZE)
+        for location_id in sub.location_ids:
+            self._subs[location_id].add(sub)
+        LIVE_SUBSCRIBERS.inc()
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        for location_id in sub.location_ids:
+            subs = self._subs.get(location_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[location_id]
+        LIVE_SUBSCRIBERS.dec()
+
+    def has_subscribers(self, location_id: int) -> bool:
+        return location_id in self._subs
+
+    def deliver(self, events: List[Dict[str, Any]]) -> None:
+        """Hand `events` to subscribers; safe to call from any thread"""
+        loop = self._loop
+        if loop is None or not events:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fan_out(events)
+        else:
+            loop.call_soon_threadsafe(self._fan_out, events)
+
+    def _fan_out(self, events: List[Dict[str, Any]]) -> None:
+        for ev in events:
+            for sub in list(self._subs.get(ev["location_id"], ())):
+                sub.offer(ev)
+
+    async def _listen(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                conn = await psycopg.AsyncConnection.connect(
+                    host=settings.DB_HOST or None, port=settings.DB_PORT, user=settings.DB_USER,
+                    password=settings.DB_PASS, dbname=settings.DB_NAME, autocommit=True,
+                )
+                async with conn:
+                    await conn.execute(f"LISTEN {CHANNEL}")
+                    logger.info("Listening for observation notifications")
+                    backoff = 1.0
+                    async for notify in conn.notifies():
+                        try:
+                            self._fan_out([orjson.loads(notify.payload)])
+                        except (orjson.JSONDecodeError, KeyError):
+                            logger.warning("Ignoring malformed %s notification", CHANNEL)
+            except psycopg.OperationalError as e:
+                logger.warning("Observation listener disconnected, retrying in %.0fs: %s", backoff, e)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+
+def _normalize(row: Dict[str, Any]) -> Dict[str, Any]:
+    ts = row["ts"]
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts)
+    return {"ts": ts, "temp_c": row["temp_c"], "source": row.get("source")}
+
+
+def _events(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    by_location: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    for row in rows:
+        by_location[row["location_id"]].append(_normalize(row))
+    return [{"location_id": lid, "observations": obs} for lid, obs in by_location.items()]
+
+
+def _notify_payloads(rows: List[Dict[str, Any]]) -> Iterator[str]:
+    """Events for `rows`, split so each encodes under NOTIFY_MAX_BYTES"""
+    for ev in _events(rows):
+        chunk: List[bytes] = []
+        size = 0
+        for obs in ev["observations"]:
+            encoded = orjson.dumps(obs)
+            if chunk and size + len(encoded) > NOTIFY_MAX_BYTES:
+                yield _payload(ev["location_id"], chunk)
+                chunk, size = [], 0
+            chunk.append(encoded)
+            size += len(encoded) + 1
+        if chunk:
+            yield _payload(ev["location_id"], chunk)
+
+
+def _payload(location_id: int, encoded: List[bytes]) -> str:
+    return '{"location_id":%d,"observations":[%s]}' % (location_id, b",".join(encoded).decode())
+
+
+def publish(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """Queue {location_id, ts, temp_c, source} rows written in db's current
+    transaction for live subscribers; they are delivered when it commits"""
+    if not settings.LIVE_ENABLED or not rows:
+        return
+    if settings.LIVE_NOTIFY:
+        # NOTIFY is transactional: Postgres delivers it on commit
+        for payload in _notify_payloads(rows):
+            db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": payload})
+        return
+    rows = [r for r in rows if broker.has_subscribers(r["location_id"])]
+    if rows:
+        db.info.setdefault(_PENDING, []).extend(rows)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _after_commit(session: Session) -> None:
+    rows = session.info.pop(_PENDING, None)
+    if rows:
+        broker.deliver(_events(rows))
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+broker = ObservationBroker()
@@ -0,0 +1,182 @@
+"""Batch creation and bulk import of locations.
+
+A location is identified by its normalized name, admin1 and country
+(``location_key()``: lowercased, whitespace collapsed, null as ''), backed by
+the unique index ``ux_locations_name_admin1_country``. Creating one that
+already exists is a no-op that reports the existing id.
+
+insert_locations() serves the API: chunks of LOCATION_INSERT_CHUNK rows,
+each one ``INSERT ... ON CONFLICT DO NOTHING`` that also looks up the ids of
+the rows that were already there. import_geonames() loads GeoNames dumps
+(allCountries.txt, cities500.txt, ...) by COPYing batches into a staging
+table and merging them the same way.
+"""
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.bulk import copy_in
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+STAGE_TABLE = "locations_stage"
+
+# Rows come in as parallel arrays, so a chunk is one statement with five parameters.
+# Rows inserted by the CTE are not visible to the outer join on locations, which
+# therefore only finds the ones that existed before.
+_INSERT_CHUNK = text("""
+    WITH input AS (
+        SELECT * FROM unnest(
+            CAST(:name AS text[]), CAST(:country AS text[]), CAST(:admin1 AS text[]),
+            CAST(:latitude AS float8[]), CAST(:longitude AS float8[])
+        ) WITH ORDINALITY AS i(name, country, admin1, latitude, longitude, ord)
+    ), inserted AS (
+        INSERT INTO locations (name, country, admin1, latitude, longitude)
+        SELECT name, country, admin1, latitude, longitude FROM input ORDER BY ord
+        ON CONFLICT DO NOTHING
+        RETURNING id, location_key(name) AS k1, location_key(admin1) AS k2, location_key(country) AS k3
+    )
+    SELECT coalesce(n.id, l.id), n.id IS NOT NULL
+    FROM input i
+    LEFT JOIN inserted n
+        ON (n.k1, n.k2, n.k3) = (location_key(i.name), location_key(i.admin1), location_key(i.country))
+    LEFT JOIN locations l
+        ON (location_key(l.name), location_key(l.admin1), location_key(l.country))
+         = (location_key(i.name), location_key(i.admin1), location_key(i.country))
+    ORDER BY i.ord
+""")
+
+# A row committed by a concurrent transaction while ON CONFLICT waited on it is
+# neither inserted nor in _INSERT_CHUNK's snapshot; this next statement sees it
+_LOOKUP_IDS = text("""
+    SELECT l.id
+    FROM unnest(CAST(:name AS text[]), CAST(:country AS text[]), CAST(:admin1 AS text[]))
+         WITH ORDINALITY AS i(name, country, admin1, ord)
+    LEFT JOIN locations l
+        ON (location_key(l.name), location_key(l.admin1), location_key(l.country))
+         = (location_key(i.name), location_key(i.admin1), location_key(i.country))
+    ORDER BY i.ord
+""")
+
+STAGE_DDL = text(f"""
+    CREATE TEMP TABLE IF NOT EXISTS {STAGE_TABLE} (
+        name        TEXT,
+        country     TEXT,
+        admin1      TEXT,
+        latitude    DOUBLE PRECISION,
+        longitude   DOUBLE PRECISION,
+        population  BIGINT
+    ) ON COMMIT DELETE ROWS
+""")
+
+# The most populous of same-named places in one admin1 wins within a batch,
+# and existing locations win over all of them
+MERGE_SQL = text(f"""
+    INSERT INTO locations (name, country, admin1, latitude, longitude)
+    SELECT DISTINCT ON (location_key(name), location_key(admin1), location_key(country))
+           name, country, admin1, latitude, longitude
+    FROM {STAGE_TABLE}
+    ORDER BY location_key(name), location_key(admin1), location_key(country), population DESC
+    ON CONFLICT DO NOTHING
+""")
+
+# allCountries.txt / citiesN.txt columns
+_NAME, _LATITUDE, _LONGITUDE, _FEATURE_CLASS, _COUNTRY, _ADMIN1, _POPULATION = 1, 4, 5, 6, 8, 10, 14
+
+
+def insert_locations(db: Session, rows: Sequence[Dict[str, Any]]) -> Tuple[List[int], int]:
+    """Create the locations in `rows` that don't exist yet. Does not commit.
+    Returns (id of each row's location, in order; number created)."""
+    ids: List[int] = []
+    created = set()  # a name repeated within a chunk is created once
+    for start in range(0, len(rows), settings.LOCATION_INSERT_CHUNK):
+        chunk = rows[start:start + settings.LOCATION_INSERT_CHUNK]
+        params = {col: [row.get(col) for row in chunk] for col in ("name", "country", "admin1", "latitude", "longitude")}
+        chunk_ids = []
+        for location_id, is_new in db.execute(_INSERT_CHUNK, params):
+            chunk_ids.append(location_id)
+            if is_new:
+                created.add(location_id)
+        raced = [i for i, location_id in enumerate(chunk_ids) if location_id is None]
+        if raced:
+            lookup = {col: [params[col][i] for i in raced] for col in ("name", "country", "admin1")}
+            for i, location_id in zip(raced, db.execute(_LOOKUP_IDS, lookup).scalars()):
+                chunk_ids[i] = location_id
+        ids.extend(chunk_ids)
+    return ids, len(created)
+
+
+@dataclass
+class GeoNamesOptions:
+    feature_classes: Optional[Sequence[str]] = ("P",)  # None: every feature class
+    min_population: int = 0
+    admin1_names: Optional[Dict[str, str]] = None  # "US.CA" -> "California"; else admin1 is the code
+    batch_rows: int = 100_000
+
+
+def read_admin1_codes(path: str) -> Dict[str, str]:
+    """admin1CodesASCII.txt: "US.CA<TAB>California<TAB>California<TAB>5332921" -> {"US.CA": "California"}"""
+    names = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) >= 2:
+                names[fields[0]] = fields[1]
+    return names
+
+
+def _geonames_rows(path: str, opts: GeoNamesOptions, counts: Dict[str, int]) -> Iterator[Tuple]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            counts["read"] += 1
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 15 or line.startswith("#"):
+                counts["skipped"] += 1
+                continue
+            if opts.feature_classes and fields[_FEATURE_CLASS] not in opts.feature_classes:
+                continue
+            population = int(fields[_POPULATION] or 0)
+            if population < opts.min_population:
+                continue
+            country = fields[_COUNTRY] or None
+            admin1 = fields[_ADMIN1] or None
+            if admin1 is not None and opts.admin1_names is not None:
+                admin1 = opts.admin1_names.get(f"{country}.{admin1}", admin1)
+            try:
+                latitude, longitude = float(fields[_LATITUDE]), float(fields[_LONGITUDE])
+            except ValueError:
+                counts["skipped"] += 1
+                continue
+            yield fields[_NAME], country, admin1, latitude, longitude, population
+
+
+def _batches(rows: Iterator[Tuple], size: int) -> Iterator[List[Tuple]]:
+    batch: List[Tuple] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_geonames(path: str, opts: Optional[GeoNamesOptions] = None) -> Dict[str, int]:
+    """COPY a GeoNames dump into locations, one committed batch at a time. Re-running it is harmless."""
+    opts = opts or GeoNamesOptions()
+    counts = {"read": 0, "skipped": 0, "staged": 0, "created": 0}
+    with engine.connect() as conn:
+        conn.execute(STAGE_DDL)
+        conn.commit()
+        for batch in _batches(_geonames_rows(path, opts, counts), opts.batch_rows):
+            copy_in(conn, STAGE_TABLE, ["name", "country", "admin1", "latitude", "longitude", "population"], rows=batch)
+            counts["staged"] += len(batch)
+            counts["created"] += conn.execute(MERGE_SQL).rowcount
+            conn.commit()
+            logger.info("%d line(s) read, %d location(s) created", counts["read"], counts["created"])
+    return counts
@@ -0,0 +1,95 @@
+"""Cached resolution of free-text location queries to a single location.
+
+The weather routes accept a location name fragment (``q`` /
+``q_fuzzy_location``). resolve() normalizes it (case, surrounding and
+repeated whitespace) and picks one location deterministically: an exact name
+match first, then a name starting with the query, then one containing it;
+ties go to the shortest name, then the lowest id.
+
+Results, including misses, are kept in a per-process LRU of
+LOCATION_CACHE_SIZE entries, so repeated queries don't touch the locations
+table. Creating a location clears this process's cache, since a new location
+can outrank cached answers. Other workers pick up new locations within
+LOCATION_CACHE_TTL_S.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import LOCATION_CACHE_LOOKUPS
+from app.models.weather import Location
+
+
+def normalize_query(q: str) -> str:
+    return " ".join(q.lower().split())
+
+
+def location_to_dict(location: Location) -> Dict[str, Any]:
+    return {
+        "id": location.id,
+        "name": location.name,
+        "country": location.country,
+        "admin1": location.admin1,
+        "latitude": location.latitude,
+        "longitude": location.longitude,
+    }
+
+
+def best_match(db: Session, key: str) -> Optional[Location]:
+    """Best-ranked location whose lowercased name contains `key` (already normalized)"""
+    name = func.lower(Location.name)
+    rank = case((name == key, 0), (name.startswith(key, autoescape=True), 1), else_=2)
+    return (
+        db.query(Location)
+        .filter(name.contains(key, autoescape=True))
+        .order_by(rank, func.length(Location.name), Location.id)
+        .first()
+    )
+
+
+class LocationResolver:
+    """Bounded LRU of normalized query -> location dict (or None for no match)"""
+
+    def __init__(self, maxsize: Optional[int] = None, ttl_s: Optional[float] = None):
+        self.maxsize = settings.LOCATION_CACHE_SIZE if maxsize is None else maxsize
+        self.ttl_s = settings.LOCATION_CACHE_TTL_S if ttl_s is None else ttl_s
+        self._cache: "OrderedDict[str, Tuple[float, Optional[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0  # bumped by invalidate()
+
+    def resolve(self, db: Session, q: str) -> Optional[Dict[str, Any]]:
+        """Location for the free-text query `q`, or None"""
+        key = normalize_query(q)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > now:
+                self._cache.move_to_end(key)
+                LOCATION_CACHE_LOOKUPS.labels("hit").inc()
+                return entry[1]
+            generation = self._generation
+        LOCATION_CACHE_LOOKUPS.labels("miss").inc()
+
+        location = best_match(db, key) if key else None
+        result = location_to_dict(location) if location is not None else None
+        with self._lock:
+            if generation != self._generation:
+                return result  # invalidated while we were querying; don't cache a stale answer
+            self._cache[key] = (now + self.ttl_s, result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return result
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._generation += 1
+
+
+location_resolver = LocationResolver()
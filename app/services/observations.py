@@ -0,0 +1,172 @@
+from datetime import datetime
+from typing import Any, Dict, List, Sequence, Tuple
+import numpy as np
+from sqlalchemy import BigInteger, Select, and_, cast, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.models.weather import ObservationArchive, WeatherObservation
+from app.services.cold_storage import as_utc, read_archived
+from app.services.latest import note_write
+
+# psycopg caps a statement at 65535 bind parameters
+UPSERT_CHUNK_SIZE = 10000
+
+
+def upsert_observations(db: Session, location_id: int, observations: List[Dict[str, Any]]) -> int:
+    """Insert or update observations on (location_id, ts) using ON CONFLICT.
+    Does not commit; returns the number of rows written."""
+    return upsert_observation_rows(db, [
+        {
+            "location_id": location_id,
+            "ts": obs["ts"],
+            "temp_c": obs["temp_c"],
+            "source": obs.get("source"),
+        }
+        for obs in observations
+    ])
+
+
+def _dedupe(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Last row per (location_id, ts): one INSERT ... ON CONFLICT can't update a row twice"""
+    latest: Dict[Tuple[int, Any], Dict[str, Any]] = {}
+    for row in rows:
+        ts = row["ts"]
+        key = (row["location_id"], datetime.fromisoformat(ts) if isinstance(ts, str) else ts)
+        latest.pop(key, None)  # keep the order of last occurrences
+        latest[key] = row
+    return list(latest.values())
+
+
+def upsert_observation_rows(db: Session, rows: List[Dict[str, Any]]) -> int:
+    """upsert_observations() for {location_id, ts, temp_c, source} rows spanning any
+    number of locations. A (location_id, ts) repeated within `rows` takes its last reading."""
+    rows = _dedupe(rows)
+    for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        stmt = pg_insert(WeatherObservation).values(rows[i:i + UPSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_weather_observations_location_id_ts",
+            set_={
+                "temp_c": stmt.excluded.temp_c,
+                "source": stmt.excluded.source,
+                "updated_at": func.now(),
+            },
+        )
+        db.execute(stmt)
+
+    note_write(db, {row["location_id"] for row in rows})
+    return len(rows)
+
+
+def _in_range(location_id: int, start_ts: datetime, end_ts: datetime):
+    return and_(
+        WeatherObservation.location_id == location_id,
+        WeatherObservation.ts >= start_ts,
+        WeatherObservation.ts <= end_ts,
+    )
+
+
+def observation_range_query(location_id: int, start_ts: datetime, end_ts: datetime) -> Select:
+    """Core select of (ts, temp_c, source) with start_ts <= ts <= end_ts, ordered by ts"""
+    return (
+        select(WeatherObservation.ts, WeatherObservation.temp_c, WeatherObservation.source)
+        .where(_in_range(location_id, start_ts, end_ts))
+        .order_by(WeatherObservation.ts)
+    )
+
+
+def read_observation_rows(
+    db: Session, location_id: int, start_ts: datetime, end_ts: datetime
+) -> Sequence[Tuple[datetime, float, str]]:
+    """(ts, temp_c, source) rows with start_ts <= ts <= end_ts from the hot table and the
+    cold tier, ordered by ts. A hot row replaces an archived point with the same ts.
+
+    Reads through Core, so no ORM entities, identity map entries or unused
+    columns are loaded."""
+    start_ts, end_ts = as_utc(start_ts), as_utc(end_ts)
+    rows = db.execute(observation_range_query(location_id, start_ts, end_ts)).all()
+    archived = read_archived(db, location_id, start_ts, end_ts)
+    if not archived:
+        return rows
+
+    merged = {p["ts"]: (p["ts"], p["temp_c"], p["source"]) for p in archived}
+    merged.update((row[0], row) for row in rows)
+    return [merged[ts] for ts in sorted(merged)]
+
+
+def read_observations(db: Session, location_id: int, start_ts: datetime, end_ts: datetime) -> List[Dict[str, Any]]:
+    """read_observation_rows() as {ts, temp_c, source} dicts for JSON responses"""
+    return [
+        {"ts": ts, "temp_c": temp_c, "source": source}
+        for ts, temp_c, source in read_observation_rows(db, location_id, start_ts, end_ts)
+    ]
+
+
+def read_observation_arrays(
+    db: Session, location_id: int, start_ts: datetime, end_ts: datetime
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(epoch seconds int64, temp_c float64) arrays for the same rows as
+    read_observation_rows(); no datetime objects are built for hot rows"""
+    start_ts, end_ts = as_utc(start_ts), as_utc(end_ts)
+    epoch = cast(func.extract("epoch", WeatherObservation.ts), BigInteger)
+    rows = db.execute(
+        select(epoch, WeatherObservation.temp_c)
+        .where(_in_range(location_id, start_ts, end_ts))
+        .order_by(WeatherObservation.ts)
+    ).all()
+    ts = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    temps = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+    return _merge_archived(db, location_id, start_ts, end_ts, ts, temps)
+
+
+def _merge_archived(
+    db: Session, location_id: int, start_ts: datetime, end_ts: datetime, ts: np.ndarray, temps: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    archived = read_archived(db, location_id, start_ts, end_ts)
+    if archived:
+        cold_ts = np.array([int(p["ts"].timestamp()) for p in archived], dtype=np.int64)
+        cold_temps = np.array([p["temp_c"] for p in archived], dtype=np.float64)
+        keep = ~np.isin(cold_ts, ts)
+        ts = np.concatenate([ts, cold_ts[keep]])
+        temps = np.concatenate([temps, cold_temps[keep]])
+        order = np.argsort(ts, kind="stable")
+        ts, temps = ts[order], temps[order]
+    return ts, temps
+
+
+def read_locations_arrays(
+    db: Session, location_ids: Sequence[int], start_ts: datetime, end_ts: datetime
+) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+    """read_observation_arrays() for many locations with one query for the hot rows;
+    every requested id is present in the result, possibly with empty arrays"""
+    start_ts, end_ts = as_utc(start_ts), as_utc(end_ts)
+    epoch = cast(func.extract("epoch", WeatherObservation.ts), BigInteger)
+    rows = db.execute(
+        select(WeatherObservation.location_id, epoch, WeatherObservation.temp_c)
+        .where(
+            WeatherObservation.location_id.in_(location_ids),
+            WeatherObservation.ts >= start_ts,
+            WeatherObservation.ts <= end_ts,
+        )
+        .order_by(WeatherObservation.location_id, WeatherObservation.ts)
+    ).all()
+    lids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    ts = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+    temps = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+
+    empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+    out = {int(lid): empty for lid in location_ids}
+    splits = np.flatnonzero(np.diff(lids)) + 1
+    for lid_part, ts_part, temp_part in zip(np.split(lids, splits), np.split(ts, splits), np.split(temps, splits)):
+        if len(lid_part):
+            out[int(lid_part[0])] = (ts_part, temp_part)
+
+    archived_ids = db.execute(
+        select(ObservationArchive.location_id).distinct().where(
+            ObservationArchive.location_id.in_(location_ids),
+            ObservationArchive.period_start <= end_ts,
+            ObservationArchive.period_end > start_ts,
+        )
+    ).scalars().all()
+    for lid in archived_ids:
+        out[lid] = _merge_archived(db, lid, start_ts, end_ts, *out[lid])
+    return out
@@ -0,0 +1,119 @@
+"""Bounded range deletes of observations.
+
+Rows are deleted in batches of DELETE_BATCH_ROWS, each in its own short
+transaction, so a multi-year delete never holds locks for long or produces
+one huge WAL burst, and autovacuum can keep up between batches. Every batch
+goes through the (location_id, ts) unique index: deletes for all locations
+walk the locations that have observations (``latest_observations``) a
+chunk at a time instead of scanning the whole table.
+"""
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.weather import LatestObservation, ObservationArchive
+from app.services.cold_storage import as_utc, delete_archived
+from app.services.coverage import rebuild as rebuild_coverage
+from app.services.latest import latest_cache
+
+logger = logging.getLogger(__name__)
+
+# One location: batches through the (location_id, ts) unique index
+_DELETE_BATCH = text("""
+    DELETE FROM weather_observations
+    WHERE id IN (
+        SELECT id FROM weather_observations
+        WHERE location_id = :location_id AND ts >= :start_ts AND ts <= :end_ts
+        LIMIT :batch
+    )
+""")
+
+# A chunk of locations: the same index, one range scan per location
+_DELETE_LOCATIONS_BATCH = text("""
+    DELETE FROM weather_observations
+    WHERE id IN (
+        SELECT id FROM weather_observations
+        WHERE location_id = ANY(:location_ids) AND ts >= :start_ts AND ts <= :end_ts
+        LIMIT :batch
+    )
+""")
+
+LOCATION_CHUNK = 1000
+
+
+def _delete_location(db: Session, location_id: int, start_ts: datetime, end_ts: datetime,
+                     report: Callable[[int], None]) -> None:
+    while True:
+        n = db.execute(_DELETE_BATCH, {
+            "location_id": location_id, "start_ts": start_ts, "end_ts": end_ts, "batch": settings.DELETE_BATCH_ROWS,
+        }).rowcount
+        db.commit()
+        report(n)
+        if n < settings.DELETE_BATCH_ROWS:
+            return
+
+
+def _delete_all_locations(db: Session, start_ts: datetime, end_ts: datetime, report: Callable[[int], None]) -> None:
+    # Every location with hot rows has a latest_observations entry (kept by triggers)
+    location_ids: List[int] = list(db.scalars(select(LatestObservation.location_id).order_by(LatestObservation.location_id)))
+    db.commit()
+    for i in range(0, len(location_ids), LOCATION_CHUNK):
+        chunk = location_ids[i:i + LOCATION_CHUNK]
+        while True:
+            n = db.execute(_DELETE_LOCATIONS_BATCH, {
+                "location_ids": chunk, "start_ts": start_ts, "end_ts": end_ts, "batch": settings.DELETE_BATCH_ROWS,
+            }).rowcount
+            db.commit()
+            report(n)
+            if n < settings.DELETE_BATCH_ROWS:
+                break
+
+
+def delete_range(
+    db: Session,
+    location_id: Optional[int],
+    start_ts: datetime,
+    end_ts: datetime,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Delete observations (hot and archived) with start_ts <= ts <= end_ts for one
+    location, or all locations when location_id is None. Commits as it goes."""
+    start_ts, end_ts = as_utc(start_ts), as_utc(end_ts)
+    started = time.monotonic()
+    stats = {"deleted": 0, "batches": 0}
+
+    def report(n: int) -> None:
+        stats["deleted"] += n
+        stats["batches"] += 1
+        if on_progress is not None:
+            on_progress(dict(stats))
+
+    if location_id is None:
+        _delete_all_locations(db, start_ts, end_ts, report)
+        archived_ids = [
+            row[0] for row in db.query(ObservationArchive.location_id).filter(
+                ObservationArchive.period_start <= end_ts, ObservationArchive.period_end > start_ts
+            ).distinct()
+        ]
+    else:
+        _delete_location(db, location_id, start_ts, end_ts, report)
+        archived_ids = [location_id]
+
+    for lid in archived_ids:
+        n = delete_archived(db, lid, start_ts, end_ts)
+        db.commit()
+        if n:
+            report(n)
+
+    # Archived points bypass the coverage triggers
+    if archived_ids:
+        rebuild_coverage(db, location_id, start_ts, end_ts)
+        db.commit()
+    latest_cache.invalidate([location_id] if location_id is not None else None)
+    stats["elapsed_s"] = round(time.monotonic() - started, 3)
+    return stats
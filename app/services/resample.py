@@ -0,0 +1,134 @@
+"""Resampling of irregular observations onto a regular time grid.
+
+Grid points fall on multiples of the step (UTC epoch), from the first one at
+or after the range start to the last one at or before its end. Each point
+is filled from the observations on either side of it:
+
+- ``observed``: an observation falls exactly on the grid point
+- ``interpolated``: both neighbours exist and are at most max_gap apart;
+  the value is linear between them or the nearer one's (ties go to the
+  earlier one)
+- ``missing``: no value (temp_c is null) because the neighbours are further
+  apart than max_gap or the point is before the first / after the last one
+
+iter_resampled() reads and resamples the range CHUNK_POINTS grid points at
+a time, with max_gap of padding on each side so points at chunk edges see
+their neighbours, so memory stays flat however long the range.
+"""
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.observations import read_observation_arrays
+
+OBSERVED, INTERPOLATED, MISSING = 0, 1, 2
+QUALITY = ("observed", "interpolated", "missing")
+METHODS = ("linear", "nearest")
+
+_DURATION = re.compile(r"^\s*(\d+)\s*([smhd]?)\s*$")
+_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_duration(value: str) -> int:
+    """Seconds in "900", "90s", "15m", "1h" or "1d"; ValueError otherwise"""
+    m = _DURATION.match(value.lower())
+    if not m or int(m.group(1)) <= 0:
+        raise ValueError(f"Invalid duration {value!r}; use e.g. 900, 15m, 1h or 1d")
+    return int(m.group(1)) * _UNITS[m.group(2)]
+
+
+@dataclass
+class ResampleSpec:
+    step_s: int
+    method: str = "linear"
+    max_gap_s: int = 0  # 0: settings.RESAMPLE_MAX_GAP_S
+
+    def __post_init__(self):
+        if self.method not in METHODS:
+            raise ValueError(f"method must be one of {', '.join(METHODS)}")
+        if not self.max_gap_s:
+            self.max_gap_s = settings.RESAMPLE_MAX_GAP_S
+
+    def describe(self) -> Dict[str, Any]:
+        return {"step_s": self.step_s, "method": self.method, "max_gap_s": self.max_gap_s}
+
+
+def grid_for(start_ts: datetime, end_ts: datetime, step_s: int) -> np.ndarray:
+    """Epoch seconds of the step multiples within [start_ts, end_ts]"""
+    first = -(-int(np.ceil(start_ts.timestamp())) // step_s) * step_s
+    last = int(end_ts.timestamp()) // step_s * step_s
+    if last < first:
+        return np.empty(0, dtype=np.int64)
+    return np.arange(first, last + 1, step_s, dtype=np.int64)
+
+
+def resample(epoch: np.ndarray, temps: np.ndarray, grid: np.ndarray, spec: ResampleSpec) -> Tuple[np.ndarray, np.ndarray]:
+    """(values with NaN where missing, quality codes) at `grid` from ascending `epoch`"""
+    n = len(epoch)
+    values = np.full(len(grid), np.nan)
+    quality = np.full(len(grid), MISSING, dtype=np.int8)
+    if n == 0 or len(grid) == 0:
+        return values, quality
+
+    right = np.searchsorted(epoch, grid, side="left")  # first observation at or after each point
+    r = np.minimum(right, n - 1)
+    exact = (right < n) & (epoch[r] == grid)
+    values[exact] = temps[r[exact]]
+    quality[exact] = OBSERVED
+
+    left = right - 1
+    inner = ~exact & (left >= 0) & (right < n)
+    li, ri = left[inner], right[inner]
+    t0, t1 = epoch[li], epoch[ri]
+    fill = (t1 - t0) <= spec.max_gap_s
+    g = grid[inner]
+    if spec.method == "linear":
+        filled = temps[li] + (temps[ri] - temps[li]) * (g - t0) / (t1 - t0)
+    else:
+        filled = np.where(g - t0 <= t1 - g, temps[li], temps[ri])
+
+    idx = np.flatnonzero(inner)[fill]
+    values[idx] = filled[fill]
+    quality[idx] = INTERPOLATED
+    return values, quality
+
+
+def iter_resampled(
+    db: Session, location_id: int, start_ts: datetime, end_ts: datetime, spec: ResampleSpec
+) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """(grid epoch seconds, values, quality) per chunk of at most CHUNK_POINTS grid points"""
+    grid = grid_for(start_ts, end_ts, spec.step_s)
+    chunk = settings.RESAMPLE_CHUNK_POINTS
+    pad = timedelta(seconds=spec.max_gap_s)
+    for i in range(0, len(grid), chunk):
+        part = grid[i:i + chunk]
+        lo = datetime.fromtimestamp(int(part[0]), timezone.utc) - pad
+        hi = datetime.fromtimestamp(int(part[-1]), timezone.utc) + pad
+        epoch, temps = read_observation_arrays(db, location_id, lo, hi)
+        values, quality = resample(epoch, temps, part, spec)
+        yield part, values, quality
+
+
+def to_points(grid: np.ndarray, values: np.ndarray, quality: np.ndarray) -> List[Dict[str, Any]]:
+    """{ts, temp_c, quality} dicts for a JSON response"""
+    temps = [None if v != v else v for v in np.round(values, 2).tolist()]
+    return [
+        {"ts": datetime.fromtimestamp(t, timezone.utc), "temp_c": v, "quality": QUALITY[q]}
+        for t, v, q in zip(grid.tolist(), temps, quality.tolist())
+    ]
+
+
+def read_resampled(db: Session, location_id: int, start_ts: datetime, end_ts: datetime,
+                   spec: ResampleSpec) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """All resampled points in range, and how many points have each quality"""
+    points: List[Dict[str, Any]] = []
+    counts = np.zeros(len(QUALITY), dtype=np.int64)
+    for grid, values, quality in iter_resampled(db, location_id, start_ts, end_ts, spec):
+        points.extend(to_points(grid, values, quality))
+        counts += np.bincount(quality, minlength=len(QUALITY))
+    return points, dict(zip(QUALITY, counts.tolist()))
@@ -0,0 +1,208 @@
+"""Temperature estimates at arbitrary coordinates from nearby stations.
+
+Every location with coordinates is a station. StationIndex sorts them by
+SPATIAL_CELL_DEG x SPATIAL_CELL_DEG lat/lon cell, so finding the candidates
+near a point only looks at the cells within SPATIAL_MAX_DISTANCE_KM of it.
+The index is built once per process and rebuilt after SPATIAL_INDEX_TTL_S,
+or when a location is created here.
+
+estimate() takes the SPATIAL_CANDIDATE_FACTOR * k nearest candidates of
+every query point, reads the observations of all their stations around the
+requested time in one query, and takes each station's value at that time
+(linear between its observations, when they are at most
+RESAMPLE_MAX_GAP_S apart). For each point it then uses the k nearest
+stations that have a value, weighted by inverse distance to the power
+`power`. A station closer than EXACT_KM gives its value directly. The
+weighting runs on (points x candidates) arrays, so a whole grid of points
+costs one query and a few array operations.
+"""
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.weather import Location
+from app.services.observations import read_locations_arrays
+from app.services.resample import ResampleSpec, resample
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG = math.pi * EARTH_RADIUS_KM / 180
+EXACT_KM = 0.01
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class StationIndex:
+    """Grid index over station coordinates: stations sorted by cell id
+    (row * cols + col), so each row's span of columns is one slice"""
+
+    def __init__(self, ids: np.ndarray, lat: np.ndarray, lon: np.ndarray, cell_deg: float):
+        self.cell_deg = cell_deg
+        self.cols = int(math.ceil(360 / cell_deg))
+        cells = self._row(lat) * self.cols + self._col(lon)
+        order = np.argsort(cells, kind="stable")
+        self.ids, self.lat, self.lon = ids[order], lat[order], lon[order]
+        self._cells = cells[order]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _row(self, lat):
+        return np.floor((np.asarray(lat) + 90) / self.cell_deg).astype(np.int64)
+
+    def _col(self, lon):
+        return np.floor((np.asarray(lon) + 180) / self.cell_deg).astype(np.int64) % self.cols
+
+    def candidates(self, lat: float, lon: float, max_km: float) -> np.ndarray:
+        """Positions of the stations in the cells within max_km of (lat, lon)"""
+        dlat = max_km / KM_PER_DEG
+        rows = np.arange(int(self._row(max(lat - dlat, -90))), int(self._row(min(lat + dlat, 90))) + 1)
+        cos_lat = math.cos(math.radians(min(abs(lat) + dlat, 90.0)))
+        if cos_lat < 1e-6 or dlat / cos_lat >= 180:
+            spans = [(0, self.cols - 1)]  # the radius spans every longitude
+        else:
+            dlon = dlat / cos_lat
+            c0, c1 = int(self._col(lon - dlon)), int(self._col(lon + dlon))
+            spans = [(c0, c1)] if c0 <= c1 else [(c0, self.cols - 1), (0, c1)]  # across the antimeridian
+        parts = []
+        for c0, c1 in spans:
+            lo = np.searchsorted(self._cells, rows * self.cols + c0, side="left")
+            hi = np.searchsorted(self._cells, rows * self.cols + c1, side="right")
+            parts.extend(np.arange(a, b) for a, b in zip(lo.tolist(), hi.tolist()) if b > a)
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def nearest(self, lat: np.ndarray, lon: np.ndarray, n: int, max_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """(positions, distances_km) of up to `n` stations within max_km of each
+        point, nearest first; rows are padded with -1 / inf"""
+        pos = np.full((len(lat), n), -1, dtype=np.int64)
+        dist = np.full((len(lat), n), np.inf)
+        for i, (plat, plon) in enumerate(zip(lat.tolist(), lon.tolist())):
+            cand = self.candidates(plat, plon, max_km)
+            if not len(cand):
+                continue
+            d = haversine_km(plat, plon, self.lat[cand], self.lon[cand])
+            keep = d <= max_km
+            cand, d = cand[keep], d[keep]
+            if len(cand) > n:
+                part = np.argpartition(d, n - 1)[:n]
+                cand, d = cand[part], d[part]
+            order = np.argsort(d, kind="stable")
+            pos[i, :len(cand)] = cand[order]
+            dist[i, :len(cand)] = d[order]
+        return pos, dist
+
+
+class StationIndexCache:
+    """Process-wide StationIndex, rebuilt after SPATIAL_INDEX_TTL_S or invalidate()"""
+
+    def __init__(self):
+        self._index: Optional[StationIndex] = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> StationIndex:
+        with self._lock:
+            if self._index is not None and time.monotonic() < self._expires:
+                return self._index
+        rows = db.execute(
+            select(Location.id, Location.latitude, Location.longitude)
+            .where(Location.latitude.is_not(None), Location.longitude.is_not(None))
+        ).all()
+        index = StationIndex(
+            np.array([r[0] for r in rows], dtype=np.int64),
+            np.array([r[1] for r in rows], dtype=np.float64),
+            np.array([r[2] for r in rows], dtype=np.float64),
+            settings.SPATIAL_CELL_DEG,
+        )
+        logger.info("Built station index over %d locations", len(index))
+        with self._lock:
+            self._index = index
+            self._expires = time.monotonic() + settings.SPATIAL_INDEX_TTL_S
+        return index
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._index = None
+
+
+station_index = StationIndexCache()
+
+
+def _values_at(db: Session, location_ids: np.ndarray, when: datetime) -> np.ndarray:
+    """Each station's temperature at `when`, NaN where it has none close enough"""
+    gap = settings.RESAMPLE_MAX_GAP_S
+    spec = ResampleSpec(step_s=1, method="linear", max_gap_s=gap)
+    arrays = read_locations_arrays(db, location_ids.tolist(), when - timedelta(seconds=gap), when + timedelta(seconds=gap))
+    target = np.array([int(when.timestamp())], dtype=np.int64)
+    values = np.full(len(location_ids), np.nan)
+    for i, lid in enumerate(location_ids.tolist()):
+        epoch, temps = arrays[lid]
+        values[i] = resample(epoch, temps, target, spec)[0][0]
+    return values
+
+
+def estimate(
+    db: Session,
+    lat: np.ndarray,
+    lon: np.ndarray,
+    when: datetime,
+    k: int,
+    power: float,
+    max_km: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Inverse-distance-weighted temperature at each (lat, lon) and `when`.
+
+    Returns arrays: temp_c (NaN without stations), stations_used and
+    nearest_km (of the stations used), plus the stations involved."""
+    max_km = settings.SPATIAL_MAX_DISTANCE_KM if max_km is None else max_km
+    index = station_index.get(db)
+    pos, dist = index.nearest(lat, lon, k * settings.SPATIAL_CANDIDATE_FACTOR, max_km)
+
+    used_pos = np.unique(pos[pos >= 0])
+    station_values = np.full(len(index), np.nan)
+    if len(used_pos):
+        station_values[used_pos] = _values_at(db, index.ids[used_pos], when)
+
+    vals = np.where(pos >= 0, station_values[np.maximum(pos, 0)], np.nan)
+    valid = ~np.isnan(vals)
+    # Candidates are sorted by distance: keep the first k that have a value
+    use = valid & (np.cumsum(valid, axis=1) <= k)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weights = np.where(use, 1.0 / np.maximum(dist, EXACT_KM) ** power, 0.0)
+        temp = (weights * np.where(use, vals, 0.0)).sum(axis=1) / weights.sum(axis=1)
+    exact = use & (dist < EXACT_KM)
+    has_exact = exact.any(axis=1)
+    temp[has_exact] = vals[has_exact, exact[has_exact].argmax(axis=1)]
+
+    used = np.unique(pos[use])
+    return {
+        "temp_c": temp,
+        "stations_used": use.sum(axis=1),
+        "nearest_km": np.where(use.any(axis=1), np.where(use, dist, np.inf).min(axis=1), np.nan),
+        "stations": [
+            {"id": int(index.ids[p]), "latitude": float(index.lat[p]), "longitude": float(index.lon[p]),
+             "temp_c": round(float(station_values[p]), 2)}
+            for p in used.tolist()
+        ],
+    }
+
+
+def grid_points(lat_min: float, lat_max: float, lon_min: float, lon_max: float, step_deg: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-major (lat, lon) arrays of a regular grid, bounds inclusive"""
+    lats = np.arange(lat_min, lat_max + step_deg / 2, step_deg)
+    lons = np.arange(lon_min, lon_max + step_deg / 2, step_deg)
+    glat, glon = np.meshgrid(lats, lons, indexing="ij")
+    return glat.ravel(), glon.ravel()
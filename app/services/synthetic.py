@@ -0,0 +1,214 @@
+"""Synthetic locations and temperature series for load and scale testing.
+
+Temperatures are built with NumPy one chunk at a time from a latitude-driven
+climate (annual mean and seasonal swing, hemisphere-aware), a diurnal cycle
+on local solar time, a few slow "weather system" oscillations and sensor
+noise. Each location draws from its own generator seeded with
+(seed, location index), so output is identical however locations are split
+across worker processes.
+
+Chunks are rendered to CSV by pyarrow and COPYed straight into
+``weather_observations``, or merged through the bulk import staging table
+with ``upsert=True`` when the range may already hold rows.
+"""
+import io
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.db.bulk import copy_in
+from app.db.session import engine
+from app.services.location_import import insert_locations
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400.0
+DAYS_PER_YEAR = 365.2422
+SYNOPTIC_PERIODS_DAYS = (2.7, 4.3, 6.9, 11.1)
+
+
+@dataclass
+class SyntheticLocation:
+    index: int  # position in the generated set; drives the random stream
+    id: int
+    latitude: float
+    longitude: float
+
+
+@dataclass
+class _Climate:
+    mean: float
+    seasonal_amp: float
+    diurnal_amp: float
+    hemisphere: float
+    synoptic_amp: np.ndarray
+    synoptic_phase: np.ndarray
+    noise_sd: float
+
+
+def _climate(loc: SyntheticLocation, rng: np.random.Generator) -> _Climate:
+    abs_lat = abs(loc.latitude)
+    return _Climate(
+        mean=28.0 - 0.45 * abs_lat + rng.normal(0, 2.0),
+        seasonal_amp=1.5 + 0.3 * abs_lat,
+        diurnal_amp=rng.uniform(3.0, 7.0),
+        hemisphere=1.0 if loc.latitude >= 0 else -1.0,
+        synoptic_amp=rng.uniform(0.5, 2.5, len(SYNOPTIC_PERIODS_DAYS)),
+        synoptic_phase=rng.uniform(0, 2 * np.pi, len(SYNOPTIC_PERIODS_DAYS)),
+        noise_sd=rng.uniform(0.3, 0.9),
+    )
+
+
+def temperature_series(loc: SyntheticLocation, c: _Climate, epoch_s: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Temperatures in C for epoch seconds `epoch_s`, rounded to 0.01"""
+    days = epoch_s / SECONDS_PER_DAY
+    # Warmest around day-of-year 200 in the north, 20 in the south
+    seasonal = c.hemisphere * c.seasonal_amp * np.cos(2 * np.pi * (days % DAYS_PER_YEAR - 200) / DAYS_PER_YEAR)
+    solar_hour = (epoch_s / 3600.0 + loc.longitude / 15.0) % 24
+    diurnal = c.diurnal_amp * np.cos(2 * np.pi * (solar_hour - 15) / 24)
+    periods = np.asarray(SYNOPTIC_PERIODS_DAYS)
+    synoptic = (c.synoptic_amp * np.sin(2 * np.pi * days[:, None] / periods + c.synoptic_phase)).sum(axis=1)
+    noise = rng.normal(0, c.noise_sd, epoch_s.shape[0])
+    return np.round(c.mean + seasonal + diurnal + synoptic + noise, 2)
+
+
+def generate_chunks(
+    loc: SyntheticLocation, start: datetime, end: datetime, step_s: int, seed: int, chunk_rows: int
+) -> Iterator[Dict[str, np.ndarray]]:
+    """Yield {"ts": epoch seconds, "temp_c": values} chunks for start <= ts < end"""
+    rng = np.random.default_rng([seed, loc.index])
+    climate = _climate(loc, rng)
+    first, last = int(start.timestamp()), int(end.timestamp())
+    for chunk_start in range(first, last, step_s * chunk_rows):
+        epoch_s = np.arange(chunk_start, min(chunk_start + step_s * chunk_rows, last), step_s, dtype=np.int64)
+        yield {"ts": epoch_s, "temp_c": temperature_series(loc, climate, epoch_s, rng)}
+
+
+def _chunk_csv(location_id: int, chunk: Dict[str, np.ndarray], source: str) -> bytes:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    n = chunk["ts"].shape[0]
+    table = pa.table({
+        "location_id": pa.array(np.full(n, location_id, dtype=np.int32)),
+        "ts": pa.array(chunk["ts"].astype("datetime64[s]"), type=pa.timestamp("s", tz="UTC")),
+        "temp_c": pa.array(chunk["temp_c"]),
+        "source": pa.array(np.full(n, source, dtype=object), type=pa.string()),
+    })
+    buf = io.BytesIO()
+    pacsv.write_csv(table, buf, pacsv.WriteOptions(include_header=False))
+    return buf.getvalue()
+
+
+def create_locations(count: int, seed: int, prefix: str = "Synthetic") -> List[SyntheticLocation]:
+    """Insert `count` locations named after `seed`. Those an earlier run with the
+    same seed created are reused, with the coordinates they were stored with."""
+    rng = np.random.default_rng(seed)
+    # Uniform on the sphere between 60S and 70N
+    lat = np.degrees(np.arcsin(rng.uniform(np.sin(np.radians(-60)), np.sin(np.radians(70)), count)))
+    lon = rng.uniform(-180, 180, count)
+    rows = [
+        {"name": f"{prefix} {seed}-{i:07d}", "country": "ZZ", "admin1": None,
+         "latitude": round(float(lat[i]), 5), "longitude": round(float(lon[i]), 5)}
+        for i in range(count)
+    ]
+
+    with Session(engine) as db:
+        ids, created = insert_locations(db, rows)
+        coords = {
+            location_id: (latitude, longitude)
+            for location_id, latitude, longitude in db.execute(
+                text("SELECT id, latitude, longitude FROM locations WHERE id = ANY(:ids)"), {"ids": ids}
+            )
+        }
+        db.commit()
+    if created < count:
+        logger.info("Reusing %d synthetic locations created by an earlier run with seed %d", count - created, seed)
+    return [SyntheticLocation(i, ids[i], *coords[ids[i]]) for i in range(count)]
+
+
+def _load_shard(
+    locations: Sequence[SyntheticLocation],
+    start: datetime,
+    end: datetime,
+    step_s: int,
+    seed: int,
+    chunk_rows: int,
+    upsert: bool,
+    source: str,
+) -> int:
+    from app.services.bulk_import import MERGE_SQL, STAGE_DDL, STAGE_TABLE
+
+    rows = 0
+    with engine.connect() as conn:
+        conn.execute(text("SET TIME ZONE 'UTC'"))
+        if upsert:
+            conn.execute(STAGE_DDL)
+        conn.commit()
+        for loc in locations:
+            # Explicit begin: a plain COPY bypasses SQLAlchemy, so autobegin would never commit it
+            with conn.begin():
+                for chunk in generate_chunks(loc, start, end, step_s, seed, chunk_rows):
+                    data = [_chunk_csv(loc.id, chunk, source)]
+                    columns = ["location_id", "ts", "temp_c", "source"]
+                    if upsert:
+                        copy_in(conn, STAGE_TABLE, columns, data=data)
+                        conn.execute(MERGE_SQL)
+                    else:
+                        copy_in(conn, "weather_observations", columns, data=data)
+                    rows += chunk["ts"].shape[0]
+    return rows
+
+
+def _init_worker() -> None:
+    # Forked workers must not reuse connections pooled by the parent
+    engine.dispose(close=False)
+
+
+def load_observations(
+    locations: Sequence[SyntheticLocation],
+    start: datetime,
+    end: datetime,
+    step_s: int = 3600,
+    seed: int = 0,
+    workers: int = 1,
+    chunk_rows: int = 500_000,
+    upsert: bool = False,
+    source: str = "synthetic",
+) -> Dict[str, float]:
+    """Generate and load series for `locations` over [start, end), one commit per location"""
+    start, end = start.astimezone(timezone.utc), end.astimezone(timezone.utc)
+    started = time.monotonic()
+    args = (start, end, step_s, seed, chunk_rows, upsert, source)
+
+    if workers <= 1:
+        rows = _load_shard(locations, *args)
+    else:
+        shards = [locations[i::workers] for i in range(workers)]
+        rows = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            for n in pool.map(_load_shard, shards, *([a] * len(shards) for a in args)):
+                rows += n
+
+    elapsed = time.monotonic() - started
+    logger.info("Loaded %d rows for %d locations in %.1fs (%.0f rows/s)", rows, len(locations), elapsed, rows / max(elapsed, 1e-9))
+    return {"locations": len(locations), "rows": rows, "elapsed_s": round(elapsed, 3)}
+
+
+def existing_locations(location_ids: Optional[Sequence[int]] = None) -> List[SyntheticLocation]:
+    """Wrap existing locations that have coordinates so series can be generated for them"""
+    query = "SELECT id, latitude, longitude FROM locations WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+    params = {}
+    if location_ids:
+        query += " AND id = ANY(:ids)"
+        params["ids"] = list(location_ids)
+    with engine.connect() as conn:
+        rows = conn.execute(text(query + " ORDER BY id"), params).all()
+    return [SyntheticLocation(i, r.id, r.latitude, r.longitude) for i, r in enumerate(rows)]
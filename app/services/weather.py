@@ -1,7 +1,8 @@
-import httpx
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timezone
 from app.core.config import settings
+from app.core.http import get_http_client
+from app.core.metrics import track_upstream
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,7 +21,8 @@ class OpenWeatherService:
             return None
             
         try:
-            async with httpx.AsyncClient() as client:
+            client = get_http_client()
+            with track_upstream("openweather", "search_location"):
                 response = await client.get(
                     "http://api.openweathermap.org/geo/1.0/direct",
                     params={
@@ -30,20 +32,20 @@ class OpenWeatherService:
                     }
                 )
                 response.raise_for_status()
-                data = response.json()
-                
-                if data:
-                    # Return the first (most relevant) result
-                    location = data[0]
-                    return {
-                        "name": location["name"],
-                        "country": location["country"],
-                        "admin1": location.get("state"),
-                        "latitude": location["lat"],
-                        "longitude": location["lon"]
-                    }
-                return None
-                
+            data = response.json()
+            
+            if data:
+                # Return the first (most relevant) result
+                location = data[0]
+                return {
+                    "name": location["name"],
+                    "country": location["country"],
+                    "admin1": location.get("state"),
+                    "latitude": location["lat"],
+                    "longitude": location["lon"]
+                }
+            return None
+            
         except Exception as e:
             logger.error(f"Error searching location: {e}")
             return None
@@ -71,7 +73,8 @@ class OpenWeatherService:
             while current_ts <= end_unix:
                 current_date = datetime.fromtimestamp(current_ts, tz=timezone.utc)
                 
-                async with httpx.AsyncClient() as client:
+                client = get_http_client()
+                with track_upstream("openweather", "historical_weather"):
                     response = await client.get(
                         f"{self.base_url}/onecall/timemachine",
                         params={
@@ -83,20 +86,20 @@ class OpenWeatherService:
                         }
                     )
                     response.raise_for_status()
-                    data = response.json()
-                    
-                    # Extract hourly data for this day
-                    if "hourly" in data:
-                        for hour_data in data["hourly"]:
-                            hour_ts = datetime.fromtimestamp(hour_data["dt"], tz=timezone.utc)
-                            
-                            # Only include data within our requested range
-                            if start_ts <= hour_ts <= end_ts:
-                                observations.append({
-                                    "ts": hour_ts,
-                                    "temp_c": hour_data["temp"],
-                                    "source": "openweather_api"
-                                })
+                data = response.json()
+                
+                # Extract hourly data for this day
+                if "hourly" in data:
+                    for hour_data in data["hourly"]:
+                        hour_ts = datetime.fromtimestamp(hour_data["dt"], tz=timezone.utc)
+                        
+                        # Only include data within our requested range
+                        if start_ts <= hour_ts <= end_ts:
+                            observations.append({
+                                "ts": hour_ts,
+                                "temp_c": hour_data["temp"],
+                                "source": "openweather_api"
+                            })
                 
                 # Move to next day (86400 seconds = 24 hours)
                 current_ts += 86400
@@ -113,7 +116,8 @@ class OpenWeatherService:
             return None
             
         try:
-            async with httpx.AsyncClient() as client:
+            client = get_http_client()
+            with track_upstream("openweather", "current_weather"):
                 response = await client.get(
                     f"{self.base_url}/weather",
                     params={
@@ -124,16 +128,16 @@ class OpenWeatherService:
                     }
                 )
                 response.raise_for_status()
-                data = response.json()
-                
-                return {
-                    "temp_c": data["main"]["temp"],
-                    "humidity": data["main"]["humidity"],
-                    "pressure": data["main"]["pressure"],
-                    "description": data["weather"][0]["description"],
-                    "icon": data["weather"][0]["icon"]
-                }
-                
+            data = response.json()
+            
+            return {
+                "temp_c": data["main"]["temp"],
+                "humidity": data["main"]["humidity"],
+                "pressure": data["main"]["pressure"],
+                "description": data["weather"][0]["description"],
+                "icon": data["weather"][0]["icon"]
+            }
+            
         except Exception as e:
             logger.error(f"Error fetching current weather: {e}")
             return None
@@ -0,0 +1,263 @@
+"""
+API and database hot-path benchmarks.
+
+Boots app.main:app in-process against a disposable Postgres database seeded
+with synthetic locations and hourly observations, with OpenWeather replaced
+by a local fake server. Measures throughput and p50/p99 latency for
+observation reads of several range sizes and a burst of identical reads, batch upserts of several sizes,
+single-reading pushes (CreateOne and buffered ingest), location search and
+the backfill path, and writes the results as JSON.
+
+Usage:
+    # Scratch database on the server from the DB_* settings (needs CREATEDB)
+    python -m benchmarks.bench_api
+    # Containerless: throwaway Postgres from the optional `pgserver` package
+    python -m benchmarks.bench_api --pgserver
+    # Compare with an earlier run
+    python -m benchmarks.bench_api --compare benchmarks/results/api-20261019T101500Z.json
+
+Runs are reproducible for a given --seed and data size; compare results only
+between runs on the same machine.
+"""
+import argparse
+import asyncio
+import itertools
+import math
+import random
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+SEED_START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def migrate() -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    command.upgrade(config, "head")
+
+
+def seed(locations: int, days: int, seed_value: int) -> None:
+    from sqlalchemy import text
+    from app.db.bulk import copy_in
+    from app.db.session import engine
+    from app.services.synthetic import SyntheticLocation, load_observations
+
+    rng = random.Random(seed_value)
+    coords = [(rng.uniform(25, 49), rng.uniform(-124, -67)) for _ in range(locations)]
+    with engine.begin() as conn:
+        copy_in(
+            conn,
+            "locations",
+            ["id", "name", "country", "admin1", "latitude", "longitude"],
+            rows=[(i + 1, f"Bench City {i + 1:04d}", "US", "CA", lat, lon) for i, (lat, lon) in enumerate(coords)],
+        )
+        conn.execute(text("SELECT setval(pg_get_serial_sequence('locations', 'id'), :n)"), {"n": locations})
+    load_observations(
+        [SyntheticLocation(i, i + 1, lat, lon) for i, (lat, lon) in enumerate(coords)],
+        SEED_START,
+        SEED_START + timedelta(days=days),
+        seed=seed_value,
+        source="bench",
+    )
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM ANALYZE"))
+
+
+def start_fake_openweather() -> Tuple[str, Any]:
+    """Serve /data/2.5/onecall/timemachine on a random local port; returns (base_url, server)"""
+    import uvicorn
+    from fastapi import FastAPI
+
+    fake = FastAPI()
+
+    @fake.get("/data/2.5/onecall/timemachine")
+    async def timemachine(lat: float, lon: float, dt: int):
+        day = dt - dt % 86400
+        return {
+            "lat": lat,
+            "lon": lon,
+            "hourly": [
+                {"dt": day + h * 3600, "temp": round(12 + 6 * math.sin((h - 9) / 24 * 2 * math.pi), 2)}
+                for h in range(24)
+            ],
+        }
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(fake, log_level="warning", lifespan="off"))
+    threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}/data/2.5", server
+
+
+async def run_scenario(
+    client, make_request: Callable[[int], Awaitable[Any]], requests: int, concurrency: int, warmup: int = 5
+) -> Dict[str, Any]:
+    from benchmarks.common import summarize
+
+    for i in range(warmup):
+        await make_request(-1 - i)
+
+    latencies = []
+    queue = iter(range(requests))
+
+    async def worker():
+        for i in queue:
+            started = time.perf_counter()
+            await make_request(i)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, concurrency=concurrency)
+
+
+async def run_all(args) -> Dict[str, Any]:
+    import httpx
+    from app.main import app
+    from app.services.weather import weather_service
+
+    base_url, fake_server = start_fake_openweather()
+    weather_service.api_key = "bench"
+    weather_service.base_url = base_url
+
+    rng = random.Random(args.seed)
+    hours = args.days * 24
+    results: Dict[str, Any] = {}
+
+    def checked(response):
+        if not 200 <= response.status_code < 300:
+            raise RuntimeError(f"{response.request.url} -> {response.status_code}: {response.text[:200]}")
+        return response
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+
+            for label, span_hours in (("1d", 24), ("7d", 168), ("30d", 720), ("365d", 8760)):
+                span_hours = min(span_hours, hours - 1)
+
+                async def read(i, span_hours=span_hours):
+                    start = SEED_START + timedelta(hours=rng.randrange(0, hours - span_hours))
+                    return checked(await client.get("/weather/observations", params={
+                        "location_id": rng.randint(1, args.locations),
+                        "start_ts": start.isoformat(),
+                        "end_ts": (start + timedelta(hours=span_hours)).isoformat(),
+                    }))
+
+                n = max(10, int(args.requests * (0.25 if span_hours > 1000 else 1)))
+                results[f"observations_read_{label}"] = await run_scenario(client, read, n, args.concurrency)
+                results[f"observations_read_{label}"]["rows_per_request"] = span_hours + 1
+
+            # A burst of identical reads (a popular location during a news story), coalesced into one query
+            hot = {"location_id": 1, "start_ts": SEED_START.isoformat(),
+                   "end_ts": (SEED_START + timedelta(hours=min(720, hours - 1))).isoformat()}
+
+            async def read_identical(i):
+                return checked(await client.get("/weather/observations", params=hot))
+
+            results["observations_read_identical_30d"] = await run_scenario(
+                client, read_identical, args.requests, args.concurrency * 8
+            )
+
+            for label in (1, 100, 1000):
+                size = min(label, hours - 1)  # short --days
+
+                async def upsert(i, size=size):
+                    start = SEED_START + timedelta(hours=rng.randrange(0, hours - size))
+                    return checked(await client.post("/weather/observations/upsert", json={
+                        "location_id": rng.randint(1, args.locations),
+                        "observations": [
+                            {"ts": (start + timedelta(hours=h)).isoformat(), "temp_c": round(rng.uniform(-10, 35), 2),
+                             "source": "bench"}
+                            for h in range(size)
+                        ],
+                    }))
+
+                n = max(10, int(args.requests * (0.25 if label >= 1000 else 0.5)))
+                results[f"observations_upsert_{label}"] = await run_scenario(client, upsert, n, args.concurrency)
+                results[f"observations_upsert_{label}"]["rows_per_request"] = size
+
+            # Single sensor pushes: synchronous CreateOne vs. the write-behind buffer
+            for name, method, path in (("observation_create_one", "PUT", "/weather/observations/CreateOne"),
+                                       ("observation_ingest", "POST", "/weather/observations/ingest")):
+                async def push(i, method=method, path=path):
+                    ts = SEED_START + timedelta(hours=rng.randrange(0, hours))
+                    return checked(await client.request(method, path, json={
+                        "location_id": rng.randint(1, args.locations), "ts": ts.isoformat(),
+                        "temp_c": round(rng.uniform(-10, 35), 2), "source": "bench",
+                    }))
+
+                results[name] = await run_scenario(client, push, args.requests, args.concurrency)
+
+            async def search(i):
+                return checked(await client.get("/locations/search", params={"q": f"city {rng.randint(1, args.locations):04d}"}))
+
+            results["location_search"] = await run_scenario(client, search, args.requests, args.concurrency)
+
+            # Seeded weeks are already covered (a backfill there fetches nothing), so each
+            # request takes a week after the seeded range that no other request has filled
+            weeks = itertools.count()
+
+            async def backfill(i):
+                week = next(weeks)
+                start = SEED_START + timedelta(days=args.days + 7 * (week // args.locations))
+                return checked(await client.post("/weather/observations/backfill", json={
+                    "location_id": week % args.locations + 1,
+                    "start_ts": start.isoformat(),
+                    "end_ts": (start + timedelta(days=7) - timedelta(hours=1)).isoformat(),
+                }))
+
+            results["backfill_7d"] = await run_scenario(client, backfill, max(10, args.requests // 10), args.concurrency)
+            results["backfill_7d"]["rows_per_request"] = 168
+
+    fake_server.should_exit = True
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the API and DB hot paths")
+    parser.add_argument("--pgserver", action="store_true", help="Run against a throwaway local Postgres (pip install pgserver)")
+    parser.add_argument("--locations", type=int, default=50)
+    parser.add_argument("--days", type=int, default=400, help="Days of hourly history seeded per location")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario (heavy scenarios run fewer)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Result file (default: benchmarks/results/api-<timestamp>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier result file to compare against")
+    args = parser.parse_args()
+    if args.days < 1:
+        parser.error("--days must be at least 1")
+
+    from benchmarks.common import compare_results, disposable_database, write_results
+
+    with disposable_database(use_pgserver=args.pgserver):
+        migrate()
+        started = time.perf_counter()
+        seed(args.locations, args.days, args.seed)
+        seed_s = time.perf_counter() - started
+        results = asyncio.run(run_all(args))
+
+    params = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+    params["seed_s"] = round(seed_s, 2)
+    out = write_results("api", params, results, args.output)
+
+    for scenario, r in results.items():
+        print(f"{scenario:<32} {r['throughput_rps']:>9} req/s  p50 {r['p50_ms']:>9} ms  p99 {r['p99_ms']:>9} ms")
+    if args.compare:
+        print("\n".join(compare_results(args.compare, results)))
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Cold tier codec benchmark: storage per point and encode/decode throughput.
+
+Usage:
+    python -m benchmarks.bench_cold_tier [--months 24] [--seed 0]
+    # Compare with an earlier run
+    python -m benchmarks.bench_cold_tier --compare benchmarks/results/cold_tier-20261019T101500Z.json
+
+Series are one location-month of hourly readings with a diurnal cycle and
+sensor noise, rounded to 0.01 C like typical station data.
+"""
+import argparse
+import math
+import random
+import time
+from datetime import datetime, timezone
+
+from app.services.cold_storage import next_month, pack, unpack
+from app.models.weather import ObservationArchive
+
+# Heap tuple + item pointer + pkey/unique index entries for one weather_observations row
+HOT_ROW_BYTES_ESTIMATE = 130
+
+
+def month_series(rng: random.Random, period_start: datetime):
+    period_end = next_month(period_start)
+    points = []
+    ts = int(period_start.timestamp())
+    while ts < period_end.timestamp():
+        hour = (ts // 3600) % 24
+        temp = 12 + 8 * math.sin((hour - 9) / 24 * 2 * math.pi) + rng.gauss(0, 0.8)
+        points.append({
+            "ts": datetime.fromtimestamp(ts, tz=timezone.utc),
+            "temp_c": round(temp, 2),
+            "source": "station",
+        })
+        ts += 3600
+    return points
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Result file (default: benchmarks/results/cold_tier-<timestamp>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    from benchmarks.common import compare_results, write_results
+
+    rng = random.Random(args.seed)
+    period = datetime(2018, 1, 1, tzinfo=timezone.utc)
+    months = []
+    for _ in range(args.months):
+        months.append(month_series(rng, period))
+        period = next_month(period)
+    points = sum(len(m) for m in months)
+
+    started = time.perf_counter()
+    archives = []
+    for m in months:
+        blob, sources = pack(m)
+        archives.append(ObservationArchive(data=blob, sources=sources, point_count=len(m)))
+    encode_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    decoded = [unpack(a) for a in archives]
+    decode_s = time.perf_counter() - started
+
+    assert [[(p["ts"], p["temp_c"]) for p in m] for m in decoded] == [[(p["ts"], p["temp_c"]) for p in m] for m in months]
+
+    blob_bytes = sum(len(a.data) for a in archives)
+    results = {
+        "codec": {
+            "points": points,
+            "blob_bytes": blob_bytes,
+            "bytes_per_point": round(blob_bytes / points, 3),
+            "hot_bytes_per_point_estimate": HOT_ROW_BYTES_ESTIMATE,
+            "compression_ratio_estimate": round(HOT_ROW_BYTES_ESTIMATE * points / blob_bytes, 1),
+            "encode_points_per_s": round(points / encode_s),
+            "decode_points_per_s": round(points / decode_s),
+        },
+    }
+    params = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+    out = write_results("cold_tier", params, results, args.output)
+
+    for key, value in results["codec"].items():
+        print(f"{key:<32} {value}")
+    if args.compare:
+        print("\n".join(compare_results(
+            args.compare, results, keys=("bytes_per_point", "encode_points_per_s", "decode_points_per_s")
+        )))
+    print(f"Results written to {out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Observation read path benchmark: ORM entities vs. Core rows.
+
+Seeds one location with hourly synthetic data in a disposable database and
+reads the whole range through:
+
+- orm:    db.query(WeatherObservation) entities copied into dicts (the former path)
+- rows:   read_observation_rows(), Core (ts, temp_c, source) rows
+- dicts:  read_observations(), rows turned into response dicts
+- arrays: read_observation_arrays(), NumPy epoch/temperature arrays
+
+Reports CPU time and peak Python memory per 100k rows. CPU is the best of
+--repeat runs; memory is the tracemalloc peak of a separate run.
+
+Usage:
+    python -m benchmarks.bench_read_path --pgserver [--rows 200000] [--repeat 5]
+"""
+import argparse
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+START = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+
+def orm_read(db, location_id, start_ts, end_ts):
+    from sqlalchemy import and_
+    from app.models.weather import WeatherObservation
+
+    observations = db.query(WeatherObservation).filter(
+        and_(
+            WeatherObservation.location_id == location_id,
+            WeatherObservation.ts >= start_ts,
+            WeatherObservation.ts <= end_ts
+        )
+    ).order_by(WeatherObservation.ts).all()
+    return [{"ts": o.ts, "temp_c": o.temp_c, "source": o.source} for o in observations]
+
+
+def measure(fn, rows: int, repeat: int):
+    from app.db.session import SessionLocal
+
+    def run():
+        with SessionLocal() as db:
+            result = fn(db, 1, START, START + timedelta(hours=rows))
+            return len(result[0]) if isinstance(result, tuple) else len(result)
+
+    n = run()  # warm the connection and statement caches
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        run()
+        best = min(best, time.process_time() - started)
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    per_100k = 100_000 / n
+    return {
+        "rows": n,
+        "cpu_ms_per_100k": round(best * 1000 * per_100k, 1),
+        "peak_mb_per_100k": round(peak / 2**20 * per_100k, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pgserver", action="store_true", help="Run against a throwaway local Postgres (pip install pgserver)")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=None, help="Result file (default: benchmarks/results/read_path-<timestamp>.json)")
+    args = parser.parse_args()
+
+    from benchmarks.bench_api import migrate
+    from benchmarks.common import disposable_database, write_results
+
+    with disposable_database(use_pgserver=args.pgserver):
+        migrate()
+        from app.services.observations import read_observation_arrays, read_observation_rows, read_observations
+        from app.services.synthetic import create_locations, load_observations
+
+        load_observations(create_locations(1, seed=0), START, START + timedelta(hours=args.rows), seed=0)
+        results = {
+            name: measure(fn, args.rows, args.repeat)
+            for name, fn in (
+                ("orm", orm_read),
+                ("rows", read_observation_rows),
+                ("dicts", read_observations),
+                ("arrays", read_observation_arrays),
+            )
+        }
+
+    out = write_results("read_path", vars(args), results, args.output)
+    for name, r in results.items():
+        print(f"{name:<8} {r['cpu_ms_per_100k']:>9} ms CPU / 100k rows  {r['peak_mb_per_100k']:>8} MB peak / 100k rows")
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Response envelope serialization benchmark.
+
+Compares the previous path (FastAPI's jsonable_encoder followed by
+Starlette's json.dumps-based JSONResponse) with the orjson envelope from
+app.api.responses, for observation payloads of several sizes.
+
+Usage:
+    python -m benchmarks.bench_serialization [--repeat 20] [--output path]
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.api.responses import ok
+
+SIZES = (24, 720, 8760, 87600)
+
+
+def payload(rows: int):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return {
+        "location": {"id": 1, "name": "Bench City", "country": "US", "admin1": "CA", "latitude": 37.77, "longitude": -122.42},
+        "range": {"start_ts": start, "end_ts": start + timedelta(hours=rows - 1)},
+        "observations": [
+            {"ts": start + timedelta(hours=h), "temp_c": round(10 + (h % 24) * 0.37, 2), "source": "openweather_api"}
+            for h in range(rows)
+        ],
+    }
+
+
+def legacy(data) -> bytes:
+    return JSONResponse(content=jsonable_encoder({"success": True, "data": data, "meta": None})).body
+
+
+def current(data) -> bytes:
+    return ok(data).body
+
+
+def timed(fn, data, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(data)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per case; the best time is kept")
+    parser.add_argument("--output", default=None, help="Result file (default: benchmarks/results/serialization-<timestamp>.json)")
+    args = parser.parse_args()
+
+    from benchmarks.common import write_results
+
+    results = {}
+    for rows in SIZES:
+        data = payload(rows)
+        assert json.loads(legacy(data)) == json.loads(current(data))
+        repeat = max(3, args.repeat * 24 // rows)  # fewer runs for the big payloads
+        legacy_s = timed(legacy, data, repeat)
+        current_s = timed(current, data, repeat)
+        results[f"observations_{rows}"] = {
+            "rows": rows,
+            "bytes": len(current(data)),
+            "legacy_ms": round(legacy_s * 1000, 3),
+            "orjson_ms": round(current_s * 1000, 3),
+            "speedup": round(legacy_s / current_s, 1),
+        }
+
+    out = write_results("serialization", vars(args), results, args.output)
+    for name, r in results.items():
+        print(f"{name:<22} legacy {r['legacy_ms']:>9} ms  orjson {r['orjson_ms']:>8} ms  x{r['speedup']}")
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Shared helpers for the benchmark scripts: disposable database, timing
+summaries and JSON result files that can be compared between runs."""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending sequence"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies_s: List[float], elapsed_s: float, **extra: Any) -> Dict[str, Any]:
+    values = sorted(latencies_s)
+    return {
+        "requests": len(values),
+        "throughput_rps": round(len(values) / elapsed_s, 1) if elapsed_s else None,
+        "mean_ms": round(statistics.fmean(values) * 1000, 3) if values else None,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else None,
+        **extra,
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+def write_results(name: str, params: Dict[str, Any], results: Dict[str, Any], path: Optional[str] = None) -> Path:
+    """Write a result document to `path` or benchmarks/results/<name>-<utc timestamp>.json"""
+    doc = {
+        "benchmark": name,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "params": params,
+        "results": results,
+    }
+    if path:
+        out = Path(path)
+    else:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        out = RESULTS_DIR / f"{name}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+    out.write_text(json.dumps(doc, indent=2, default=str))
+    return out
+
+
+def compare_results(
+    baseline_path: str, current: Dict[str, Any], keys: Sequence[str] = ("p50_ms", "p99_ms", "throughput_rps")
+) -> List[str]:
+    """One line per scenario with the change of each of `keys` (default p50/p99/throughput)
+    against a previous result file"""
+    baseline = json.loads(Path(baseline_path).read_text())["results"]
+    lines = []
+    for scenario, cur in current.items():
+        old = baseline.get(scenario)
+        if not old:
+            lines.append(f"{scenario:<32} (new)")
+            continue
+        parts = []
+        for key in keys:
+            if old.get(key) and cur.get(key) is not None:
+                parts.append(f"{key} {old[key]} -> {cur[key]} ({(cur[key] - old[key]) / old[key] * 100:+.1f}%)")
+        lines.append(f"{scenario:<32} " + ", ".join(parts))
+    return lines
+
+
+@contextmanager
+def disposable_database(use_pgserver: bool = False):
+    """Create an empty database for the run and drop it afterwards.
+
+    Connects with the app's DB_* settings, or, with `use_pgserver`, boots a
+    throwaway local Postgres through the optional ``pgserver`` package so no
+    server or container is needed. Yields the database name after pointing
+    ``app.core.config.settings`` at it; import app.db.session only afterwards.
+    """
+    from sqlalchemy import create_engine, text
+    from app.core.config import settings
+
+    server = None
+    if use_pgserver:
+        import tempfile
+        from urllib.parse import parse_qs, urlparse
+        import pgserver  # optional, benchmark-only dependency
+
+        server = pgserver.get_server(tempfile.mkdtemp(prefix="weather-bench-"), cleanup_mode="delete")
+        os.environ["PGHOST"] = parse_qs(urlparse(server.get_uri()).query)["host"][0]
+        settings.DB_HOST = ""
+        settings.DB_USER = "postgres"
+        settings.DB_NAME = "postgres"
+
+    name = f"weather_bench_{uuid.uuid4().hex[:8]}"
+    admin = create_engine(settings.sqlalchemy_url, isolation_level="AUTOCOMMIT")
+    with admin.connect() as conn:
+        conn.execute(text(f'CREATE DATABASE "{name}"'))
+    original = settings.DB_NAME
+    settings.DB_NAME = name
+    try:
+        yield name
+    finally:
+        settings.DB_NAME = original
+        try:
+            from app.db.session import engine
+            engine.dispose()
+        except ImportError:
+            pass
+        with admin.connect() as conn:
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)'))
+        admin.dispose()
+        if server is not None:
+            server.cleanup()
+
@@ -1,16 +1,74 @@
 #!/usr/bin/env python3
 """
-Simple startup script for the Weather App API
+Startup script for the Weather App API
+
+    python run.py           # development: single process with auto-reload
+    python run.py --prod    # production: multi-worker, uvloop + httptools, no reload
+
+Production settings come from the environment (see app/core/config.py):
+WEB_CONCURRENCY, SERVER_HOST, SERVER_PORT, KEEPALIVE_TIMEOUT, BACKLOG,
+GRACEFUL_SHUTDOWN_TIMEOUT, FORWARDED_ALLOW_IPS and ACCESS_LOG. On SIGTERM each worker stops accepting
+connections, waits up to GRACEFUL_SHUTDOWN_TIMEOUT seconds for in-flight
+requests, then closes its HTTP clients and database pool.
+
+Workers share metrics through PROMETHEUS_MULTIPROC_DIR (default: a
+directory under the system temp dir), which --prod empties at startup.
 """
 
+import argparse
+import glob
+import os
+import tempfile
+
 import uvicorn
-from app.main import app
 
-if __name__ == "__main__":
+from app.core.config import settings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the Weather API")
+    parser.add_argument("--prod", action="store_true", help="Production mode (multi-worker, no reload)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: WEB_CONCURRENCY or CPU count)")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    args = parser.parse_args()
+
+    if not args.prod:
+        uvicorn.run(
+            "app.main:app",
+            host=args.host,
+            port=args.port,
+            reload=True,
+            log_level="info"
+        )
+        return
+
+    # Each worker writes its metrics here and /metrics aggregates them. Files left by
+    # an earlier run would be counted again. The workers inherit the environment.
+    metrics_dir = os.environ.setdefault(
+        "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "weather-api-metrics")
+    )
+    os.makedirs(metrics_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+        os.remove(path)
+
     uvicorn.run(
         "app.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info"
-    ) 
\ No newline at end of file
+        host=args.host,
+        port=args.port,
+        workers=args.workers or settings.WEB_CONCURRENCY or os.cpu_count() or 1,
+        loop="uvloop",
+        http="httptools",
+        lifespan="on",
+        backlog=settings.BACKLOG,
+        timeout_keep_alive=settings.KEEPALIVE_TIMEOUT,
+        timeout_graceful_shutdown=settings.GRACEFUL_SHUTDOWN_TIMEOUT,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.FORWARDED_ALLOW_IPS,
+        access_log=settings.ACCESS_LOG,
+        log_level="info",
+    )
+
+
+if __name__ == "__main__":
+    main()